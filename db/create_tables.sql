@@ -6,6 +6,7 @@ DROP TABLE IF EXISTS market_data;
 DROP TABLE IF EXISTS reports;
 DROP TABLE IF EXISTS queries;
 DROP TABLE IF EXISTS workflows;
+DROP TABLE IF EXISTS llm_cache;
 
 -- Create market_data table
 CREATE TABLE market_data (
@@ -64,6 +65,16 @@ CREATE TABLE workflows (
     metadata JSONB
 );
 
+-- Create llm_cache table
+CREATE TABLE llm_cache (
+    id UUID PRIMARY KEY,
+    cache_key TEXT UNIQUE,
+    query_text TEXT,
+    embedding JSONB,
+    payload JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Add indexes for better performance
 CREATE INDEX idx_market_data_sector ON market_data(sector);
 CREATE INDEX idx_market_data_country ON market_data(country);
@@ -81,15 +92,18 @@ ALTER TABLE market_data ENABLE ROW LEVEL SECURITY;
 ALTER TABLE reports ENABLE ROW LEVEL SECURITY;
 ALTER TABLE queries ENABLE ROW LEVEL SECURITY;
 ALTER TABLE workflows ENABLE ROW LEVEL SECURITY;
+ALTER TABLE llm_cache ENABLE ROW LEVEL SECURITY;
 
 -- Create policies
 CREATE POLICY "Allow full access to authenticated users" ON market_data FOR ALL TO authenticated USING (true);
 CREATE POLICY "Allow full access to authenticated users" ON reports FOR ALL TO authenticated USING (true);
 CREATE POLICY "Allow full access to authenticated users" ON queries FOR ALL TO authenticated USING (true);
 CREATE POLICY "Allow full access to authenticated users" ON workflows FOR ALL TO authenticated USING (true);
+CREATE POLICY "Allow full access to authenticated users" ON llm_cache FOR ALL TO authenticated USING (true);
 
 -- Also allow anon access for development purposes
 CREATE POLICY "Allow anon access" ON market_data FOR ALL TO anon USING (true);
 CREATE POLICY "Allow anon access" ON reports FOR ALL TO anon USING (true);
 CREATE POLICY "Allow anon access" ON queries FOR ALL TO anon USING (true);
 CREATE POLICY "Allow anon access" ON workflows FOR ALL TO anon USING (true);
+CREATE POLICY "Allow anon access" ON llm_cache FOR ALL TO anon USING (true);
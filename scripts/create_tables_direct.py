@@ -1,196 +1,185 @@
 import os
-from dotenv import load_dotenv
-from supabase import create_client, Client
-import json
-import time
-import uuid
+import sys
+import atexit
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+from typing import Set, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Make the application package importable when running this script directly
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "market_intelligence_app"))
+from db.schema import TABLES, generate_ddl
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Supabase client
-supabase_url = os.environ.get("SUPABASE_URL")
-supabase_key = os.environ.get("SUPABASE_KEY")
+# Constant values shared by the sample rows; a one-shot script can capture "now" once
+_EMPTY_OBJ = "{}"
+_EMPTY_ARR = "[]"
+_NOW_ISO = datetime.now().isoformat()
+
+# Marker recording the hash of the last schema applied successfully
+SCHEMA_MARKER = Path(".cache/supabase_schema_ok")
 
-if not supabase_url or not supabase_key:
-    raise ValueError("Missing Supabase credentials. Please set SUPABASE_URL and SUPABASE_KEY in your .env file.")
+def create_supabase_client() -> "Client":
+    """Create and return a Supabase client."""
+    # supabase pulls in httpx, gotrue and postgrest; only pay for it when connecting
+    from supabase import create_client
 
-try:
-    supabase: Client = create_client(supabase_url, supabase_key)
-    print("✅ Successfully connected to Supabase.")
-except Exception as e:
-    print(f"❌ Failed to connect to Supabase: {e}")
-    raise
+    supabase_url = os.environ.get("SUPABASE_URL")
+    supabase_key = os.environ.get("SUPABASE_KEY")
 
-def create_market_data_table():
-    """Create the market_data table using the Supabase client."""
-    print("Creating market_data table...")
+    if not supabase_url or not supabase_key:
+        raise ValueError("Missing Supabase credentials. Please set SUPABASE_URL and SUPABASE_KEY in your .env file.")
 
-    # First, check if the table exists
     try:
-        supabase.table("market_data").select("id").limit(1).execute()
-        print("market_data table already exists.")
-        return True
+        client = create_client(supabase_url, supabase_key)
+        print("✅ Successfully connected to Supabase.")
+        return client
     except Exception as e:
-        if "relation" in str(e) and "does not exist" in str(e):
-            # Table doesn't exist, create it
-            try:
-                # Create a sample record with all required fields to create the table
-                sample_data = {
-                    "id": str(uuid.uuid4()),
-                    "sector": "Sample",
-                    "country": "Sample",
-                    "data_point": "Sample",
-                    "value": "Sample",
-                    "source": "Sample",
-                    "date": "2023-01-01",
-                    "custom_keyword": "Sample",
-                    "metadata": json.dumps({}),
-                    "created_at": datetime.now().isoformat()
-                }
-
-                supabase.table("market_data").insert(sample_data).execute()
-                print("✅ market_data table created successfully.")
-                return True
-            except Exception as e:
-                print(f"❌ Error creating market_data table: {e}")
-                return False
-        else:
-            print(f"❌ Error checking market_data table: {e}")
-            return False
+        print(f"❌ Failed to connect to Supabase: {e}")
+        raise
 
-def create_reports_table():
-    """Create the reports table using the Supabase client."""
-    print("Creating reports table...")
+TABLE_NAMES = tuple(TABLES)
 
-    # First, check if the table exists
-    try:
-        supabase.table("reports").select("id").limit(1).execute()
-        print("reports table already exists.")
-        return True
-    except Exception as e:
-        if "relation" in str(e) and "does not exist" in str(e):
-            # Table doesn't exist, create it
-            try:
-                # Create a sample record with all required fields to create the table
-                sample_data = {
-                    "id": str(uuid.uuid4()),
-                    "title": "Sample Report",
-                    "sector": "Sample",
-                    "country": "Sample",
-                    "financial_product": "Sample",
-                    "content": "Sample content",
-                    "summary": "Sample summary",
-                    "custom_keyword": "Sample",
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
-                    "metadata": json.dumps({})
-                }
-
-                supabase.table("reports").insert(sample_data).execute()
-                print("✅ reports table created successfully.")
-                return True
-            except Exception as e:
-                print(f"❌ Error creating reports table: {e}")
-                return False
-        else:
-            print(f"❌ Error checking reports table: {e}")
-            return False
+def existing_tables(client) -> Set[str]:
+    """Return the names of the application tables that already exist in the public schema."""
+    names = ", ".join(f"'{name}'" for name in TABLE_NAMES)
+    response = client.rpc("exec_sql", {
+        "query": f"SELECT table_name FROM information_schema.tables WHERE table_schema='public' AND table_name IN ({names})"
+    }).execute()
+    return {row["table_name"] for row in (response.data or [])}
 
-def create_queries_table():
-    """Create the queries table using the Supabase client."""
-    print("Creating queries table...")
+CREATE_TABLES_SQL = generate_ddl()
+
+def ensure_tables(client):
+    """Create all missing tables in a single transaction using the exec_sql RPC."""
+    print("Creating tables...")
 
-    # First, check if the table exists
     try:
-        supabase.table("queries").select("id").limit(1).execute()
-        print("queries table already exists.")
+        client.rpc("exec_sql", {"query": CREATE_TABLES_SQL}).execute()
+        print("✅ CREATE TABLE statements executed successfully.")
         return True
     except Exception as e:
-        if "relation" in str(e) and "does not exist" in str(e):
-            # Table doesn't exist, create it
-            try:
-                # Create a sample record with all required fields to create the table
-                sample_data = {
-                    "id": str(uuid.uuid4()),
-                    "query_text": "Sample query",
-                    "query": "Sample query",
-                    "entities": json.dumps({}),
-                    "intent": "Sample intent",
-                    "response": "Sample response",
-                    "result": "Sample result",
-                    "agent_type": "Sample agent",
-                    "custom_keyword": "Sample",
-                    "timestamp": datetime.now().isoformat(),
-                    "created_at": datetime.now().isoformat(),
-                    "metadata": json.dumps({})
-                }
-
-                supabase.table("queries").insert(sample_data).execute()
-                print("✅ queries table created successfully.")
-                return True
-            except Exception as e:
-                print(f"❌ Error creating queries table: {e}")
-                return False
-        else:
-            print(f"❌ Error checking queries table: {e}")
+        print(f"❌ Error creating tables: {e}")
+        return False
+
+def seed_rows():
+    """Build one sample row per table, keyed by table name."""
+    import uuid
+
+    return {
+        "market_data": [{
+            "id": str(uuid.uuid4()),
+            "sector": "Sample",
+            "country": "Sample",
+            "data_point": "Sample",
+            "value": "Sample",
+            "source": "Sample",
+            "date": "2023-01-01",
+            "custom_keyword": "Sample",
+            "metadata": _EMPTY_OBJ,
+            "created_at": _NOW_ISO
+        }],
+        "reports": [{
+            "id": str(uuid.uuid4()),
+            "title": "Sample Report",
+            "sector": "Sample",
+            "country": "Sample",
+            "financial_product": "Sample",
+            "content": "Sample content",
+            "summary": "Sample summary",
+            "custom_keyword": "Sample",
+            "created_at": _NOW_ISO,
+            "updated_at": _NOW_ISO,
+            "metadata": _EMPTY_OBJ
+        }],
+        "queries": [{
+            "id": str(uuid.uuid4()),
+            "query_text": "Sample query",
+            "query": "Sample query",
+            "entities": _EMPTY_OBJ,
+            "intent": "Sample intent",
+            "response": "Sample response",
+            "result": "Sample result",
+            "agent_type": "Sample agent",
+            "custom_keyword": "Sample",
+            "timestamp": _NOW_ISO,
+            "created_at": _NOW_ISO,
+            "metadata": _EMPTY_OBJ
+        }],
+        "workflows": [{
+            "id": str(uuid.uuid4()),
+            "name": "Sample Workflow",
+            "description": "Sample description",
+            "steps": _EMPTY_ARR,
+            "created_at": _NOW_ISO,
+            "updated_at": _NOW_ISO,
+            "status": "completed",
+            "metadata": _EMPTY_OBJ
+        }]
+    }
+
+def seed_tables(client):
+    """Upsert the sample rows, one request per table, with the tables handled concurrently."""
+    def upsert(item):
+        table_name, rows = item
+        try:
+            client.table(table_name).upsert(rows).execute()
+            print(f"✅ Seeded {table_name} with {len(rows)} sample row(s).")
+            return True
+        except Exception as e:
+            print(f"❌ Error seeding {table_name}: {e}")
             return False
 
-def create_workflows_table():
-    """Create the workflows table using the Supabase client."""
-    print("Creating workflows table...")
+    seed = seed_rows()
+    with ThreadPoolExecutor(max_workers=len(seed)) as executor:
+        return all(executor.map(upsert, seed.items()))
 
-    # First, check if the table exists
-    try:
-        supabase.table("workflows").select("id").limit(1).execute()
-        print("workflows table already exists.")
-        return True
-    except Exception as e:
-        if "relation" in str(e) and "does not exist" in str(e):
-            # Table doesn't exist, create it
-            try:
-                # Create a sample record with all required fields to create the table
-                sample_data = {
-                    "id": str(uuid.uuid4()),
-                    "name": "Sample Workflow",
-                    "description": "Sample description",
-                    "steps": json.dumps([]),
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
-                    "status": "completed",
-                    "metadata": json.dumps({})
-                }
-
-                supabase.table("workflows").insert(sample_data).execute()
-                print("✅ workflows table created successfully.")
-                return True
-            except Exception as e:
-                print(f"❌ Error creating workflows table: {e}")
-                return False
-        else:
-            print(f"❌ Error checking workflows table: {e}")
-            return False
+def write_schema_marker(schema_hash):
+    """Record that the schema with the given hash has been applied."""
+    SCHEMA_MARKER.parent.mkdir(parents=True, exist_ok=True)
+    SCHEMA_MARKER.write_text(schema_hash)
 
 def main():
     """Main function to create all tables."""
+    schema_hash = hashlib.sha256(CREATE_TABLES_SQL.encode()).hexdigest()
+
+    # Skip every round-trip when this exact schema was already applied
+    force = "--force" in sys.argv or "--seed" in sys.argv
+    if not force and SCHEMA_MARKER.exists() and SCHEMA_MARKER.read_text() == schema_hash:
+        print("✅ Tables up to date (cached — schema already applied). Use --force to re-run.")
+        return
+
     print("Starting table creation...")
+    supabase = create_supabase_client()
 
     # Create tables
-    market_data_success = create_market_data_table()
-    reports_success = create_reports_table()
-    queries_success = create_queries_table()
-    workflows_success = create_workflows_table()
+    ensure_tables(supabase)
+
+    # Verify which tables are now present
+    try:
+        existing = existing_tables(supabase)
+    except Exception as e:
+        print(f"❌ Error checking existing tables: {e}")
+        existing = set()
 
     # Summary
     print("\nTable creation summary:")
-    print(f"market_data: {'✅ Success' if market_data_success else '❌ Failed'}")
-    print(f"reports: {'✅ Success' if reports_success else '❌ Failed'}")
-    print(f"queries: {'✅ Success' if queries_success else '❌ Failed'}")
-    print(f"workflows: {'✅ Success' if workflows_success else '❌ Failed'}")
+    for table_name in TABLE_NAMES:
+        print(f"{table_name}: {'✅ Success' if table_name in existing else '❌ Failed'}")
 
-    if market_data_success and reports_success and queries_success and workflows_success:
+    if existing.issuperset(TABLE_NAMES):
         print("\n✅ All tables created successfully.")
+        if "--seed" in sys.argv:
+            seed_tables(supabase)
+        # Only mark the schema as applied once the script exits cleanly
+        atexit.register(write_schema_marker, schema_hash)
         print("Now run setup_supabase.py to populate the tables with sample data.")
     else:
         print("\n⚠️ Some tables could not be created.")
@@ -4,7 +4,17 @@ from dotenv import load_dotenv
 from supabase import create_client, Client
 import json
 import subprocess
-import pkg_resources
+import functools
+from importlib.metadata import version
+
+# Make the application package importable when running this script directly
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "market_intelligence_app"))
+from db.schema import TABLES
+
+@functools.lru_cache(maxsize=1)
+def _supabase_version():
+    """Return the installed supabase-py version, looked up once per process."""
+    return version("supabase")
 
 def check_supabase_version():
     """
@@ -12,7 +22,7 @@ def check_supabase_version():
     """
     try:
         # Get the installed version of supabase-py
-        supabase_version = pkg_resources.get_distribution("supabase").version
+        supabase_version = _supabase_version()
         print(f"Current supabase-py version: {supabase_version}")
 
         # Check if the version is compatible
@@ -82,16 +92,24 @@ def check_and_fix_supabase_connection():
                 # If it's a different TypeError, re-raise it
                 raise
 
-        # Test connection by querying tables
-        tables = ["market_data", "reports", "queries", "workflows"]
-        for table in tables:
-            try:
-                response = supabase.table(table).select("id").limit(1).execute()
-                print(f"✅ Table '{table}' exists and is accessible.")
-            except Exception as e:
-                print(f"❌ Error accessing table '{table}': {e}")
+        # Test connection by looking up every expected table in one round-trip
+        names = ", ".join(f"'{name}'" for name in TABLES)
+        response = supabase.rpc("exec_sql", {
+            "query": f"SELECT table_name FROM information_schema.tables WHERE table_schema='public' AND table_name = ANY(ARRAY[{names}])"
+        }).execute()
+        existing = {row["table_name"] for row in (response.data or [])}
+        missing = set(TABLES) - existing
+
+        all_ok = True
+        for table in TABLES:
+            if table in missing:
+                print(f"❌ Table '{table}' does not exist.")
                 print(f"You may need to run setup_supabase.py to create the table.")
-                return False
+                all_ok = False
+            else:
+                print(f"✅ Table '{table}' exists and is accessible.")
+        if not all_ok:
+            return False
 
         print("\n✅ Supabase connection is working correctly.")
         return True
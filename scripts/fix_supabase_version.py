@@ -1,6 +1,12 @@
 import sys
 import subprocess
-import pkg_resources
+import functools
+from importlib.metadata import version, PackageNotFoundError
+
+@functools.lru_cache(maxsize=1)
+def _supabase_version():
+    """Return the installed supabase-py version, looked up once per process."""
+    return version("supabase")
 
 def fix_supabase_version():
     """
@@ -11,9 +17,9 @@ def fix_supabase_version():
     try:
         # Get the installed version of supabase-py
         try:
-            supabase_version = pkg_resources.get_distribution("supabase").version
+            supabase_version = _supabase_version()
             print(f"Current supabase-py version: {supabase_version}")
-        except pkg_resources.DistributionNotFound:
+        except PackageNotFoundError:
             print("supabase-py is not installed. Installing compatible version...")
             supabase_version = None
 
@@ -21,8 +27,9 @@ def fix_supabase_version():
         print("Installing a compatible version of supabase-py (0.7.1)...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", "supabase==0.7.1"])
 
-        # Verify the installation
-        new_version = pkg_resources.get_distribution("supabase").version
+        # Verify the installation (the cached version predates the install)
+        _supabase_version.cache_clear()
+        new_version = _supabase_version()
         print(f"✅ Successfully installed supabase-py version {new_version}")
         print("\nPlease restart your application for the changes to take effect.")
         print("You can now run the application with:")
@@ -1,7 +1,10 @@
 import os
+import re
 import requests
 import json
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load environment variables
 load_dotenv()
@@ -13,16 +16,23 @@ supabase_key = os.environ.get("SUPABASE_KEY")
 if not supabase_url or not supabase_key:
     raise ValueError("Missing Supabase credentials. Please set SUPABASE_URL and SUPABASE_KEY in your .env file.")
 
+# Shared HTTP session so every request reuses the same keep-alive connection
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
+_session.headers.update({
+    "apikey": supabase_key,
+    "Authorization": f"Bearer {supabase_key}",
+    "Content-Type": "application/json",
+    "Prefer": "return=minimal"
+})
+
 # Function to execute SQL commands
 def execute_sql(sql_command):
     """Execute a SQL command using the Supabase REST API."""
-    headers = {
-        "apikey": supabase_key,
-        "Authorization": f"Bearer {supabase_key}",
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal"
-    }
-
     # Endpoint for executing SQL
     endpoint = f"{supabase_url}/rest/v1/rpc/exec_sql"
 
@@ -32,8 +42,8 @@ def execute_sql(sql_command):
     }
 
     try:
-        response = requests.post(endpoint, headers=headers, json=payload)
-        if response.status_code == 200:
+        response = _session.post(endpoint, json=payload, timeout=30)
+        if response.ok:
             print(f"✅ SQL command executed successfully.")
             return True
         else:
@@ -55,35 +65,35 @@ def read_sql_file(file_path):
         print(f"❌ Error reading SQL file: {e}")
         return None
 
+# Quoted strings (with doubled-quote escapes) or a statement-terminating semicolon
+_TOKEN_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|;", re.DOTALL)
+
 # Split SQL commands
 def split_sql_commands(sql_content):
     """Split SQL content into individual commands."""
     # Split by semicolon, but ignore semicolons inside quotes
     commands = []
-    current_command = ""
-    in_quotes = False
-    quote_char = None
-
-    for char in sql_content:
-        if char in ["'", '"'] and (not in_quotes or quote_char == char):
-            in_quotes = not in_quotes
-            if in_quotes:
-                quote_char = char
-            else:
-                quote_char = None
-
-        current_command += char
+    prev = 0
 
-        if char == ";" and not in_quotes:
-            commands.append(current_command.strip())
-            current_command = ""
+    for match in _TOKEN_RE.finditer(sql_content):
+        if match.group() == ";":
+            commands.append(sql_content[prev:match.end()].strip())
+            prev = match.end()
 
     # Add the last command if it doesn't end with a semicolon
-    if current_command.strip():
-        commands.append(current_command.strip())
+    if sql_content[prev:].strip():
+        commands.append(sql_content[prev:].strip())
 
     return commands
 
+# Number of statements sent per request when falling back to batched execution
+BATCH = 50
+
+# Wrap SQL in a single transaction
+def wrap_in_transaction(sql_content):
+    """Wrap SQL content in one transaction with synchronous commit disabled."""
+    return "BEGIN;\nSET LOCAL synchronous_commit = OFF;\n" + sql_content + "\nCOMMIT;"
+
 # Main function
 def main():
     """Main function to execute SQL setup."""
@@ -94,19 +104,23 @@ def main():
     if not sql_content:
         return
 
-    # Split into commands
-    commands = split_sql_commands(sql_content)
-    print(f"Found {len(commands)} SQL commands to execute.")
+    # Postgres accepts multiple statements per call, so send the whole file at once
+    print("Executing SQL file in a single transaction...")
+    if execute_sql(wrap_in_transaction(sql_content)):
+        print("\nSQL setup completed.")
+        print("Now run setup_supabase.py to populate the tables with sample data.")
+        return
 
-    # Execute each command
-    success_count = 0
-    for i, command in enumerate(commands):
-        if command and not command.startswith("--"):  # Skip comments
-            print(f"\nExecuting command {i+1}/{len(commands)}:")
-            print(f"{command[:100]}..." if len(command) > 100 else command)
+    # Fall back to batches so errors can be narrowed down to a group of statements
+    commands = [command for command in split_sql_commands(sql_content) if command]
+    print(f"\nRetrying {len(commands)} SQL commands in batches of {BATCH}.")
 
-            if execute_sql(command):
-                success_count += 1
+    success_count = 0
+    for start in range(0, len(commands), BATCH):
+        batch = commands[start:start + BATCH]
+        print(f"\nExecuting commands {start + 1}-{start + len(batch)}/{len(commands)}:")
+        if execute_sql(wrap_in_transaction("\n".join(batch))):
+            success_count += len(batch)
 
     print(f"\nSQL setup completed. {success_count}/{len(commands)} commands executed successfully.")
     print("Now run setup_supabase.py to populate the tables with sample data.")
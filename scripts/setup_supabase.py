@@ -6,9 +6,15 @@ This script creates the necessary tables in Supabase if they don't exist.
 
 import os
 import sys
-import json
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+# Make the application package importable when running this script directly
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "market_intelligence_app"))
+from db.schema import TABLES
 
 # Load environment variables
 load_dotenv()
@@ -21,8 +27,11 @@ if not SUPABASE_URL or not SUPABASE_KEY:
     print("❌ Error: SUPABASE_URL and SUPABASE_KEY must be set in .env file")
     sys.exit(1)
 
-def create_supabase_client() -> Client:
+def create_supabase_client() -> "Client":
     """Create and return a Supabase client."""
+    # supabase pulls in httpx, gotrue and postgrest; only pay for it when connecting
+    from supabase import create_client
+
     try:
         client = create_client(SUPABASE_URL, SUPABASE_KEY)
         print(f"✅ Successfully connected to Supabase at {SUPABASE_URL}")
@@ -31,37 +40,44 @@ def create_supabase_client() -> Client:
         print(f"❌ Error connecting to Supabase: {e}")
         sys.exit(1)
 
+def _table_exists(client, table_name):
+    """Check the Postgres catalog for a table in the public schema."""
+    response = client.rpc("exec_sql", {
+        "query": f"SELECT EXISTS(SELECT 1 FROM information_schema.tables WHERE table_schema='public' AND table_name='{table_name}')"
+    }).execute()
+    rows = response.data or []
+    return bool(rows and rows[0].get("exists"))
+
 def create_table_if_not_exists(client, table_name, schema):
     """Create a table if it doesn't exist."""
     try:
-        # Check if table exists by trying to select from it
-        try:
-            response = client.table(table_name).select("*").limit(1).execute()
+        # Check if table exists without reading any of its rows
+        if _table_exists(client, table_name):
             print(f"✅ Table '{table_name}' already exists")
             return True
-        except Exception:
-            # Table doesn't exist, create it
-            print(f"Creating table '{table_name}'...")
-
-            # For version 0.7.1, we need to use SQL to create tables
-            # This is a simplified approach - in a production environment,
-            # you would use migrations or a more robust schema management system
-
-            # Convert schema to SQL
-            columns = []
-            for col_name, col_type in schema.items():
-                columns.append(f"{col_name} {col_type}")
-
-            sql = f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                {', '.join(columns)}
-            );
-            """
-
-            # Execute SQL
-            response = client.rpc("exec_sql", {"query": sql}).execute()
-            print(f"✅ Table '{table_name}' created successfully")
-            return True
+
+        # Table doesn't exist, create it
+        print(f"Creating table '{table_name}'...")
+
+        # For version 0.7.1, we need to use SQL to create tables
+        # This is a simplified approach - in a production environment,
+        # you would use migrations or a more robust schema management system
+
+        # Convert schema to SQL
+        columns = []
+        for col_name, col_type in schema.items():
+            columns.append(f"{col_name} {col_type}")
+
+        sql = f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            {', '.join(columns)}
+        );
+        """
+
+        # Execute SQL
+        response = client.rpc("exec_sql", {"query": sql}).execute()
+        print(f"✅ Table '{table_name}' created successfully")
+        return True
 
     except Exception as e:
         print(f"❌ Error creating table '{table_name}': {e}")
@@ -71,51 +87,13 @@ def main():
     """Main function to set up Supabase tables."""
     client = create_supabase_client()
 
-    # Define table schemas
-    schemas = {
-        "market_data": {
-            "id": "text PRIMARY KEY",
-            "sector": "text",
-            "country": "text",
-            "data_point": "text",
-            "custom_keyword": "text",
-            "content": "text",
-            "date": "timestamp with time zone",
-            "metadata": "jsonb",
-            "created_at": "timestamp with time zone DEFAULT now()"
-        },
-        "reports": {
-            "id": "text PRIMARY KEY",
-            "sector": "text",
-            "country": "text",
-            "financial_product": "text",
-            "custom_keyword": "text",
-            "title": "text",
-            "content": "text",
-            "date": "timestamp with time zone",
-            "metadata": "jsonb",
-            "created_at": "timestamp with time zone DEFAULT now()"
-        },
-        "queries": {
-            "id": "text PRIMARY KEY",
-            "query_text": "text",
-            "response": "text",
-            "entities": "jsonb",
-            "intent": "text",
-            "agent_type": "text",
-            "custom_keyword": "text",
-            "timestamp": "timestamp with time zone",
-            "created_at": "timestamp with time zone DEFAULT now()"
-        }
-    }
-
     # Create tables
     success_count = 0
-    for table_name, schema in schemas.items():
+    for table_name, schema in TABLES.items():
         if create_table_if_not_exists(client, table_name, schema):
             success_count += 1
 
-    print(f"\nSetup complete: {success_count}/{len(schemas)} tables created or verified.")
+    print(f"\nSetup complete: {success_count}/{len(TABLES)} tables created or verified.")
 
     # Insert test data if needed
     if "--with-test-data" in sys.argv:
@@ -6,53 +6,106 @@ before starting the Streamlit application.
 """
 
 import os
+import re
 import sys
 import subprocess
 import platform
 import shutil
+import hashlib
+import importlib.metadata
 from pathlib import Path
 
-def check_dependencies():
-    """Check if required packages are installed and install them if needed."""
-    print("Checking dependencies...")
+# Marker recording the hash of the requirements file last installed successfully
+DEPS_MARKER = Path(".cache/deps_ok")
 
-    # Check if pip is available
+def requirements_hash():
+    """Return the SHA-256 of requirements.txt, or None if it cannot be read."""
     try:
-        subprocess.check_call([sys.executable, "-m", "pip", "--version"],
-                             stdout=subprocess.DEVNULL,
-                             stderr=subprocess.DEVNULL)
-    except subprocess.CalledProcessError:
-        print("Error: pip is not available. Please install pip first.")
-        return False
-
-    # Install required packages
+        return hashlib.sha256(Path("requirements.txt").read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+def normalize_package_name(name):
+    """Normalize a distribution name so that e.g. Python_Dotenv matches python-dotenv."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def read_requirements():
+    """Map normalized package names to their requirement lines in requirements.txt."""
+    requirements = {}
+    for line in Path("requirements.txt").read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            name = re.split(r"[<>=!~;\[ ]", line, maxsplit=1)[0]
+            requirements[normalize_package_name(name)] = line
+    return requirements
+
+def installed_packages():
+    """Map the normalized names of all installed distributions to their versions."""
+    return {normalize_package_name(dist.metadata['Name']): dist.version
+            for dist in importlib.metadata.distributions() if dist.metadata['Name']}
+
+def needs_install(line, installed):
+    """Return True if the requirement line is missing or not satisfied by the installed version."""
     try:
-        print("Installing required packages...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", "requirements.txt"])
-    except subprocess.CalledProcessError:
-        print("Error: Failed to install required packages.")
-        return False
+        from packaging.requirements import InvalidRequirement, Requirement
+    except ImportError:
+        # Without packaging, only exact pins can be checked
+        version = installed.get(normalize_package_name(re.split(r"[<>=!~;\[ ]", line, maxsplit=1)[0]))
+        pinned = re.search(r"==\s*([^;,\s]+)", line)
+        return version is None or (pinned is not None and version != pinned.group(1))
 
-    # Specifically check for openai
     try:
-        import importlib.util
-        if importlib.util.find_spec("openai") is None:
-            print("OpenAI package not found. Installing it specifically...")
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "openai"])
-    except (ImportError, subprocess.CalledProcessError):
-        print("Error: Failed to install OpenAI package.")
+        requirement = Requirement(line)
+    except InvalidRequirement:
+        # Let pip deal with lines it understands and packaging doesn't (URLs, options)
+        return True
+    if requirement.marker is not None and not requirement.marker.evaluate():
         return False
+    version = installed.get(normalize_package_name(requirement.name))
+    return version is None or not requirement.specifier.contains(version, prereleases=True)
+
+def check_dependencies(refresh=False):
+    """Check if required packages are installed and install them if needed."""
+    print("Checking dependencies...")
+
+    # Skip pip entirely when requirements.txt is unchanged since the last install
+    req_hash = requirements_hash()
+    if not refresh and req_hash and DEPS_MARKER.exists() and DEPS_MARKER.read_text() == req_hash:
+        print("Dependencies unchanged since last install. Use --refresh-deps to reinstall.")
+        return True
 
-    # Check for streamlit
-    streamlit_path = shutil.which("streamlit")
-    if not streamlit_path:
-        print("Streamlit not found. Installing it specifically...")
+    # Compare requirements against the installed versions without spawning pip
+    requirements = read_requirements()
+    installed = installed_packages()
+    if refresh:
+        to_install = list(requirements.values())
+    else:
+        to_install = [line for line in requirements.values() if needs_install(line, installed)]
+
+    if to_install:
+        # Check if pip is available
         try:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", "streamlit"])
+            subprocess.check_call([sys.executable, "-m", "pip", "--version"],
+                                 stdout=subprocess.DEVNULL,
+                                 stderr=subprocess.DEVNULL)
         except subprocess.CalledProcessError:
-            print("Error: Failed to install Streamlit.")
+            print("Error: pip is not available. Please install pip first.")
             return False
 
+        # Install only the missing or outdated packages, in a single pip run
+        try:
+            print(f"Installing required packages: {', '.join(to_install)}")
+            subprocess.check_call([sys.executable, "-m", "pip", "install", *to_install])
+        except subprocess.CalledProcessError:
+            print("Error: Failed to install required packages.")
+            return False
+    else:
+        print("All required packages are already installed.")
+
+    if req_hash:
+        DEPS_MARKER.parent.mkdir(parents=True, exist_ok=True)
+        DEPS_MARKER.write_text(req_hash)
+
     return True
 
 def check_environment():
@@ -67,24 +120,16 @@ def check_environment():
         if env_example.exists():
             response = input("Would you like to create a .env file from .env.example? (y/n): ")
             if response.lower() == 'y':
-                with open(env_example, 'r') as src, open(env_file, 'w') as dst:
-                    dst.write(src.read())
+                shutil.copyfile(env_example, env_file)
                 print("Created .env file from .env.example. Please edit it with your API keys.")
                 return False
 
+    # Load the .env file without overriding variables already exported in the shell
+    from dotenv import load_dotenv
+    load_dotenv(env_file, override=False)
+
     # Check for OpenAI API key
     openai_key = os.environ.get("OPENAI_API_KEY")
-    if not openai_key:
-        # Try to load from .env file if it exists
-        if env_file.exists():
-            with open(env_file, 'r') as f:
-                for line in f:
-                    if line.strip() and not line.startswith('#'):
-                        key, value = line.strip().split('=', 1)
-                        if key == "OPENAI_API_KEY":
-                            openai_key = value
-                            os.environ["OPENAI_API_KEY"] = value
-
     if not openai_key:
         print("Error: OPENAI_API_KEY environment variable is not set.")
         print("Please set it in your .env file or export it in your shell.")
@@ -102,6 +147,14 @@ def start_application():
     """Start the Streamlit application."""
     print("Starting Streamlit server...")
 
+    # Replace this launcher process with Streamlit instead of keeping it alive as a parent
+    streamlit = shutil.which("streamlit")
+    if streamlit and platform.system() != "Windows":
+        try:
+            os.execv(streamlit, [streamlit, "run", "multi_agent_app.py"])
+        except OSError as e:
+            print(f"Warning: Could not exec Streamlit ({e}). Falling back to a subprocess.")
+
     try:
         # Use subprocess.run instead of check_call to capture output
         result = subprocess.run(["streamlit", "run", "multi_agent_app.py"],
@@ -131,7 +184,7 @@ def main():
         print("Not running in a virtual environment. Using system Python.")
 
     # Check dependencies and environment
-    if not check_dependencies():
+    if not check_dependencies(refresh="--refresh-deps" in sys.argv):
         print("Failed to install required dependencies. Exiting.")
         sys.exit(1)
 
@@ -1,18 +1,292 @@
 import os
+import re
 import json
-from dotenv import load_dotenv
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import threading
+import weakref
+from collections import defaultdict, deque
+from typing import ClassVar, Optional
 from abc import ABC, abstractmethod
-from openai import OpenAI # Import the OpenAI class
+import openai
+from openai import OpenAI, AsyncOpenAI # Import the OpenAI client classes
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+import config.settings # noqa: F401 -- loads .env once for every agent
 
-# Remove old global configuration
-# load_dotenv()
-# openai.api_key = os.environ.get("OPENAI_API_KEY")
+log = logging.getLogger(__name__)
+
+# Process-wide OpenAI client, so every agent reuses one HTTP connection pool
+_SHARED_CLIENT: Optional[OpenAI] = None
+_WARMED_UP = False
+
+def _http_limits():
+    """
+    Connection pool limits shared by the sync and async OpenAI clients.
+    """
+    import httpx
+    return httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+def get_shared_client() -> OpenAI:
+    """
+    Returns the process-wide OpenAI client, creating it on first use.
+    """
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is None:
+        import httpx
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable not found.")
+        _SHARED_CLIENT = OpenAI(
+            api_key=api_key,
+            http_client=httpx.Client(limits=_http_limits(), timeout=30.0)
+        )
+    return _SHARED_CLIENT
+
+def warm_up_shared_client() -> OpenAI:
+    """
+    Creates the shared OpenAI client and opens its first connection, so the TLS
+    handshake happens at startup instead of on the first user query. Only the
+    first call sends a request.
+
+    Returns:
+        OpenAI: The shared client
+    """
+    global _WARMED_UP
+    client = get_shared_client()
+    if _WARMED_UP:
+        return client
+    _WARMED_UP = True
+    try:
+        # Cheapest authenticated request; costs no tokens
+        client.models.retrieve("gpt-4o-mini")
+    except Exception as e:
+        log.warning("OpenAI warm-up request failed: %s", e)
+    return client
+
+# Long-lived event loop, in a daemon thread, on which the synchronous entry points
+# run their coroutines. Keeping one loop keeps one async client, and so its open
+# connections, across requests.
+_BACKGROUND_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_BACKGROUND_LOOP_LOCK = threading.Lock()
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the shared background event loop, starting its thread on first use.
+    """
+    global _BACKGROUND_LOOP
+    with _BACKGROUND_LOOP_LOCK:
+        if _BACKGROUND_LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="agent-event-loop", daemon=True).start()
+            _BACKGROUND_LOOP = loop
+    return _BACKGROUND_LOOP
+
+def submit_async(coro):
+    """
+    Schedules a coroutine on the shared background event loop.
+
+    Returns:
+        concurrent.futures.Future: The future of the coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop())
+
+def run_async(coro):
+    """
+    Runs a coroutine on the shared background event loop and waits for its result.
+    Used by the synchronous process() wrappers in place of asyncio.run(), which
+    would create, and then discard, a new loop and async client on every call.
+
+    Must not be called from that loop itself, as it would wait on itself forever.
+    """
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_async() called from the agent event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+# Transient API failures worth retrying; anything else fails immediately
+_RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+_backoff = wait_random_exponential(min=1, max=30)
+# Longest Retry-After honoured; a larger value is capped rather than stalling the caller
+_MAX_RETRY_AFTER = 60
+
+def _retry_wait(retry_state):
+    """
+    Wait for the server's Retry-After on rate limits (at most _MAX_RETRY_AFTER seconds),
+    otherwise back off exponentially with jitter.
+    """
+    error = retry_state.outcome.exception()
+    if isinstance(error, openai.RateLimitError) and error.response is not None:
+        try:
+            wait = float(error.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            wait = 0
+        if wait > 0:
+            return min(wait, _MAX_RETRY_AFTER)
+    return _backoff(retry_state)
+
+_openai_retry = retry(
+    wait=_retry_wait,
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+    reraise=True,
+)
+
+_RESET_PART_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_RESET_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def _parse_reset(value):
+    """
+    Converts an x-ratelimit-reset-* duration such as "6m0s" or "20ms" to seconds.
+    """
+    return sum(float(amount) * _RESET_UNITS[unit] for amount, unit in _RESET_PART_RE.findall(value or ""))
+
+class RateLimiter:
+    """
+    Client-side view of one model's OpenAI rate limits, fed from the
+    x-ratelimit-* headers of each response. Once a request or token budget is
+    used up, callers wait for it to reset instead of sending a request that
+    would come back as a 429.
+    """
+
+    def __init__(self):
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self._requests_reset_at = 0.0
+        self._tokens_reset_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        """
+        Records the remaining budgets reported by a response.
+
+        Args:
+            headers (Mapping): The HTTP response headers
+        """
+        now = time.monotonic()
+        with self._lock:
+            try:
+                if "x-ratelimit-remaining-requests" in headers:
+                    self.remaining_requests = int(headers["x-ratelimit-remaining-requests"])
+                    self._requests_reset_at = now + _parse_reset(headers.get("x-ratelimit-reset-requests"))
+                if "x-ratelimit-remaining-tokens" in headers:
+                    self.remaining_tokens = int(headers["x-ratelimit-remaining-tokens"])
+                    self._tokens_reset_at = now + _parse_reset(headers.get("x-ratelimit-reset-tokens"))
+            except ValueError:
+                log.debug("Ignoring malformed rate limit headers")
+
+    def _reserve(self, estimated_tokens):
+        """
+        Claims one request and the estimated tokens from the budget.
+
+        Returns:
+            float: Seconds to wait before sending the request (0 if it can go now)
+        """
+        now = time.monotonic()
+        with self._lock:
+            wait = 0.0
+            if self.remaining_requests is not None:
+                if self.remaining_requests <= 0 and now < self._requests_reset_at:
+                    wait = self._requests_reset_at - now
+                self.remaining_requests -= 1
+            if self.remaining_tokens is not None:
+                if self.remaining_tokens < estimated_tokens and now < self._tokens_reset_at:
+                    wait = max(wait, self._tokens_reset_at - now)
+                self.remaining_tokens -= estimated_tokens
+            return wait
+
+    def acquire(self, estimated_tokens=0):
+        """
+        Blocks until the budget allows another request.
+        """
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            log.info("Rate limit budget exhausted; waiting %.1fs", wait)
+            time.sleep(wait)
+
+    async def acquire_async(self, estimated_tokens=0):
+        """
+        Async counterpart of acquire().
+        """
+        wait = self._reserve(estimated_tokens)
+        if wait > 0:
+            log.info("Rate limit budget exhausted; waiting %.1fs", wait)
+            await asyncio.sleep(wait)
+
+# Rate limits are tracked per model, as the API reports them
+_RATE_LIMITERS = defaultdict(RateLimiter)
+
+def _estimate_tokens(kwargs):
+    """
+    Rough token count of a request (about four characters per token).
+    """
+    text = kwargs.get("input") or "".join(str(m.get("content") or "") for m in kwargs.get("messages", ()))
+    return len(str(text)) // 4 + (kwargs.get("max_tokens") or 0)
+
+@_openai_retry
+def _create_completion(client, **kwargs):
+    limiter = _RATE_LIMITERS[kwargs.get("model")]
+    limiter.acquire(_estimate_tokens(kwargs))
+    raw = client.chat.completions.with_raw_response.create(**kwargs)
+    limiter.update(raw.headers)
+    return raw.parse()
+
+@_openai_retry
+def _create_embedding_request(client, **kwargs):
+    limiter = _RATE_LIMITERS[kwargs.get("model")]
+    limiter.acquire(_estimate_tokens(kwargs))
+    raw = client.embeddings.with_raw_response.create(**kwargs)
+    limiter.update(raw.headers)
+    return raw.parse()
+
+# The semaphore is taken per attempt so that backoff sleeps don't hold a slot
+@_openai_retry
+async def _create_completion_async(client, semaphore, **kwargs):
+    limiter = _RATE_LIMITERS[kwargs.get("model")]
+    async with semaphore:
+        await limiter.acquire_async(_estimate_tokens(kwargs))
+        raw = await client.chat.completions.with_raw_response.create(**kwargs)
+    limiter.update(raw.headers)
+    return raw.parse()
+
+@_openai_retry
+async def _create_embedding_request_async(client, semaphore, **kwargs):
+    limiter = _RATE_LIMITERS[kwargs.get("model")]
+    async with semaphore:
+        await limiter.acquire_async(_estimate_tokens(kwargs))
+        raw = await client.embeddings.with_raw_response.create(**kwargs)
+    limiter.update(raw.headers)
+    return raw.parse()
 
 class BaseAgent(ABC):
     """
     Abstract base class for all agents.
     """
 
+    # Fixed system prompt; subclasses with a static prompt set this instead of
+    # overriding _get_system_prompt(). Keeping it byte-identical across calls lets
+    # OpenAI's automatic prompt caching discount the shared prefix, which pays off
+    # from the second identical request onwards.
+    SYSTEM_PROMPT: ClassVar[Optional[str]] = None
+
+    # Number of most recent context messages kept and sent with each query
+    max_context_messages = 20
+
+    # Upper bound on concurrent OpenAI requests issued from one event loop
+    max_concurrent_requests = 8
+
+    # Async client and semaphore per event loop, shared by every agent on that loop.
+    # The synchronous entry points all use the background loop (see run_async), so
+    # in practice there is one per process, plus one per DataCollectorWorker.
+    _async_state = weakref.WeakKeyDictionary()
+
     def __init__(self, name: str, description: str, openai_client: OpenAI = None):
         """
         Initializes the BaseAgent.
@@ -24,9 +298,24 @@ class BaseAgent(ABC):
         """
         self.name = name
         self.description = description
-        self.client = openai_client # Store the passed client
-        self.system_prompt = self._get_system_prompt()
-        self.context = []
+        self._client = openai_client # Store the passed client; see the client property
+        self.system_prompt = self.SYSTEM_PROMPT or self._get_system_prompt()
+        self.context = deque(maxlen=self.max_context_messages)
+
+    @property
+    def client(self) -> OpenAI:
+        """
+        The OpenAI client used by this agent. Falls back to the process-wide shared
+        client when none was injected, so every call reuses one connection pool.
+        """
+        if self._client is None:
+            log.warning("OpenAI client not explicitly provided to %s; using the shared default client.", self.name)
+            self._client = get_shared_client()
+        return self._client
+
+    @client.setter
+    def client(self, value: OpenAI):
+        self._client = value
 
     def _get_system_prompt(self):
         """
@@ -38,11 +327,9 @@ class BaseAgent(ABC):
     def add_context(self, role, content):
         """
         Adds a message to the agent's context.
+        Only the most recent max_context_messages entries are kept.
         """
         self.context.append({"role": role, "content": content})
-        # Optional: Limit context size
-        # MAX_CONTEXT_SIZE = 10
-        # self.context = self.context[-MAX_CONTEXT_SIZE:]
 
     def query(self, query, temperature=0.7, model="gpt-4o-mini"):
         """
@@ -60,6 +347,21 @@ class BaseAgent(ABC):
 
         return response_text
 
+    async def aquery(self, query, temperature=0.7, model="gpt-4o-mini"):
+        """
+        Async counterpart of query(); awaits the API call instead of blocking.
+        """
+        messages = [
+            {"role": "system", "content": self.system_prompt}
+        ]
+        messages.extend(self.context)
+        messages.append({"role": "user", "content": query})
+
+        response_text = await self._call_openai_api_async(messages, model=model, temperature=temperature)
+        self.add_context("assistant", response_text)
+
+        return response_text
+
     @abstractmethod
     def process(self, parameters: dict) -> dict:
         """
@@ -68,33 +370,206 @@ class BaseAgent(ABC):
         """
         pass
 
-    def _call_openai_api(self, messages: list, model: str = "gpt-4o-mini", temperature: float = 0.7) -> str:
+    async def aprocess(self, parameters: dict) -> dict:
+        """
+        Async counterpart of process().
+        By default runs process() in a worker thread; agents with native async
+        implementations override it.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.process, parameters)
+
+    def _call_openai_api(self, messages: list, model: str = "gpt-4o-mini", temperature: float = 0.7, stream: bool = False, response_format: dict = None, max_tokens: int = None):
         """
         Calls the OpenAI Chat Completions API using the provided client.
+
+        With stream=True, returns an iterator over the content deltas as they are
+        generated instead of the complete response text. response_format is passed
+        through to the API, e.g. {"type": "json_object"} for JSON mode. max_tokens
+        caps the length, and so the latency, of the completion.
         """
-        if not self.client:
-            print("!!! WARNING: OpenAI client not explicitly provided to agent. Creating default client.")
-            try:
-                fallback_key = os.getenv("OPENAI_API_KEY")
-                print(f"!!! Fallback using key from os.getenv ending in: ...{fallback_key[-4:] if fallback_key else 'None'}")
-                if not fallback_key:
-                     raise ValueError("OPENAI_API_KEY environment variable not found for fallback.")
-                self.client = OpenAI(api_key=fallback_key)
-            except Exception as e:
-                 print(f"!!! Fallback client initialization failed: {e}")
-                 raise Exception(f"Failed to initialize default OpenAI client: {e}")
+        try:
+            client = self.client
+        except Exception as e:
+            log.error("Fallback client initialization failed: %s", e)
+            raise Exception(f"Failed to initialize default OpenAI client: {e}")
 
         try:
-            current_key = self.client.api_key
-            print(f"--- Making API call via BaseAgent for {self.name}. Key ending in: ...{current_key[-4:] if current_key else 'None'}")
-            response = self.client.chat.completions.create(
+            log.debug("Making API call via BaseAgent for %s (model %s)", self.name, model)
+            response = _create_completion(
+                client,
                 model=model,
                 messages=messages,
                 temperature=temperature,
+                stream=stream,
+                **self._completion_options(response_format, max_tokens),
             )
+            if stream:
+                return self._iter_stream(response)
             return response.choices[0].message.content.strip()
         except Exception as e:
             # Log the error and re-raise or return an error message
-            key_used_at_error = self.client.api_key if self.client else 'No Client'
-            print(f"!!! OpenAI API call FAILED for {self.name}. Error: {e}. Key ending in: ...{key_used_at_error[-4:] if isinstance(key_used_at_error, str) else key_used_at_error}")
+            log.error("OpenAI API call failed for %s: %s", self.name, e)
             raise Exception(f"OpenAI API call failed: {e}")
+
+    @staticmethod
+    def _completion_options(response_format=None, max_tokens=None):
+        """
+        Returns the optional keyword arguments for chat.completions.create.
+        """
+        options = {}
+        if response_format is not None:
+            options["response_format"] = response_format
+        if max_tokens is not None:
+            options["max_tokens"] = max_tokens
+        return options
+
+    @staticmethod
+    def _iter_stream(response):
+        """
+        Yields the non-empty content deltas of a streamed chat completion.
+        """
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    @staticmethod
+    def _batch_queries_path(batch_path: str, batch_id: str = None) -> str:
+        """
+        Returns the sidecar file recording the queries of a batch input file, or of
+        the submitted batch with the given ID.
+        """
+        if batch_id is not None:
+            batch_path = f"{batch_path}.{batch_id}"
+        return f"{batch_path}.queries.jsonl"
+
+    def _submit_batch_file(self, batch_path: str) -> str:
+        """
+        Uploads a JSONL file of chat completion requests and starts a Batch API job for it.
+
+        The input file and its queries sidecar are moved aside first, so requests
+        enqueued from then on start a new batch instead of being sent again with the
+        next one. Once submitted they are kept as {batch_path}.{batch_id} for
+        drain_batch(); if the submission fails they are put back.
+
+        Returns:
+            str: The batch ID
+        """
+        client = self.client
+        staged_path = f"{batch_path}.{uuid.uuid4().hex}.submitting"
+        moves = [(batch_path, staged_path)]
+        if os.path.exists(self._batch_queries_path(batch_path)):
+            moves.append((self._batch_queries_path(batch_path), self._batch_queries_path(staged_path)))
+        for source, staged in moves:
+            os.replace(source, staged)
+
+        try:
+            with open(staged_path, "rb") as batch_file:
+                uploaded = client.files.create(file=batch_file, purpose="batch")
+            batch = client.batches.create(
+                input_file_id=uploaded.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+        except Exception:
+            # Append rather than rename back, in case requests were enqueued meanwhile
+            for source, staged in moves:
+                with open(staged, "rb") as staged_file, open(source, "ab") as source_file:
+                    shutil.copyfileobj(staged_file, source_file)
+                os.remove(staged)
+            raise
+
+        os.replace(staged_path, f"{batch_path}.{batch.id}")
+        if len(moves) > 1:
+            os.replace(self._batch_queries_path(staged_path), self._batch_queries_path(batch_path, batch.id))
+        log.info("Submitted batch %s from %s", batch.id, batch_path)
+        return batch.id
+
+    def _get_async_state(self):
+        """
+        Returns the (AsyncOpenAI client, semaphore) pair for the running event loop.
+
+        Both are bound to the loop they were created on, so each loop gets its own pair.
+        """
+        loop = asyncio.get_running_loop()
+        state = BaseAgent._async_state.get(loop)
+        if state is None:
+            api_key = self._client.api_key if self._client else os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise Exception("Failed to initialize async OpenAI client: OPENAI_API_KEY environment variable not found.")
+            import httpx
+            async_client = AsyncOpenAI(
+                api_key=api_key,
+                http_client=httpx.AsyncClient(limits=_http_limits(), timeout=30.0)
+            )
+            state = (async_client, asyncio.Semaphore(self.max_concurrent_requests))
+            BaseAgent._async_state[loop] = state
+        return state
+
+    async def _call_openai_api_async(self, messages: list, model: str = "gpt-4o-mini", temperature: float = 0.7, response_format: dict = None, max_tokens: int = None) -> str:
+        """
+        Calls the OpenAI Chat Completions API without blocking the event loop.
+        Concurrency is capped by max_concurrent_requests.
+        """
+        async_client, semaphore = self._get_async_state()
+        try:
+            log.debug("Making async API call via BaseAgent for %s (model %s)", self.name, model)
+            response = await _create_completion_async(
+                async_client,
+                semaphore,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                **self._completion_options(response_format, max_tokens),
+            )
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            log.error("Async OpenAI API call failed for %s: %s", self.name, e)
+            raise Exception(f"OpenAI API call failed: {e}")
+
+    async def _stream_openai_api_async(self, messages: list, model: str = "gpt-4o-mini", temperature: float = 0.7, max_tokens: int = None):
+        """
+        Async counterpart of _call_openai_api(stream=True): yields the non-empty
+        content deltas of the completion as they are generated.
+        """
+        async_client, semaphore = self._get_async_state()
+        try:
+            log.debug("Making async streaming API call via BaseAgent for %s (model %s)", self.name, model)
+            response = await _create_completion_async(
+                async_client,
+                semaphore,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+                **self._completion_options(max_tokens=max_tokens),
+            )
+        except Exception as e:
+            log.error("Async OpenAI API call failed for %s: %s", self.name, e)
+            raise Exception(f"OpenAI API call failed: {e}")
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _create_embedding_async(self, text: str, model: str = "text-embedding-3-small") -> list:
+        """
+        Returns the embedding vector of the given text.
+        """
+        async_client, semaphore = self._get_async_state()
+        try:
+            response = await _create_embedding_request_async(async_client, semaphore, model=model, input=text)
+            return response.data[0].embedding
+        except Exception as e:
+            log.error("OpenAI embedding call failed for %s: %s", self.name, e)
+            raise Exception(f"OpenAI embedding call failed: {e}")
+
+    def _create_embedding(self, text: str, model: str = "text-embedding-3-small") -> list:
+        """
+        Returns the embedding vector of the given text, using the sync client.
+        """
+        try:
+            response = _create_embedding_request(self.client, model=model, input=text)
+            return response.data[0].embedding
+        except Exception as e:
+            log.error("OpenAI embedding call failed for %s: %s", self.name, e)
+            raise Exception(f"OpenAI embedding call failed: {e}")
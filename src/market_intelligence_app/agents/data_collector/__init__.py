@@ -6,3 +6,4 @@ Uses the gpt-4o-search-preview model to search the web for up-to-date informatio
 """
 
 from .agent import DataCollectorAgent
+from .worker import DataCollectorWorker
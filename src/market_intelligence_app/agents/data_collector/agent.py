@@ -1,17 +1,214 @@
-import os
+import re
 import json
-import sys
-from dotenv import load_dotenv
-from ..base_agent import BaseAgent
-from supabase_service import SupabaseService
+import time
+import uuid
+import asyncio
+import hashlib
+import functools
+import logging
+import queue
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from ..base_agent import BaseAgent, run_async
+from ..semantic_cache import SemanticCache
+from supabase_service import SupabaseService, BULK_INSERT_BATCH_SIZE
+from config.settings import RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAXSIZE, COLLECTION_CACHE_TTL, COLLECTION_CACHE_MAXSIZE
 from openai import OpenAI
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Final, Union
+from pydantic import BaseModel, Field, field_validator
+
+# orjson decodes and encodes several times faster than the stdlib; fall back if missing.
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so except clauses are unchanged.
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj, sort_keys=False):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
+
+# One reusable dateutil parser instead of the module-level parse() helper,
+# which builds a fresh parser on every call
+try:
+    from dateutil.parser import parser as _DateutilParser
+    _DATEUTIL = _DateutilParser()
+except ImportError:
+    _DATEUTIL = None
+
+# Date patterns used by _format_date, compiled once
+_YEAR_RE = re.compile(r'\b(20\d{2})\b')
+_YEAR_ONLY_RE = re.compile(r'\d{4}')
+_ISO_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+def _format_date(date_value):
+    """
+    Normalize the date of a data point to YYYY-MM-DD.
+
+    Years ("2023", "in 2023") map to January 1st of that year, other formats are
+    parsed with dateutil. Missing or unparseable dates fall back to today.
+
+    Args:
+        date_value: The date as returned by the model
+
+    Returns:
+        str: The formatted date
+    """
+    if isinstance(date_value, datetime):
+        return date_value.strftime("%Y-%m-%d")
+    if date_value is None or date_value == "":
+        return _today()
+
+    s = str(date_value).strip()
+
+    # If it's just a year (e.g., "2023"), format it properly
+    if _YEAR_ONLY_RE.fullmatch(s):
+        return f"{s}-01-01"
+
+    # Already an ISO date (e.g., "2024-01-15")
+    if _ISO_RE.match(s):
+        return s
 
-# Add parent directory to path to import base_agent
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # Try to parse various date formats, then fall back to a year in the text
+    if _DATEUTIL is not None:
+        try:
+            return _DATEUTIL.parse(s, default=datetime(datetime.now().year, 1, 1)).strftime("%Y-%m-%d")
+        except (ValueError, OverflowError):
+            pass
+    year_match = _YEAR_RE.search(s)
+    if year_match:
+        return f"{year_match.group(1)}-01-01"
+    return _today()
+
+log = logging.getLogger(__name__)
+
+# Data points requested from the model, one concurrent request each
+DATA_POINT_CATEGORIES = [
+    "market_size",
+    "growth_rate",
+    "key_players",
+    "market_trends",
+    "regulatory_factors",
+    "economic_indicators",
+]
+
+# Byte-identical on every call so the server can reuse the cached prompt prefix
+SYSTEM_PROMPT: Final[str] = """You are an expert financial analyst specializing in equipment financing markets for Market.
+Your task is to collect accurate and up-to-date Market data.
+
+When collecting data, focus on the following key data points:
+1. Market size (in EUR or USD)
+2. Growth rate (annual percentage)
+3. Key players (top companies in the Market)
+4. Market trends (emerging trends in the sector)
+5. Regulatory factors (relevant regulations affecting the Market)
+6. Economic indicators (relevant economic factors)
+
+For each data point, provide:
+- The specific value or information
+- The source of the information
+- The date of the information
+
+Each request asks for one data point. Respond with a single JSON object with 'name', 'value', 'source', and 'date' fields.
+Focus on finding quantifiable data points or key qualitative insights."""
+
+# Structured-output contract for one data point; the API guarantees a matching object
+_DATA_POINT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "market_data_point",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "value": {"type": "string"},
+                "source": {"type": "string"},
+                "date": {"type": "string"}
+            },
+            "required": ["name", "value", "source", "date"],
+            "additionalProperties": False
+        }
+    }
+}
 
-# Load environment variables
-load_dotenv()
+# Exact-match completion cache: key -> (expires_at, response_text), least recently used first
+_RESPONSE_CACHE = OrderedDict()
+# Shared by every Streamlit session thread and the background event loop
+_RESPONSE_CACHE_LOCK = threading.Lock()
+
+def _response_cache_key(formatted_query, system_prompt, model):
+    """
+    Hash everything that determines the completion into a fixed-size cache key.
+    """
+    payload = _dumps({"q": formatted_query, "sys": system_prompt, "model": model}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _response_cache_get(key):
+    """
+    Return the cached response text, dropping the entry if it has expired.
+    """
+    with _RESPONSE_CACHE_LOCK:
+        entry = _RESPONSE_CACHE.get(key)
+        if entry is None:
+            return None
+        expires_at, response_text = entry
+        if expires_at < time.monotonic():
+            del _RESPONSE_CACHE[key]
+            return None
+        _RESPONSE_CACHE.move_to_end(key)
+        return response_text
+
+def _response_cache_set(key, response_text):
+    """
+    Cache a response for RESPONSE_CACHE_TTL seconds, evicting the least recently used entries.
+    """
+    with _RESPONSE_CACHE_LOCK:
+        _RESPONSE_CACHE[key] = (time.monotonic() + RESPONSE_CACHE_TTL, response_text)
+        _RESPONSE_CACHE.move_to_end(key)
+        while len(_RESPONSE_CACHE) > RESPONSE_CACHE_MAXSIZE:
+            _RESPONSE_CACHE.popitem(last=False)
+
+class DataPoint(BaseModel):
+    """
+    A single data point returned by the model, with the defaults used when storing it.
+    """
+    name: str
+    value: Union[str, int, float, list, dict]
+    source: str = "LLM Response"
+    date: str = Field(default_factory=_today)
+
+    @field_validator("source", mode="before")
+    @classmethod
+    def _default_source(cls, value):
+        return "LLM Response" if value is None else value
+
+    @field_validator("date", mode="before")
+    @classmethod
+    def _normalize_date(cls, value):
+        return _format_date(value)
+
+# Default Batch API input file used by enqueue()/submit_batch()/drain_batch()
+DEFAULT_BATCH_PATH = ".cache/batches/data_collection.jsonl"
+
+# Static prompt skeletons; only the small dynamic slots are substituted per call
+_SCOPE_TEMPLATE = "the {sector} sector{country_clause}{product_clause}{keyword_clause}"
+_QUERY_TEMPLATE = """Your response MUST be a JSON object with the following keys: "name" (string, the requested data point), "value" (string), "source" (string, cite your source), and "date" (string, YYYY-MM-DD or year).
+
+Example of the exact expected format:
+{{
+  "name": "market_size",
+  "value": "€5.2 billion",
+  "source": "Example Report 2024",
+  "date": "2024"
+}}
+
+Collect the "{category}" Market data point for {scope}."""
 
 class DataCollectorAgent(BaseAgent):
     """
@@ -34,51 +231,39 @@ class DataCollectorAgent(BaseAgent):
         # Store the desired model for this agent if needed for API calls
         self.model = "gpt-4o" # Or whichever model this agent should use
 
-    def _get_system_prompt(self):
+    # Exact-match cache: canonical (sector, country, product, keyword) ->
+    # (expires_at, collected data), least recently used first
+    _exact_cache = OrderedDict()
+    _exact_cache_lock = threading.Lock()
+    # Whether the persisted llm_cache rows have been loaded into this process
+    _cache_loaded = False
+
+    # Cosine similarity above which a previous result is reused
+    SEMANTIC_CACHE_THRESHOLD = 0.95
+    EMBEDDING_MODEL = "text-embedding-3-small"
+
+    # Semantic cache of collected data, bucketed by (sector, country, product) so that
+    # a query for one country never reuses another country's data points
+    _embed_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD, ttl=COLLECTION_CACHE_TTL)
+
+    # Shared module-level prompt; BaseAgent uses it instead of _get_system_prompt()
+    SYSTEM_PROMPT = SYSTEM_PROMPT
+
+    def process(self, query):
         """
-        Get the system prompt for the Data Collector Agent.
+        Process a data collection query and store the results in Supabase.
+
+        Synchronous wrapper around aprocess() for callers without an event loop.
+
+        Args:
+            query (dict): The query parameters, see aprocess()
 
         Returns:
-            str: The system prompt
-        """
-        return """
-        You are an expert financial analyst specializing in equipment financing markets for Market.
-        Your task is to collect accurate and up-to-date Market data.
-
-        When collecting data, focus on the following key data points:
-        1. Market size (in EUR or USD)
-        2. Growth rate (annual percentage)
-        3. Key players (top companies in the Market)
-        4. Market trends (emerging trends in the sector)
-        5. Regulatory factors (relevant regulations affecting the Market)
-        6. Economic indicators (relevant economic factors)
-
-        For each data point, provide:
-        - The specific value or information
-        - The source of the information
-        - The date of the information
-
-        Format your response as structured data that can be easily parsed and stored in a database.
-
-        IMPORTANT: Your response MUST be in JSON format with an array of data points. Each data point should have 'name', 'value', 'source', and 'date' fields.
-        Example format:
-        [
-            {
-                "name": "market_size",
-                "value": "€5.2 billion",
-                "source": "Source Name",
-                "date": "2023"
-            },
-            {
-                "name": "growth_rate",
-                "value": "4.7% annual growth",
-                "source": "Source Name",
-                "date": "2023"
-            }
-        ]
-        """ + " Focus on finding quantifiable data points or key qualitative insights."
+            dict: The collected data
+        """
+        return run_async(self.aprocess(query))
 
-    def process(self, query):
+    async def aprocess(self, query):
         """
         Process a data collection query and store the results in Supabase.
 
@@ -102,74 +287,56 @@ class DataCollectorAgent(BaseAgent):
             return {"error": "Sector is required for data collection."}
         # Removed check requiring country
 
-        # Format query for the model with strict JSON instructions
-        formatted_query = f"""
-Collect key Market data points (e.g., market_size, growth_rate, key_players, market_trends) for the {sector} sector{f' in {country}' if country else ''}{f', focusing on {financial_product} products' if financial_product else ''}{f', specifically regarding {custom_keyword}' if custom_keyword else ''}.
-
-Your response MUST be ONLY a valid JSON list of objects. Each object should represent a data point and have the following keys: "name" (string, e.g., "market_size"), "value" (string), "source" (string, cite your source), and "date" (string, YYYY-MM-DD or year).
-
-DO NOT include any introductory text, explanations, apologies, or markdown formatting like ```json. ONLY output the raw JSON list starting with [ and ending with ].
-
-Example of the exact expected format:
-[
-  {{
-    "name": "market_size",
-    "value": "€5.2 billion",
-    "source": "Example Report 2024",
-    "date": "2024"
-  }},
-  {{
-    "name": "growth_rate",
-    "value": "4.7% CAGR",
-    "source": "Market Analysis Inc.",
-    "date": "2024-01-15"
-  }}
-]
-"""
+        # Describe the scope once; every per-category request reuses it
+        scope = self._scope(sector, country, financial_product, custom_keyword)
+
+        # Exact cache tier: identical parameters skip the LLM entirely. The Supabase
+        # calls block, so they run in the default executor, off the shared event loop.
+        loop = asyncio.get_running_loop()
+        if not self._cache_loaded:
+            await loop.run_in_executor(None, self._load_persistent_cache)
+        cache_key = self._cache_key(sector, country, financial_product, custom_keyword)
+        cached = self._exact_cache_get(cache_key)
+        if cached is not None:
+            log.debug("Exact cache hit for %s", scope)
+            return {"query": query, "collected_data": cached}
+
+        # Semantic cache tier: near-duplicate queries with the same sector, country and
+        # product reuse a previous result. Hits are not copied into the exact tier, so a
+        # near miss never becomes the cached answer for these exact parameters.
+        query_vector = None
+        try:
+            query_vector = await self._create_embedding_async(scope, model=self.EMBEDDING_MODEL)
+            cached = self._embed_cache.lookup(query_vector, bucket=self._semantic_bucket(cache_key))
+            if cached is not None:
+                log.debug("Semantic cache hit for %s", scope)
+                return {"query": query, "collected_data": cached}
+        except Exception as e:
+            log.warning("Semantic cache lookup skipped: %s", e)
 
         try:
-            # Prepare messages for the API call
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": formatted_query}
-            ]
-
-            # Get response using the inherited helper method
-            response_text = self._call_openai_api(messages=messages, model=self.model, temperature=0.1) # Lower temperature might help consistency
-
-            # Attempt to find JSON within potential markdown fences (common LLM mistake)
-            if response_text.strip().startswith("```json"):
-                response_text = response_text.strip()[7:-3].strip()
-            elif response_text.strip().startswith("```"):
-                 response_text = response_text.strip()[3:-3].strip()
-
-            # Check if the response is empty
-            if not response_text:
-                print("⚠️ No content in response, using mock data")
-                raise ValueError("Received empty response from LLM")
-
-            print(f"Cleaned response from OpenAI: {response_text[:500]}...")
-
-            # Parse the response to extract structured data
-            try:
-                structured_data = json.loads(response_text)
-                if not isinstance(structured_data, list): # Ensure it's a list as requested
-                    print("⚠️ LLM response was valid JSON but not a list. Attempting recovery or using mock data.")
-                    # Handle non-list JSON if possible, or raise error
-                    raise ValueError("LLM returned valid JSON but not the expected list format.")
-            except json.JSONDecodeError as json_err:
-                print(f"Error parsing response: {json_err}")
-                print(f"Invalid JSON received: {response_text}")
-                return {"error": f"Error parsing response from LLM. Invalid JSON received.", "raw_response": response_text}
-            except ValueError as val_err:
-                 # Handle the non-list JSON case
-                 return {"error": str(val_err), "raw_response": response_text}
+            # One small request per data-point category, issued concurrently
+            results = await asyncio.gather(
+                *[self._collect_data_point(category, scope) for category in DATA_POINT_CATEGORIES],
+                return_exceptions=True
+            )
+
+            structured_data = []
+            for category, result in zip(DATA_POINT_CATEGORIES, results):
+                if isinstance(result, Exception):
+                    log.warning("Failed to collect %s: %s", category, result)
+                else:
+                    structured_data.append(result)
+
+            if not structured_data:
+                # Every category failed; surface the first error
+                raise results[0]
 
         except Exception as e:
-            print(f"Error calling OpenAI API or processing response: {e}")
+            log.error("Error calling OpenAI API or processing response: %s", e)
             # Create mock data for development/testing
             current_year = datetime.now().year
-            response_text = json.dumps([
+            response_text = _dumps([
                 {
                     "name": "market_size",
                     "value": f"€5.2 billion for {sector} in {country}",
@@ -185,142 +352,356 @@ Example of the exact expected format:
             ])
             return {"error": f"API call or initial processing failed: {e}", "raw_response": response_text}
 
-        # Store the collected data in Supabase
-        stored_data = []
-        for data_point in structured_data:
-            # Ensure required fields are present
-            if 'name' in data_point and 'value' in data_point:
-                try:
-                    stored_item = SupabaseService.store_market_data(
-                        sector=sector, # sector is required
-                        country=country, # Pass country (can be None)
-                        data_point=data_point['name'],
-                        value=data_point['value'],
-                        source=data_point.get('source', 'LLM Response'),
-                        date=data_point.get('date', datetime.now().strftime("%Y-%m-%d")),
-                        custom_keyword=custom_keyword # Pass custom_keyword (can be None)
-                    )
-                    stored_data.append(stored_item)
-                except Exception as e:
-                    print(f"Error storing data point {data_point.get('name')}: {e}")
-                    # Optionally add error info to results
+        # Store the collected data in Supabase with a single insert
+        rows = self._market_data_rows(structured_data, sector, country, custom_keyword)
+        stored_data = await loop.run_in_executor(None, SupabaseService.store_market_data_bulk, rows)
+
+        if stored_data:
+            await self._remember(cache_key, scope, query_vector, stored_data)
 
         return {
             "query": query,
             "collected_data": stored_data # Return the successfully stored items
         }
 
-    def _parse_response(self, response_text, sector, country):
+    @staticmethod
+    def _cache_key(sector, country, financial_product, custom_keyword):
+        """
+        Build the canonical exact-match cache key for a set of query parameters.
+
+        Returns:
+            tuple: The normalized (sector, country, product, keyword) tuple
+        """
+        return tuple((value or "").strip().lower() for value in (sector, country, financial_product, custom_keyword))
+
+    @staticmethod
+    def _semantic_bucket(cache_key):
+        """
+        The semantic cache bucket of an exact-match key: its (sector, country, product) part.
+        """
+        return tuple(cache_key[:3])
+
+    @classmethod
+    def _exact_cache_get(cls, cache_key):
+        """
+        Return the collected data cached for these exact parameters, or None if missing or expired.
+        """
+        with cls._exact_cache_lock:
+            entry = cls._exact_cache.get(cache_key)
+            if entry is None:
+                return None
+            expires_at, collected_data = entry
+            if expires_at < time.monotonic():
+                del cls._exact_cache[cache_key]
+                return None
+            cls._exact_cache.move_to_end(cache_key)
+            return collected_data
+
+    @classmethod
+    def _exact_cache_set(cls, cache_key, collected_data, ttl=COLLECTION_CACHE_TTL):
         """
-        Parse the response from the model to extract structured data points.
+        Cache collected data for ttl seconds, evicting the least recently used entries
+        beyond COLLECTION_CACHE_MAXSIZE.
+        """
+        with cls._exact_cache_lock:
+            cls._exact_cache[cache_key] = (time.monotonic() + ttl, collected_data)
+            cls._exact_cache.move_to_end(cache_key)
+            while len(cls._exact_cache) > COLLECTION_CACHE_MAXSIZE:
+                cls._exact_cache.popitem(last=False)
+
+    async def _remember(self, cache_key, scope, query_vector, collected_data):
+        """
+        Add a result to both cache tiers and persist it to Supabase from the default executor.
+        """
+        self._exact_cache_set(cache_key, collected_data)
+        if query_vector is not None:
+            self._embed_cache.add(query_vector, collected_data, bucket=self._semantic_bucket(cache_key))
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(
+            SupabaseService.store_llm_cache,
+            cache_key="|".join(cache_key),
+            query_text=scope,
+            embedding=query_vector,
+            payload=collected_data
+        ))
+
+    @classmethod
+    def _load_persistent_cache(cls):
+        """
+        Load the entries persisted in the llm_cache table, once per process.
+        Entries older than COLLECTION_CACHE_TTL are skipped, and the others only live
+        for what is left of their TTL, so cached data is eventually collected afresh.
+        """
+        if cls._cache_loaded:
+            return
+        cls._cache_loaded = True
+        for row in SupabaseService.get_llm_cache():
+            payload = row.get("payload")
+            if isinstance(payload, str):
+                payload = _loads(payload)
+            if not payload or not row.get("cache_key"):
+                continue
+            ttl = cls._remaining_ttl(row.get("created_at"))
+            if ttl <= 0:
+                continue
+            cache_key = tuple(row["cache_key"].split("|"))
+            cls._exact_cache_set(cache_key, payload, ttl=ttl)
+            embedding = row.get("embedding")
+            if isinstance(embedding, str):
+                embedding = _loads(embedding)
+            if embedding:
+                cls._embed_cache.add(embedding, payload, bucket=cls._semantic_bucket(cache_key), ttl=ttl)
+
+    @staticmethod
+    def _remaining_ttl(created_at):
+        """
+        Seconds left before an llm_cache row created at the given time expires.
 
         Args:
-            response_text (str): The response from the model
-            sector (str): The Market sector
-            country (str): The country
+            created_at (str): The row's ISO 8601 timestamp
 
         Returns:
-            list: A list of data points
+            float: The remaining seconds, or 0 if expired or the timestamp can't be parsed
         """
-        # First, try to parse as JSON if the response is already structured
         try:
-            data = json.loads(response_text)
-            if isinstance(data, list):
-                # Ensure each data point has proper date formatting
-                for item in data:
-                    if 'date' in item:
-                        item['date'] = self._format_date(item['date'])
-                return data
-            elif isinstance(data, dict) and 'data_points' in data:
-                # Ensure each data point has proper date formatting
-                for item in data['data_points']:
-                    if 'date' in item:
-                        item['date'] = self._format_date(item['date'])
-                return data['data_points']
-        except json.JSONDecodeError:
-            pass
-
-        # If not JSON, try to extract structured data from the text
-        # This is a very simplified approach - you would want more robust parsing
-        data_points = []
+            created = _DATEUTIL.parse(created_at) if _DATEUTIL else datetime.fromisoformat(created_at)
+        except (TypeError, ValueError, OverflowError):
+            return 0
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        age = (datetime.now(timezone.utc) - created).total_seconds()
+        return COLLECTION_CACHE_TTL - age
+
+    async def _collect_data_point(self, category, scope):
+        """
+        Ask the model for a single data-point category.
 
-        # Look for common data point patterns
-        patterns = [
-            "Market size", "Growth rate", "Key players",
-            "Market trends", "Regulatory factors", "Economic indicators"
-        ]
+        Args:
+            category (str): The data-point name, one of DATA_POINT_CATEGORIES
+            scope (str): The sector/country/product/keyword description
 
-        lines = response_text.split('\n')
-        current_data_point = None
+        Returns:
+            DataPoint: The validated data point
+        """
+        messages = self._category_messages(category, scope)
+        formatted_query = messages[1]["content"]
+
+        # Identical prompts within the TTL reuse the previous completion
+        cache_key = _response_cache_key(formatted_query, self.system_prompt, self.model)
+        response_text = _response_cache_get(cache_key)
+        cache_hit = response_text is not None
+
+        if not cache_hit:
+            # Structured outputs guarantee an object matching the data-point schema
+            response_text = await self._call_openai_api_async(
+                messages=messages,
+                model=self.model,
+                temperature=0.1, # Lower temperature might help consistency
+                response_format=_DATA_POINT_RESPONSE_FORMAT
+            )
+
+        validated = self._parse_data_point(response_text, category)
+
+        # Only cache responses that parsed and validated
+        if not cache_hit:
+            _response_cache_set(cache_key, response_text)
+        return validated
+
+    @staticmethod
+    def _scope(sector, country, financial_product, custom_keyword):
+        """
+        Describe the sector/country/product/keyword scope of a query for the prompts.
+        """
+        return _SCOPE_TEMPLATE.format(
+            sector=sector,
+            country_clause=f" in {country}" if country else "",
+            product_clause=f", focusing on {financial_product} products" if financial_product else "",
+            keyword_clause=f", specifically regarding {custom_keyword}" if custom_keyword else ""
+        )
 
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
+    def _category_messages(self, category, scope):
+        """
+        Build the chat messages requesting one data-point category.
+        """
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": _QUERY_TEMPLATE.format(category=category, scope=scope)}
+        ]
 
-            # Check if this line starts a new data point
-            for pattern in patterns:
-                if line.startswith(pattern) or pattern in line[:30]:
-                    if current_data_point:
-                        data_points.append(current_data_point)
-
-                    current_data_point = {
-                        "name": pattern.lower().replace(" ", "_"),
-                        "value": line.split(":", 1)[1].strip() if ":" in line else "",
-                        "source": "",
-                        "date": "",
-                        "metadata": {}
-                    }
-                    break
+    @staticmethod
+    def _parse_data_point(response_text, category):
+        """
+        Parse and validate the JSON object returned for one data-point category.
 
-            # If we're in a data point and this line contains a source
-            if current_data_point and ("source:" in line.lower() or "http" in line.lower()):
-                current_data_point["source"] = line.split(":", 1)[1].strip() if ":" in line else line
+        Returns:
+            DataPoint: The validated data point
+        """
+        if not response_text:
+            raise ValueError(f"Received empty response from LLM for {category}")
 
-            # If we're in a data point and this line contains a date
-            if current_data_point and ("date:" in line.lower() or "20" in line):
-                # Extract date with better handling for year-only values
-                date_value = line.split(":", 1)[1].strip() if ":" in line else line
-                current_data_point["date"] = self._format_date(date_value)
+        data_point = _loads(response_text)
+        if not isinstance(data_point, dict):
+            raise ValueError(f"LLM returned valid JSON but not the expected object format for {category}.")
 
-        # Add the last data point if there is one
-        if current_data_point:
-            data_points.append(current_data_point)
+        data_point.setdefault("name", category)
+        # Enforces the required fields and fills in the source/date defaults
+        return DataPoint.model_validate(data_point)
 
-        return data_points
+    @staticmethod
+    def _market_data_rows(data_points, sector, country, custom_keyword):
+        """
+        Map validated data points to market_data rows for SupabaseService.store_market_data_bulk.
+        """
+        return [
+            {
+                "sector": sector, # sector is required
+                "country": country, # Pass country (can be None)
+                "data_point": data_point.name,
+                "value": data_point.value,
+                "source": data_point.source,
+                "date": data_point.date,
+                "custom_keyword": custom_keyword # Pass custom_keyword (can be None)
+            }
+            for data_point in data_points
+        ]
 
-    def _format_date(self, date_value):
+    def enqueue(self, query, batch_path=DEFAULT_BATCH_PATH):
         """
-        Format a date value to ensure it's in a consistent format.
+        Append the per-category requests for a query to a Batch API input file.
+
+        The query parameters are recorded in a sidecar file next to it, so
+        drain_batch() can store the results later, possibly from another process.
 
         Args:
-            date_value (str): The date value to format
+            query (dict): The query parameters, see aprocess()
+            batch_path (str, optional): The JSONL batch input file
 
         Returns:
-            str: The formatted date
+            str: The job ID identifying this query's requests in the batch
+        """
+        sector = query.get('sector')
+        if not sector:
+            raise ValueError("Sector is required for data collection.")
+        scope = self._scope(sector, query.get('country'), query.get('financial_product'), query.get('custom_keyword'))
+        job_id = uuid.uuid4().hex
+
+        Path(batch_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(batch_path, "a", encoding="utf-8") as batch_file:
+            for category in DATA_POINT_CATEGORIES:
+                request = {
+                    "custom_id": f"{job_id}:{category}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": self.model,
+                        "messages": self._category_messages(category, scope),
+                        "temperature": 0.1,
+                        "response_format": _DATA_POINT_RESPONSE_FORMAT
+                    }
+                }
+                batch_file.write(_dumps(request) + "\n")
+        with open(self._batch_queries_path(batch_path), "a", encoding="utf-8") as queries_file:
+            queries_file.write(_dumps({"job_id": job_id, "query": query}) + "\n")
+
+        return job_id
+
+    def submit_batch(self, batch_path=DEFAULT_BATCH_PATH):
         """
-        if not date_value:
-            return datetime.now().isoformat()
+        Upload a batch input file and start a Batch API job for it. The file is
+        moved to {batch_path}.{batch_id}, so the next enqueue() starts a new batch.
 
-        # If it's just a year (e.g., "2023"), format it properly
-        if str(date_value).strip().isdigit() and len(str(date_value).strip()) == 4:
-            return f"{date_value.strip()}-01-01"
+        Returns:
+            str: The batch ID to pass to drain_batch()
+        """
+        return self._submit_batch_file(batch_path)
 
-        # Try to extract year from strings like "2023" or "in 2023"
-        import re
-        year_match = re.search(r'\b(20\d{2})\b', str(date_value))
-        if year_match:
-            return f"{year_match.group(1)}-01-01"
+    def drain_batch(self, batch_id, batch_path=DEFAULT_BATCH_PATH):
+        """
+        Store the results of a finished Batch API job in Supabase.
 
-        # If it's already a datetime object
-        if isinstance(date_value, datetime):
-            return date_value.isoformat()
+        Args:
+            batch_id (str): The ID returned by submit_batch()
+            batch_path (str, optional): The batch input file the job was created from
 
-        # Try to parse various date formats
+        Returns:
+            dict: The batch status and, once completed, the stored data per job ID and
+                the errors of any rows that could not be stored
+        """
+        client = self.client
+        batch = client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            return {"status": batch.status}
+
+        with open(self._batch_queries_path(batch_path, batch_id), encoding="utf-8") as queries_file:
+            queries = {entry["job_id"]: entry["query"] for entry in map(_loads, queries_file)}
+
+        # Stream the output file and parse it line by line while a writer thread
+        # stores the parsed rows, so downloading, parsing and inserting overlap
+        collected = {}
+        errors = []
+        pending_rows = queue.Queue(maxsize=4 * BULK_INSERT_BATCH_SIZE)
+        writer = threading.Thread(target=self._store_batch_rows, args=(pending_rows, collected, errors), daemon=True)
+        writer.start()
         try:
-            from dateutil import parser
-            parsed_date = parser.parse(str(date_value), fuzzy=True)
-            return parsed_date.isoformat()
-        except:
-            # If all parsing fails, use current date
-            return datetime.now().isoformat()
+            with client.files.with_streaming_response.content(batch.output_file_id) as output:
+                for line in output.iter_lines():
+                    if not line:
+                        continue
+                    record = _loads(line)
+                    job_id, category = record["custom_id"].split(":", 1)
+                    response = record.get("response") or {}
+                    if record.get("error") or response.get("status_code") != 200:
+                        log.warning("Batch request %s failed: %s", record["custom_id"], record.get("error"))
+                        continue
+                    query = queries.get(job_id)
+                    if query is None:
+                        log.warning("No query recorded for batch job %s", job_id)
+                        continue
+                    try:
+                        response_text = response["body"]["choices"][0]["message"]["content"]
+                        data_point = self._parse_data_point(response_text, category)
+                    except Exception as e:
+                        log.warning("Could not parse batch result %s: %s", record["custom_id"], e)
+                        continue
+                    row = self._market_data_rows([data_point], query.get('sector'), query.get('country'), query.get('custom_keyword'))[0]
+                    pending_rows.put((job_id, row))
+        finally:
+            pending_rows.put(None)
+            writer.join()
+
+        result = {"status": batch.status, "collected_data": collected}
+        if errors:
+            result["errors"] = errors
+        return result
+
+    @staticmethod
+    def _store_batch_rows(pending_rows, collected, errors):
+        """
+        Writer thread for drain_batch(): store queued (job_id, row) pairs in
+        bulk-insert sized chunks until the None sentinel arrives.
+
+        A failed chunk is recorded and skipped rather than ending the thread, which
+        would leave the producer blocked on the full queue.
+
+        Args:
+            pending_rows (queue.Queue): The rows to store, terminated by None
+            collected (dict): Receives the stored records per job ID
+            errors (list): Receives the error messages of failed chunks
+        """
+        chunk = []
+        while True:
+            item = pending_rows.get()
+            if item is not None:
+                chunk.append(item)
+            if chunk and (item is None or len(chunk) >= BULK_INSERT_BATCH_SIZE):
+                try:
+                    # A single-chunk insert either stores every row, in order, or none
+                    stored = SupabaseService.store_market_data_bulk([row for _, row in chunk])
+                    for (job_id, _), record in zip(chunk, stored):
+                        collected.setdefault(job_id, []).append(record)
+                except Exception as e:
+                    log.error("Failed to store %d batch rows: %s", len(chunk), e)
+                    errors.append(str(e))
+                chunk = []
+            if item is None:
+                return
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+
+log = logging.getLogger(__name__)
+
+class DataCollectorWorker:
+    """
+    Runs DataCollectorAgent jobs in the background.
+
+    A dedicated event loop runs in a daemon thread, where `num_workers` coroutines
+    consume a queue of data collection queries. submit() returns a job ID straight
+    away; the caller polls status() until the job is done. The collected data is
+    stored in Supabase by the agent itself, as with a synchronous process() call.
+
+    Finished jobs are forgotten once status() has returned them, or job_ttl seconds
+    after finishing if nobody asks, so a long-running worker doesn't accumulate results.
+    """
+
+    def __init__(self, agent, num_workers=4, job_ttl=3600):
+        """
+        Initializes the worker.
+
+        Args:
+            agent (DataCollectorAgent): The agent used to process jobs
+            num_workers (int, optional): Number of jobs processed concurrently. Defaults to 4.
+            job_ttl (float, optional): Seconds a finished job is kept if its result is never fetched. Defaults to 3600.
+        """
+        self.agent = agent
+        self.num_workers = num_workers
+        self.job_ttl = job_ttl
+        self.jobs = {}
+        # Guards jobs, which the worker loop and the callers' threads both update
+        self._jobs_lock = threading.Lock()
+        self._loop = None
+        self._queue = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """
+        Start the background event loop and its worker coroutines, if not already running.
+        """
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run_loop, name="data-collector-worker", daemon=True)
+            self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        """
+        Thread target: create the loop and queue, then run the workers forever.
+        """
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._ready.set()
+        self._loop.run_until_complete(asyncio.gather(*[self.run() for _ in range(self.num_workers)]))
+
+    async def run(self):
+        """
+        Consume jobs from the queue until the loop stops.
+        """
+        while True:
+            job_id, query = await self._queue.get()
+            with self._jobs_lock:
+                job = self.jobs[job_id]
+                job["status"] = "running"
+            try:
+                result, status = await self.agent.aprocess(query), "done"
+            except Exception as e:
+                log.error("Data collection job %s failed: %s", job_id, e)
+                result, status = {"error": str(e)}, "failed"
+            finally:
+                self._queue.task_done()
+            with self._jobs_lock:
+                job.update(result=result, status=status, finished_at=time.monotonic())
+
+    def submit(self, query):
+        """
+        Queue a data collection query.
+
+        Args:
+            query (dict): The query parameters accepted by DataCollectorAgent.process
+
+        Returns:
+            str: The job ID to pass to status()
+        """
+        self.start()
+        job_id = str(uuid.uuid4())
+        with self._jobs_lock:
+            self._evict_expired_jobs()
+            self.jobs[job_id] = {"status": "queued", "query": query, "result": None}
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, (job_id, query))
+        return job_id
+
+    def status(self, job_id):
+        """
+        Get the state of a submitted job.
+
+        Args:
+            job_id (str): The ID returned by submit()
+
+        Returns:
+            dict: The job's status ("queued", "running", "done" or "failed"), query and
+                result, or None if the job ID is unknown. A finished job is only
+                returned once; it is forgotten afterwards.
+        """
+        with self._jobs_lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job["status"] in ("done", "failed"):
+                del self.jobs[job_id]
+            return job
+
+    def _evict_expired_jobs(self):
+        """
+        Drop the jobs that finished more than job_ttl seconds ago. Called with _jobs_lock held.
+        """
+        cutoff = time.monotonic() - self.job_ttl
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.get("finished_at", cutoff) < cutoff]:
+            del self.jobs[job_id]
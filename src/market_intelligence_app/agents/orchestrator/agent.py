@@ -1,33 +1,116 @@
-import os
-import json
-import sys
-from dotenv import load_dotenv
-from ..base_agent import BaseAgent
-from supabase_service import SupabaseService
+import re
+import copy
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final, Literal, Optional
+from ..base_agent import BaseAgent, run_async
+from ..semantic_cache import SemanticCache
+from ..data_collector.agent import DataCollectorAgent
+from ..report_generator.agent import ReportGeneratorAgent
+from ..qa.agent import QAAgent
 from openai import OpenAI
+from pydantic import BaseModel
+from config.settings import COUNTRIES, FINANCIAL_PRODUCTS
+
+# Byte-identical on every call so the server can reuse the cached prompt prefix
+SYSTEM_PROMPT: Final[str] = """You are an expert orchestrator for a multi-agent system specializing in financial Market intelligence.
+Your task is to analyze user queries and determine which specialized agent should handle them.
+
+You have access to the following specialized agents:
+1. Data Collector Agent: Collects Market data from the web and stores it in the database
+2. Report Generator Agent: Generates comprehensive reports based on stored Market data
+3. QA Agent: Answers questions about Market reports
+
+When analyzing a query:
+1. Identify the user's intent (data collection, report generation, or question answering)
+2. Extract relevant parameters (sector, country, financial product, etc.)
+3. Determine which agent should handle the query
+4. Format the query appropriately for the selected agent
+
+Always maintain a helpful, professional tone and ensure the user's query is routed to the most appropriate agent."""
+
+# Routing spec for query analysis. The few-shot examples pin down custom_keyword
+# extraction, so the same query always yields the same parameters; being static,
+# the prompt is also a cacheable prefix.
+_ANALYSIS_SYSTEM_PROMPT: Final[str] = """You route queries for a Market intelligence system: data_collection finds new data, report_generation summarizes stored data, question_answering answers questions about stored data or reports.
+Put any specific topic beyond sector, country and financial product in custom_keyword, in title case.
+
+Examples:
+Q: "Give me crane data in France" -> {"intent": "data_collection", "parameters": {"sector": "Industrial Equipment", "country": "France", "custom_keyword": "Crane"}}
+Q: "Generate a report on electric vehicles leasing in Germany" -> {"intent": "report_generation", "parameters": {"sector": "Transportation", "country": "Germany", "financial_product": "Leasing", "custom_keyword": "Electric Vehicles"}}
+Q: "What is the growth rate for software in the US?" -> {"intent": "question_answering", "parameters": {"sector": "Technology", "country": "US", "custom_keyword": "Software", "question": "What is the growth rate for software in the US?"}}
+Q: "Research the 2025 market outlook for video games" -> {"intent": "data_collection", "parameters": {"sector": "Video Game", "custom_keyword": "Market Outlook 2025"}}"""
+
+# Structured-output contract for query analysis; the intent enum replaces the
+# long list of intents and examples that used to be sent with every query. In
+# strict mode the API guarantees a matching object, with null for absent parameters.
+_ANALYSIS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "query_analysis",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "intent": {"type": "string", "enum": ["data_collection", "report_generation", "question_answering"]},
+                "parameters": {
+                    "type": "object",
+                    "properties": {
+                        "sector": {"type": ["string", "null"]},
+                        "country": {"type": ["string", "null"]},
+                        "financial_product": {"type": ["string", "null"]},
+                        "custom_keyword": {"type": ["string", "null"]},
+                        "question": {"type": ["string", "null"]}
+                    },
+                    "required": ["sector", "country", "financial_product", "custom_keyword", "question"],
+                    "additionalProperties": False
+                }
+            },
+            "required": ["intent", "parameters"],
+            "additionalProperties": False
+        }
+    }
+}
+
+def _entity_pattern(name: str) -> str:
+    # Acronyms such as "US" only match in capitals, so the pronoun "us" doesn't count
+    return re.escape(name) if name.isupper() else f"(?i:{re.escape(name)})"
+
+# Countries, financial products and numbers named in a query. Two queries naming
+# different ones embed almost identically ("crane data in France" vs "... in
+# Germany"), so they must never share an analysis.
+_ENTITY_RE = re.compile(r'\b(?:' + "|".join(
+    _entity_pattern(name)
+    for name in COUNTRIES + [product.split(" (")[0] for product in FINANCIAL_PRODUCTS]
+) + r')\b|\d+(?:[.,]\d+)?')
+
+class QueryParameters(BaseModel):
+    """
+    Parameters extracted from a user query; None when the query doesn't mention them.
+    """
+    sector: Optional[str] = None
+    country: Optional[str] = None
+    financial_product: Optional[str] = None
+    custom_keyword: Optional[str] = None
+    question: Optional[str] = None
 
-# Add parent directory to path to import base_agent
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from base_agent import BaseAgent
-from supabase_service import SupabaseService
-
-# Import specialized agents
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data_collector"))
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "report_generator"))
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "qa"))
-
-from agents.data_collector.agent import DataCollectorAgent
-from agents.report_generator.agent import ReportGeneratorAgent
-from agents.qa.agent import QAAgent
-
-# Load environment variables
-load_dotenv()
+class QueryAnalysis(BaseModel):
+    """
+    The intent and parameters of a user query, as returned by the analysis model.
+    """
+    intent: Literal["data_collection", "report_generation", "question_answering"]
+    parameters: QueryParameters = QueryParameters()
 
 class OrchestratorAgent(BaseAgent):
     """
     Agent responsible for orchestrating the workflow between specialized agents.
     """
 
+    # Shared module-level prompt; BaseAgent uses it instead of _get_system_prompt()
+    SYSTEM_PROMPT = SYSTEM_PROMPT
+
     def __init__(self, openai_client: OpenAI = None):
         """
         Initializes the OrchestratorAgent.
@@ -41,174 +124,318 @@ class OrchestratorAgent(BaseAgent):
             openai_client=openai_client
         )
 
-        # Initialize specialized agents, passing the client
-        self.data_collector = DataCollectorAgent(openai_client=self.client)
-        self.report_generator = ReportGeneratorAgent(openai_client=self.client)
-        self.qa_agent = QAAgent(openai_client=self.client)
+        # Initialize specialized agents concurrently so their setup overlaps; they all
+        # share this agent's (thread-safe) OpenAI client
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            self.data_collector, self.report_generator, self.qa_agent = executor.map(
+                lambda agent_cls: agent_cls(openai_client=self._client),
+                [DataCollectorAgent, ReportGeneratorAgent, QAAgent]
+            )
+
+    # Exact-match LRU cache of query analyses, keyed on (model, normalized query),
+    # least recently used first
+    _analysis_exact = OrderedDict()
+    # Shared by every Streamlit session thread through the cached orchestrator
+    _analysis_exact_lock = threading.Lock()
+    ANALYSIS_CACHE_MAXSIZE = 512
+    # Cosine similarity above which a previous analysis is reused
+    ANALYSIS_CACHE_THRESHOLD = 0.95
+    # Semantic cache of query analyses over the query embeddings
+    _analysis_semantic = SemanticCache(threshold=ANALYSIS_CACHE_THRESHOLD)
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    ANALYSIS_MODEL = "gpt-4o-mini"
+
+    # Upper bound on workflow steps running at the same time
+    max_parallel_agents = 3
+
+    def process(self, query_text: str) -> dict:
+        """
+        Processes a user query, determines the intent, and routes to the correct agent.
+
+        Synchronous wrapper around aprocess() for callers without an event loop.
+        """
+        return run_async(self.aprocess(query_text))
 
-    def _get_system_prompt(self):
+    async def aprocess(self, query_text: str) -> dict:
+        """
+        Processes a user query, determines the intent, and routes to the correct agent.
+        The analysis and the agent call run on the shared AsyncOpenAI client.
         """
-        Get the system prompt for the Orchestrator Agent.
+        try:
+            analysis = await self._analyze_query_async(query_text)
+            agent_to_call, agent_name_str, parameters = self._route(analysis, query_text)
+            raw_result_dict = await agent_to_call.aprocess(parameters)
+            return self._wrap_result(agent_name_str, parameters, raw_result_dict)
+        except Exception as e:
+            print(f"Error in Orchestrator process: {e}")
+            return {"error": str(e)}
 
-        Returns:
-            str: The system prompt
+    async def aprocess_batch(self, queries: list) -> list:
         """
-        return """
-        You are an expert orchestrator for a multi-agent system specializing in financial Market intelligence.
-        Your task is to analyze user queries and determine which specialized agent should handle them.
+        Processes several user queries concurrently.
 
-        You have access to the following specialized agents:
-        1. Data Collector Agent: Collects Market data from the web and stores it in the database
-        2. Report Generator Agent: Generates comprehensive reports based on stored Market data
-        3. QA Agent: Answers questions about Market reports
+        Args:
+            queries (list): The user query strings
 
-        When analyzing a query:
-        1. Identify the user's intent (data collection, report generation, or question answering)
-        2. Extract relevant parameters (sector, country, financial product, etc.)
-        3. Determine which agent should handle the query
-        4. Format the query appropriately for the selected agent
+        Returns:
+            list: The results, in the same order as the queries
+        """
+        return await asyncio.gather(*[self.aprocess(query_text) for query_text in queries])
 
-        Always maintain a helpful, professional tone and ensure the user's query is routed to the most appropriate agent.
+    def process_batch(self, queries: list) -> list:
         """
+        Synchronous wrapper around aprocess_batch() for callers without an event loop.
+        """
+        return run_async(self.aprocess_batch(queries))
 
-    def process(self, query_text: str) -> dict:
+    def _route(self, analysis: dict, query_text: str):
         """
-        Processes a user query, determines the intent, and routes to the correct agent.
+        Picks the agent for an analyzed query.
+
+        Returns:
+            tuple: (agent, agent name, parameters)
         """
-        try:
-            # Analyze the query to determine intent and parameters
-            analysis = self._analyze_query(query_text)
-
-            intent = analysis.get("intent")
-            parameters = analysis.get("parameters", {})
-
-            agent_to_call = None
-            agent_name_str = ""
-
-            if intent == "data_collection":
-                agent_to_call = self.data_collector
-                agent_name_str = "data_collector"
-            elif intent == "report_generation":
-                agent_to_call = self.report_generator
-                agent_name_str = "report_generator"
-            elif intent == "question_answering":
-                agent_to_call = self.qa_agent
-                agent_name_str = "qa_agent"
-                # Ensure the question is passed correctly if not extracted
-                if "question" not in parameters:
-                    parameters["question"] = query_text
-            else:
-                # Default or fallback behavior (e.g., use QA agent for general queries)
-                print(f"Orchestrator: Unclear intent '{intent}'. Defaulting to QA.")
-                agent_to_call = self.qa_agent
-                agent_name_str = "qa_agent"
+        intent = analysis.get("intent")
+        parameters = analysis.get("parameters", {})
+
+        if intent == "data_collection":
+            return self.data_collector, "data_collector", parameters
+        if intent == "report_generation":
+            return self.report_generator, "report_generator", parameters
+        if intent == "question_answering":
+            # Ensure the question is passed correctly if not extracted
+            if "question" not in parameters:
                 parameters["question"] = query_text
+            return self.qa_agent, "qa_agent", parameters
 
-            # Call the selected agent
-            if agent_to_call:
-                raw_result_dict = agent_to_call.process(parameters)
-                # Extract the relevant part (the inner 'result' dict or the error dict)
-                final_result_data = raw_result_dict.get("result", raw_result_dict) # Use inner result if exists, else the whole dict (for direct errors)
-                return {
-                    "agent": agent_name_str,
-                    "parameters": parameters,
-                    "result": final_result_data # Return the extracted inner result/error
-                }
-            else:
-                # Should not happen with the default case, but handle anyway
-                return {"error": "Could not determine which agent to call."}
+        # Default or fallback behavior (e.g., use QA agent for general queries)
+        print(f"Orchestrator: Unclear intent '{intent}'. Defaulting to QA.")
+        parameters["question"] = query_text
+        return self.qa_agent, "qa_agent", parameters
 
-        except Exception as e:
-            print(f"Error in Orchestrator process: {e}")
-            # import traceback
-            # traceback.print_exc() # Print stack trace for detailed debugging
-            return {"error": str(e)}
+    @staticmethod
+    def _wrap_result(agent_name_str: str, parameters: dict, raw_result_dict: dict) -> dict:
+        """
+        Builds the orchestrator response from an agent's raw result.
+        """
+        # Extract the relevant part (the inner 'result' dict or the error dict)
+        final_result_data = raw_result_dict.get("result", raw_result_dict) # Use inner result if exists, else the whole dict (for direct errors)
+        return {
+            "agent": agent_name_str,
+            "parameters": parameters,
+            "result": final_result_data # Return the extracted inner result/error
+        }
+
+    @staticmethod
+    def _analysis_messages(query_text: str) -> list:
+        """
+        Builds the messages asking the LLM for the intent and parameters of a query.
+        The intents and parameter names are carried by _ANALYSIS_RESPONSE_FORMAT.
+        """
+        return [
+            {"role": "system", "content": _ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": f"Classify intent and extract params. Query: {query_text}"}
+        ]
 
-    def _analyze_query(self, query_text: str) -> dict:
+    def _analysis_key(self, query_text: str) -> tuple:
+        """
+        Builds the exact-match cache key: the analysis model and the query with case
+        and whitespace normalized.
+        """
+        return (self.ANALYSIS_MODEL, " ".join(query_text.lower().split()))
+
+    def _store_exact(self, exact_key: tuple, analysis: dict):
+        """
+        Adds an analysis to the exact-match cache, evicting the least recently used
+        entry once ANALYSIS_CACHE_MAXSIZE is exceeded.
+        """
+        with self._analysis_exact_lock:
+            self._analysis_exact[exact_key] = analysis
+            self._analysis_exact.move_to_end(exact_key)
+            if len(self._analysis_exact) > self.ANALYSIS_CACHE_MAXSIZE:
+                self._analysis_exact.popitem(last=False)
+
+    @staticmethod
+    def _semantic_bucket(query_text: str) -> tuple:
+        """
+        Builds the semantic cache bucket of a query: the countries, financial products
+        and numbers it names, so near-identical queries about different entities never
+        match each other.
+        """
+        return tuple(sorted({entity.lower() for entity in _ENTITY_RE.findall(query_text)}))
+
+    @staticmethod
+    def _fits_query(analysis: dict, query_text: str) -> bool:
+        """
+        Checks that a similar query's analysis applies to this one: its free-form
+        custom_keyword must appear in the query too.
+        """
+        keyword = analysis.get("parameters", {}).get("custom_keyword")
+        return keyword is None or keyword.lower() in query_text.lower()
+
+    def _cached_analysis(self, exact_key: tuple, query_text: str, query_vector=None):
+        """
+        Looks up a previous analysis by exact key, then by embedding similarity.
+        Similar queries only lend their analysis to this query; it is not stored
+        under this query's exact key.
+
+        Returns:
+            dict: A copy of the cached analysis, or None on a miss
+        """
+        with self._analysis_exact_lock:
+            cached = self._analysis_exact.get(exact_key)
+            if cached is not None:
+                self._analysis_exact.move_to_end(exact_key)
+        if cached is not None:
+            # process() mutates the parameters, so never hand out the cached dict
+            return copy.deepcopy(cached)
+        if query_vector is None:
+            return None
+        cached = self._analysis_semantic.lookup(query_vector, bucket=self._semantic_bucket(query_text))
+        if cached is None or not self._fits_query(cached, query_text):
+            return None
+        analysis = copy.deepcopy(cached)
+        # The question is the other query's wording; the QA agent must get this one
+        if "question" in analysis.get("parameters", {}):
+            analysis["parameters"]["question"] = query_text
+        return analysis
+
+    def _remember_analysis(self, response_text: str, exact_key: tuple, query_text: str, query_vector=None) -> dict:
+        """
+        Parses an LLM analysis and adds it to the caches.
+
+        Returns:
+            dict: A copy of the parsed analysis
+        """
+        # Validates the shape; absent parameters are left out, as the agents expect
+        analysis = QueryAnalysis.model_validate_json(response_text).model_dump(exclude_none=True)
+        self._store_exact(exact_key, analysis)
+        if query_vector is not None:
+            self._analysis_semantic.add(query_vector, analysis, bucket=self._semantic_bucket(query_text))
+        return copy.deepcopy(analysis)
+
+    async def _analyze_query_async(self, query_text: str) -> dict:
         """
         Uses the LLM to analyze the user query and extract intent and parameters.
+        Repeated and paraphrased queries are answered from the analysis caches.
         """
-        prompt = f"""
-Analyze the following user query for a Market intelligence system. Determine the user's intent and extract relevant parameters.
-
-User Query: "{query_text}"
-
-Possible Intents:
-- data_collection: User wants to find, research, or collect new/up-to-date data, facts, or outlooks about a Market (e.g., 'Find data on...', 'Research the outlook for...', 'What is the latest market size for...?', 'Collect information about...'). This is for getting *new* information.
-- report_generation: User wants a structured summary or generated report based on *existing, previously collected* data (e.g., 'Generate a report on...', 'Summarize the data for...', 'Create an overview of...'). This uses data already in the system.
-- question_answering: User is asking a specific question about existing data or reports (e.g., 'What was the growth rate last year?', 'Who are the key players listed in the report?').
-
-Parameters to Extract:
-- sector (e.g., Technology, Healthcare, Video Game)
-- country (e.g., France, US) - Optional
-- financial_product (e.g., Leasing, Loan) - Optional
-- custom_keyword (any specific term like 'market outlook 2025', 'electric vehicles', 'sustainability') - Optional
-- question (if intent is question_answering)
-
-Output ONLY a JSON object with 'intent' and 'parameters' keys. Examples:
-{{"intent": "report_generation", "parameters": {{"sector": "Technology", "country": "Germany"}}}} # Generate report from existing data
-{{"intent": "question_answering", "parameters": {{"question": "What is the growth rate for leasing in the French healthcare sector?"}}}} # Ask about existing data
-{{"intent": "data_collection", "parameters": {{"sector": "Video Game", "custom_keyword": "market outlook 2025"}}}} # Research new info
-{{"intent": "data_collection", "parameters": {{"sector": "Transportation", "country": "UK"}}}} # Collect new data
-"""
-
-        messages = [
-            {"role": "system", "content": "You are an expert query analyzer for a Market intelligence system. Your task is to determine intent (data_collection, report_generation, question_answering) and extract parameters from user queries. Output only JSON."},
-            {"role": "user", "content": prompt}
-        ]
+        exact_key = self._analysis_key(query_text)
+        cached = self._cached_analysis(exact_key, query_text)
+        if cached is not None:
+            return cached
 
-        # Use the _call_openai_api helper method inherited from BaseAgent
+        query_vector = None
         try:
-            response_text = self._call_openai_api(messages, model="gpt-4o-mini", temperature=0.1)
-            # print(f"_analyze_query response: {response_text}") # Debugging
-            analysis = json.loads(response_text)
-            return analysis
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON from LLM analysis: {response_text}")
-            # Fallback: Treat as a general question if analysis fails
-            return {"intent": "question_answering", "parameters": {"question": query_text}}
+            query_vector = await self._create_embedding_async(query_text, model=self.EMBEDDING_MODEL)
+            cached = self._cached_analysis(exact_key, query_text, query_vector)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            print(f"⚠️ Semantic analysis cache skipped: {e}")
+
+        try:
+            response_text = await self._call_openai_api_async(
+                self._analysis_messages(query_text),
+                model=self.ANALYSIS_MODEL,
+                temperature=0,
+                response_format=_ANALYSIS_RESPONSE_FORMAT
+            )
+            return self._remember_analysis(response_text, exact_key, query_text, query_vector)
         except Exception as e:
             print(f"Error during query analysis: {e}")
-            # Fallback: Treat as a general question on error
             return {"intent": "question_answering", "parameters": {"question": query_text}}
 
-    def execute_workflow(self, workflow: dict) -> dict:
+    def _workflow_agent(self, agent_type: str):
+        """
+        Maps a workflow step's agent type to the specialized agent, or None if unknown.
+        """
+        return {
+            "data_collector": self.data_collector,
+            "report_generator": self.report_generator,
+            "qa_agent": self.qa_agent
+        }.get(agent_type)
+
+    @staticmethod
+    def _workflow_waves(steps: list) -> list:
+        """
+        Groups workflow steps into waves of mutually independent steps.
+
+        A step may list the indices of earlier steps it needs in "depends_on". Without
+        it, a step depends on every earlier step, so workflows that don't declare their
+        dependencies still run in order: a report or question usually needs the data
+        collected by the steps before it.
+
+        Returns:
+            list: Lists of step indices, in execution order
+        """
+        levels = []
+        for index, step in enumerate(steps):
+            depends_on = step.get("depends_on")
+            if depends_on is None:
+                depends_on = range(index)
+            # Only earlier steps can be dependencies, which rules out cycles
+            level = max((levels[dep] + 1 for dep in depends_on if isinstance(dep, int) and 0 <= dep < index), default=0)
+            levels.append(level)
+
+        waves = [[] for _ in range(max(levels, default=-1) + 1)]
+        for index, level in enumerate(levels):
+            waves[level].append(index)
+        return waves
+
+    async def _run_workflow_step(self, step: dict, context: dict, semaphore: asyncio.Semaphore) -> dict:
+        """
+        Runs one workflow step. Steps with "use_context" set have their missing
+        parameters filled from the workflow context.
+        """
+        agent_type = step.get("agent")
+        agent = self._workflow_agent(agent_type)
+        if agent is None:
+            return {"agent": agent_type, "error": f"Unknown agent type: {agent_type}"}
+
+        parameters = dict(step.get("parameters", {}))
+        if step.get("use_context"):
+            parameters = {**context, **parameters}
+        try:
+            async with semaphore:
+                result = await agent.aprocess(parameters)
+            return {"agent": agent_type, "parameters": parameters, "result": result}
+        except Exception as e:
+            return {"agent": agent_type, "parameters": parameters, "error": str(e)}
+
+    async def aexecute_workflow(self, workflow: dict) -> dict:
         """
         Executes a predefined workflow consisting of multiple steps.
-        (Implementation similar to previous examples, ensuring client is passed)
-        """
-        results = []
-        context = workflow.get("context", {})
-
-        for step in workflow.get("steps", []):
-            agent_type = step.get("agent")
-            parameters = step.get("parameters", {})
-
-            # Update parameters from context if needed
-            # ... (context update logic)
-
-            agent = None
-            if agent_type == "data_collector":
-                agent = self.data_collector
-            elif agent_type == "report_generator":
-                agent = self.report_generator
-            elif agent_type == "qa_agent":
-                agent = self.qa_agent
-
-            if agent:
-                try:
-                    result = agent.process(parameters)
-                    step_result = {"agent": agent_type, "parameters": parameters, "result": result}
-                    results.append(step_result)
-
-                    # Update context if needed
-                    # ... (context update logic)
-
-                except Exception as e:
-                    results.append({"agent": agent_type, "parameters": parameters, "error": str(e)})
-                    # Optionally break workflow on error
-                    # break
-            else:
-                results.append({"agent": agent_type, "error": f"Unknown agent type: {agent_type}"})
+
+        Independent steps run concurrently, wave by wave (see _workflow_waves), with at
+        most max_parallel_agents steps in flight. Context updates from a wave are
+        applied once the whole wave has completed.
+
+        Args:
+            workflow (dict): The workflow with its "steps" and optional initial "context"
+
+        Returns:
+            dict: The step results, in step order, and the final context
+        """
+        steps = workflow.get("steps", [])
+        context = dict(workflow.get("context", {}))
+        results = [None] * len(steps)
+        semaphore = asyncio.Semaphore(self.max_parallel_agents)
+
+        for wave in self._workflow_waves(steps):
+            wave_results = await asyncio.gather(
+                *[self._run_workflow_step(steps[index], context, semaphore) for index in wave]
+            )
+            for index, step_result in zip(wave, wave_results):
+                results[index] = step_result
+                if "result" in step_result:
+                    for key in steps[index].get("update_context") or []:
+                        if step_result["parameters"].get(key):
+                            context[key] = step_result["parameters"][key]
 
         return {"results": results, "final_context": context}
+
+    def execute_workflow(self, workflow: dict) -> dict:
+        """
+        Synchronous wrapper around aexecute_workflow() for callers without an event loop.
+        """
+        return run_async(self.aexecute_workflow(workflow))
@@ -6,3 +6,4 @@ Uses the gpt-4o model for accurate question answering.
 """
 
 from .agent import QAAgent
+from .batcher import QABatcher
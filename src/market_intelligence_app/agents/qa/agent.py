@@ -1,28 +1,105 @@
-import os
+import re
+import copy
 import json
-import sys
-from dotenv import load_dotenv
+import time
+import asyncio
+import threading
+import functools
+from collections import OrderedDict, defaultdict
+from typing import Final
+from ..base_agent import BaseAgent, run_async
+from ..semantic_cache import SemanticCache
+from .batcher import QABatcher
+from supabase_service import SupabaseService
+from config.settings import QA_MICRO_BATCHING, ANSWER_CACHE_TTL, ANSWER_CACHE_MAXSIZE
 from openai import OpenAI
 
-# Add parent directory to path to import base_agent
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from base_agent import BaseAgent
-from supabase_service import SupabaseService
+# Byte-identical on every call so the server can reuse the cached prompt prefix
+SYSTEM_PROMPT: Final[str] = """You are an expert financial analyst specializing in equipment financing markets for Market.
+Your task is to answer questions about Market reports accurately and concisely.
+
+When answering questions:
+1. Base your answers on the report content provided
+2. Cite specific sections or data points from the report when relevant
+3. If the report doesn't contain information to answer a question, clearly state that
+4. Use a professional, helpful tone
+5. Provide concise but comprehensive answers
+
+Always maintain the context of equipment financing markets and Market' business focus.
+Base your answers ONLY on the provided context (reports and data). If the answer is not in the context, state that clearly."""
+
+# Structured-output contract for answering several questions in one completion
+_QA_BATCH_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "qa_answers",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "answers": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "answer": {"type": "string"}
+                        },
+                        "required": ["id", "answer"],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["answers"],
+            "additionalProperties": False
+        }
+    }
+}
 
-# Load environment variables
-load_dotenv()
+# Numbers in a question (years, amounts, percentages); questions only share a
+# semantically cached answer if these match exactly
+_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
 
 class QAAgent(BaseAgent):
     """
     Agent responsible for answering questions about Market reports stored in Supabase.
     """
 
-    def __init__(self, openai_client: OpenAI = None):
+    # Shared module-level prompt; BaseAgent uses it instead of _get_system_prompt()
+    SYSTEM_PROMPT = SYSTEM_PROMPT
+
+    # Cosine similarity above which a previous answer is reused. Questions that differ
+    # only in an entity or a metric still score around 0.92-0.95, so this stays high;
+    # numbers (years, amounts) are matched exactly through the cache bucket.
+    ANSWER_CACHE_THRESHOLD = 0.97
+    EMBEDDING_MODEL = "text-embedding-3-small"
+    # Semantic cache of recent answers, bucketed by the filters and the numbers of the
+    # question. Payloads are (result, market data IDs) pairs. Both answer caches are
+    # cleared whenever market data or reports are written (see clear_answer_cache()).
+    _answer_cache = SemanticCache(threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL)
+    # Exact repeats, keyed by (normalized question, filters): (expires_at, result,
+    # market data IDs), least recently used first. A hit skips even the embedding request.
+    _answer_exact = OrderedDict()
+    # Shared by every Streamlit session thread through the cached orchestrator
+    _answer_exact_lock = threading.Lock()
+    # Bumped by clear_answer_cache(); an answer is only cached if no write happened
+    # since its context was retrieved
+    _answer_generation = 0
+
+    # Rough characters per token, the same estimate BaseAgent uses for rate limits
+    CHARS_PER_TOKEN = 4
+    # Tokens kept free for the message framing and the estimate's error
+    CONTEXT_SAFETY_TOKENS = 500
+    # A report is only truncated to fit if at least this much of its content remains
+    MIN_TRUNCATED_REPORT_CHARS = 1000
+
+    def __init__(self, openai_client: OpenAI = None, max_input_tokens: int = 8000):
         """
         Initializes the QAAgent.
 
         Args:
             openai_client (OpenAI, optional): An initialized OpenAI client instance.
+            max_input_tokens (int, optional): Prompt size the retrieved context is trimmed to. Defaults to 8000.
         """
         super().__init__(
             name="QA Agent",
@@ -31,29 +108,26 @@ class QAAgent(BaseAgent):
         )
         # Store the desired model for this agent if needed for API calls
         self.model = "gpt-4o" # Or whichever model this agent should use
+        self.max_input_tokens = max_input_tokens
+        self._batcher = QABatcher(self)
+        # Supabase writes still running after astream() or a cache hit returned
+        self._background_tasks = set()
 
-    def _get_system_prompt(self):
+    def process(self, query):
         """
-        Get the system prompt for the QA Agent.
+        Process a question about Market reports and provide an answer.
 
-        Returns:
-            str: The system prompt
-        """
-        return """
-        You are an expert financial analyst specializing in equipment financing markets for Market.
-        Your task is to answer questions about Market reports accurately and concisely.
+        Synchronous wrapper around aprocess() for callers without an event loop.
 
-        When answering questions:
-        1. Base your answers on the report content provided
-        2. Cite specific sections or data points from the report when relevant
-        3. If the report doesn't contain information to answer a question, clearly state that
-        4. Use a professional, helpful tone
-        5. Provide concise but comprehensive answers
+        Args:
+            query (dict): The query parameters, see aprocess()
 
-        Always maintain the context of equipment financing markets and Market' business focus.
-        """ + " Base your answers ONLY on the provided context (reports and data). If the answer is not in the context, state that clearly."
+        Returns:
+            dict: The answer to the question
+        """
+        return run_async(self.aprocess(query))
 
-    def process(self, query):
+    async def aprocess(self, query):
         """
         Process a question about Market reports and provide an answer.
 
@@ -75,21 +149,212 @@ class QAAgent(BaseAgent):
         country = query.get('country') # Use .get() for country
         financial_product = query.get('financial_product')
         custom_keyword = query.get('custom_keyword')
+        report_id = query.get('report_id')
 
         if not question:
             return {"error": "Question is required."}
 
-        # Retrieve relevant reports and data from Supabase based on available filters
-        reports = SupabaseService.get_reports(
-            sector=sector, # Pass potentially None value
-            country=country, # Pass potentially None value
-            financial_product=financial_product, # Pass potentially None value
-            custom_keyword=custom_keyword # Pass potentially None value
+        # A repeat or paraphrase of a recent question with the same filters reuses its
+        # answer. The question is still recorded, in the background.
+        cache_bucket = tuple(str(value or "").strip().lower() for value in (sector, country, financial_product, custom_keyword, report_id))
+        exact_key = (" ".join(question.lower().split()), cache_bucket)
+        generation = self._answer_generation
+        cached = self._exact_answer(exact_key)
+        if cached is not None:
+            print("✅ Answer served from the exact-match cache")
+            return self._cached_answer(query, *cached)
+
+        question_vector = None
+        semantic_bucket = (cache_bucket, tuple(_NUMBER_RE.findall(question)))
+        try:
+            question_vector = await self._create_embedding_async(question, model=self.EMBEDDING_MODEL)
+            cached = self._answer_cache.lookup(question_vector, bucket=semantic_bucket)
+            if cached is not None:
+                print("✅ Answer served from the semantic cache")
+                self._remember_exact(exact_key, *cached, generation=generation)
+                return self._cached_answer(query, copy.deepcopy(cached[0]), cached[1])
+        except Exception as e:
+            print(f"⚠️ Semantic answer cache skipped: {e}")
+
+        retrieved = await self._retrieve_context(query)
+        if "error" in retrieved:
+            return retrieved
+        reports, market_data, context = retrieved["reports"], retrieved["market_data"], retrieved["context"]
+
+        # Get response using the inherited helper method, batched with concurrent
+        # questions over the same context when enabled
+        try:
+            if QA_MICRO_BATCHING:
+                answer = await self._batcher.answer(context, question)
+            else:
+                answer = await self._answer(context, question)
+        except Exception as e:
+            # Handle API call error
+            print(f"Error calling OpenAI API in QAAgent: {e}")
+            return {"error": f"Failed to get answer from LLM: {e}", "query": query}
+
+        # Store the query in Supabase
+        report_ids = [r['id'] for r in reports]
+        market_data_ids = [d['id'] for d in market_data]
+        stored_query = await self._store_answer(query, answer, report_ids, market_data_ids)
+
+        result = {
+            "answer": answer,
+            "reports_used": [{"id": r['id'], "title": r['title']} for r in reports],
+            "market_data_used": len(market_data)
+        }
+        if self._remember_exact(exact_key, result, market_data_ids, generation=generation) and question_vector is not None:
+            self._answer_cache.add(question_vector, (copy.deepcopy(result), market_data_ids), bucket=semantic_bucket)
+
+        return {"query": query, **result, "stored_query": stored_query}
+
+    def _cached_answer(self, query, result, market_data_ids):
+        """
+        Returns the response for a cached answer, recording the question in Supabase
+        in the background so that repeats still show up in the query history.
+        """
+        report_ids = [report["id"] for report in result["reports_used"]]
+        self._store_in_background(query, result["answer"], report_ids, market_data_ids)
+        return {"query": query, **result, "stored_query": None}
+
+    def _store_in_background(self, query, answer, report_ids, market_data_ids):
+        """
+        Starts _store_answer() as a task on the running loop without awaiting it.
+        """
+        task = asyncio.get_running_loop().create_task(self._store_answer(query, answer, report_ids, market_data_ids))
+        # Keep a reference so the task isn't garbage collected before it finishes
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    @classmethod
+    def clear_answer_cache(cls):
+        """
+        Drops every cached answer, so questions are answered from the current data.
+        """
+        with cls._answer_exact_lock:
+            cls._answer_generation += 1
+            cls._answer_exact.clear()
+        cls._answer_cache.clear()
+
+    def _exact_answer(self, exact_key):
+        """
+        Returns a copy of the cached result for an exact repeat and its market data
+        IDs, or None on a miss.
+        """
+        with self._answer_exact_lock:
+            entry = self._answer_exact.get(exact_key)
+            if entry is None:
+                return None
+            expires_at, result, market_data_ids = entry
+            if expires_at < time.monotonic():
+                del self._answer_exact[exact_key]
+                return None
+            self._answer_exact.move_to_end(exact_key)
+        return copy.deepcopy(result), market_data_ids
+
+    def _remember_exact(self, exact_key, result, market_data_ids, generation=None):
+        """
+        Caches a result for exact repeats, evicting the least recently used entries
+        once ANSWER_CACHE_MAXSIZE is exceeded.
+
+        Args:
+            generation (int, optional): The _answer_generation the result was built at;
+                the result is dropped if the answer caches were cleared since
+
+        Returns:
+            bool: True if the result was cached
+        """
+        entry = (time.monotonic() + ANSWER_CACHE_TTL, copy.deepcopy(result), market_data_ids)
+        with self._answer_exact_lock:
+            if generation is not None and generation != self._answer_generation:
+                return False
+            self._answer_exact[exact_key] = entry
+            self._answer_exact.move_to_end(exact_key)
+            while len(self._answer_exact) > ANSWER_CACHE_MAXSIZE:
+                self._answer_exact.popitem(last=False)
+        return True
+
+    async def astream(self, query):
+        """
+        Answer a question about Market reports, yielding the answer text as it is generated.
+
+        The query is stored in Supabase in the background once the answer is complete,
+        so the database write doesn't delay the end of the stream. Errors are yielded
+        as a single "Error: ..." chunk.
+
+        Args:
+            query (dict): The query parameters, see aprocess()
+
+        Yields:
+            str: Successive pieces of the answer
+        """
+        question = query.get('question')
+        if not question:
+            yield "Error: Question is required."
+            return
+
+        retrieved = await self._retrieve_context(query)
+        if "error" in retrieved:
+            yield f"Error: {retrieved['error']}"
+            return
+
+        parts = []
+        try:
+            async for delta in self._stream_openai_api_async(
+                messages=self._answer_messages(retrieved["context"], question),
+                model=self.model,
+                temperature=0.7
+            ):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            print(f"Error calling OpenAI API in QAAgent: {e}")
+            yield f"Error: Failed to get answer from LLM: {e}"
+            return
+
+        self._store_in_background(
+            query,
+            "".join(parts).strip(),
+            [r['id'] for r in retrieved["reports"]],
+            [d['id'] for d in retrieved["market_data"]]
         )
-        market_data = SupabaseService.get_market_data(
-            sector=sector, # Pass potentially None value
-            country=country, # Pass potentially None value
-            custom_keyword=custom_keyword # Pass potentially None value
+
+    async def _retrieve_context(self, query):
+        """
+        Fetch the reports and Market data matching the query and format them for the model.
+
+        Args:
+            query (dict): The query parameters, see aprocess()
+
+        Returns:
+            dict: The reports, market_data and formatted context, or an error
+        """
+        sector = query.get('sector')
+        country = query.get('country')
+        financial_product = query.get('financial_product')
+        custom_keyword = query.get('custom_keyword')
+        report_id = query.get('report_id')
+
+        # A specific report is looked up by ID on the server; otherwise filter the reports
+        if report_id:
+            report_filters = {"report_id": report_id}
+        else:
+            report_filters = {
+                "sector": sector, # Pass potentially None value
+                "country": country, # Pass potentially None value
+                "financial_product": financial_product, # Pass potentially None value
+                "custom_keyword": custom_keyword # Pass potentially None value
+            }
+
+        # Retrieve relevant reports and data from Supabase based on available filters;
+        # the two independent reads run concurrently
+        reports, market_data = await asyncio.gather(
+            SupabaseService.aget_reports(**report_filters),
+            SupabaseService.aget_market_data(
+                sector=sector, # Pass potentially None value
+                country=country, # Pass potentially None value
+                custom_keyword=custom_keyword # Pass potentially None value
+            )
         )
 
         # Debug print to check what data was retrieved
@@ -107,6 +372,9 @@ class QAAgent(BaseAgent):
                 "query": query
             }
 
+        # Keep the prompt within the input token budget
+        reports, market_data = self._fit_to_budget(query.get('question') or "", reports, market_data)
+
         # Format the reports for the model
         formatted_reports = self._format_reports_for_model(reports)
 
@@ -129,47 +397,149 @@ class QAAgent(BaseAgent):
                 "query": query
             }
 
-        # Prepare messages for the API call
-        messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": f"Question: {question}\n\nHere is the relevant Market information:\n\n{context}"}
-        ]
+        return {"reports": reports, "market_data": market_data, "context": context}
 
-        # Get response using the inherited helper method
-        try:
-            answer = self._call_openai_api(messages=messages, model=self.model, temperature=0.7)
-        except Exception as e:
-            # Handle API call error
-            print(f"Error calling OpenAI API in QAAgent: {e}")
-            return {"error": f"Failed to get answer from LLM: {e}", "query": query}
+    def _fit_to_budget(self, question, reports, market_data):
+        """
+        Trim the retrieved records so the prompt stays within max_input_tokens.
 
-        # Store the query in Supabase
+        Records are returned unchanged when they fit. Otherwise the most recent
+        Market data points are kept, using at most half of the budget when there
+        are reports, and the most recent reports fill the rest; the first report
+        that doesn't fit is truncated, and older ones are dropped.
+
+        Args:
+            question (str): The user's question
+            reports (list): List of report records
+            market_data (list): List of Market data records
+
+        Returns:
+            tuple: The reports and Market data records to send to the model
+        """
+        budget = (self.max_input_tokens - self.CONTEXT_SAFETY_TOKENS) * self.CHARS_PER_TOKEN
+        budget -= len(self.system_prompt) + len(question)
+
+        # Approximate formatted sizes, including headings
+        def data_cost(data):
+            return sum(len(str(data.get(field))) for field in ('data_point', 'value', 'source', 'date')) + 40
+
+        def report_overhead(report):
+            return len(report.get('title') or "") + len(report.get('summary') or "") + 60
+
+        data_costs = [data_cost(data) for data in market_data]
+        report_costs = [report_overhead(report) + len(report.get('content') or "") for report in reports]
+        if sum(data_costs) + sum(report_costs) <= budget:
+            return reports, market_data
+
+        # Market data, most recent first
+        data_budget = budget // 2 if reports else budget
+        kept_data = []
+        used = 0
+        for cost, data in sorted(zip(data_costs, market_data), key=lambda pair: str(pair[1].get('date') or ""), reverse=True):
+            if used + cost > data_budget:
+                break
+            kept_data.append(data)
+            used += cost
+
+        # Reports, most recent first
+        remaining = budget - used
+        kept_reports = []
+        for cost, report in sorted(zip(report_costs, reports), key=lambda pair: str(pair[1].get('created_at') or ""), reverse=True):
+            if cost <= remaining:
+                kept_reports.append(report)
+                remaining -= cost
+                continue
+            room = remaining - report_overhead(report)
+            if room >= self.MIN_TRUNCATED_REPORT_CHARS:
+                kept_reports.append({**report, 'content': report['content'][:room] + "\n\n[Content truncated]"})
+            break
+
+        print(f"⚠️ Context trimmed to fit {self.max_input_tokens} tokens: "
+              f"{len(kept_reports)}/{len(reports)} reports, {len(kept_data)}/{len(market_data)} Market data points")
+        return kept_reports, kept_data
+
+    async def _store_answer(self, query, answer, report_ids, market_data_ids):
+        """
+        Store an answered question in Supabase without blocking the event loop.
+
+        Args:
+            query (dict): The query parameters, see aprocess()
+            answer (str): The answer given
+            report_ids (list): IDs of the reports the answer was based on
+            market_data_ids (list): IDs of the Market data the answer was based on
+
+        Returns:
+            dict: The stored query record
+        """
         entities = {
-            "sector": sector,
-            "country": country,
-            "financial_product": financial_product,
-            "custom_keyword": custom_keyword,
+            "sector": query.get('sector'),
+            "country": query.get('country'),
+            "financial_product": query.get('financial_product'),
+            "custom_keyword": query.get('custom_keyword'),
             "report_id": query.get('report_id')
         }
 
-        stored_query = SupabaseService.store_query(
-            query_text=question,
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(
+            SupabaseService.store_query,
+            query_text=query.get('question'),
             entities=entities,
             intent="question_answering",
             response=answer,
             metadata={
-                "reports_used": [r['id'] for r in reports],
-                "market_data_used": [d['id'] for d in market_data]
+                "reports_used": report_ids,
+                "market_data_used": market_data_ids
             }
+        ))
+
+    async def _answer(self, context, question):
+        """
+        Answer one question about the given context.
+
+        Returns:
+            str: The answer
+        """
+        return await self._call_openai_api_async(
+            messages=self._answer_messages(context, question),
+            model=self.model,
+            temperature=0.7
         )
 
-        return {
-            "query": query,
-            "answer": answer,
-            "reports_used": [{"id": r['id'], "title": r['title']} for r in reports],
-            "market_data_used": len(market_data),
-            "stored_query": stored_query
-        }
+    def _answer_messages(self, context, question):
+        """
+        Build the chat messages asking one question about the given context.
+        """
+        # The question goes last so that follow-up questions over the same context
+        # share the longest possible cached prefix
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": f"Here is the relevant Market information:\n\n{context}\n\nQuestion: {question}"}
+        ]
+
+    async def _answer_batch(self, context, questions):
+        """
+        Answer several independent questions about the same context with one completion.
+        Questions the model leaves unanswered are retried individually.
+
+        Returns:
+            list: The answers, in the order of the questions
+        """
+        numbered = "\n".join(f"{i}. {question}" for i, question in enumerate(questions, 1))
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": f"Here is the relevant Market information:\n\n{context}\n\nAnswer each of the following questions independently, using its number as the id.\n\nQuestions:\n{numbered}"}
+        ]
+        response_text = await self._call_openai_api_async(
+            messages=messages,
+            model=self.model,
+            temperature=0.7,
+            response_format=_QA_BATCH_RESPONSE_FORMAT
+        )
+        by_id = {item["id"]: item["answer"] for item in json.loads(response_text)["answers"]}
+        return [
+            by_id[i] if i in by_id else await self._answer(context, question)
+            for i, question in enumerate(questions, 1)
+        ]
 
     def _format_reports_for_model(self, reports):
         """
@@ -184,23 +554,25 @@ class QAAgent(BaseAgent):
         if not reports:
             return ""
 
-        formatted_reports = ""
+        # Collect the pieces and join once; repeated += copies the growing string
+        parts = []
+        last = len(reports) - 1
 
         for i, report in enumerate(reports):
-            formatted_reports += f"## Report {i+1}: {report['title']}\n\n"
+            parts.append(f"## Report {i+1}: {report['title']}\n\n")
 
             # Add summary if available
-            if 'summary' in report and report['summary']:
-                formatted_reports += f"### Summary\n{report['summary']}\n\n"
+            if report.get('summary'):
+                parts.append(f"### Summary\n{report['summary']}\n\n")
 
             # Add content
-            formatted_reports += f"### Content\n{report['content']}\n\n"
+            parts.append(f"### Content\n{report['content']}\n\n")
 
             # Add separator between reports
-            if i < len(reports) - 1:
-                formatted_reports += "---\n\n"
+            if i < last:
+                parts.append("---\n\n")
 
-        return formatted_reports
+        return "".join(parts)
 
     def _format_market_data_for_model(self, market_data):
         """
@@ -215,40 +587,35 @@ class QAAgent(BaseAgent):
         if not market_data:
             return ""
 
-        # Group data by sector and country
-        grouped_data = {}
+        # Group data by (sector, country); the first row of a group supplies its keyword
+        grouped_data = defaultdict(dict)
+        keywords = {}
         for data in market_data:
-            key = f"{data['sector']}_{data['country']}"
-            if key not in grouped_data:
-                grouped_data[key] = {
-                    "sector": data['sector'],
-                    "country": data['country'],
-                    "custom_keyword": data.get('custom_keyword'),
-                    "data_points": {}
-                }
-
-            # Add the data point
-            grouped_data[key]["data_points"][data['data_point']] = {
-                "value": data['value'],
-                "source": data['source'],
-                "date": data['date']
-            }
+            key = (data['sector'], data['country'])
+            grouped_data[key][data['data_point']] = (data['value'], data['source'], data['date'])
+            keywords.setdefault(key, data.get('custom_keyword'))
 
         # Format the grouped data
-        formatted_data = ""
-        for key, group in grouped_data.items():
-            title = f"{group['sector']} in {group['country']}"
-            if group.get('custom_keyword'):
-                title += f" - {group['custom_keyword']}"
+        parts = []
+        for key, data_points in grouped_data.items():
+            sector, country = key
+            title = f"{sector} in {country}"
+            if keywords[key]:
+                title += f" - {keywords[key]}"
+
+            parts.append(f"## {title}\n\n")
 
-            formatted_data += f"## {title}\n\n"
+            for data_point, (value, source, date) in data_points.items():
+                parts.append(
+                    f"### {data_point.replace('_', ' ').title()}\n"
+                    f"Value: {value}\n"
+                    f"Source: {source}\n"
+                    f"Date: {date}\n\n"
+                )
 
-            for data_point, details in group['data_points'].items():
-                formatted_data += f"### {data_point.replace('_', ' ').title()}\n"
-                formatted_data += f"Value: {details['value']}\n"
-                formatted_data += f"Source: {details['source']}\n"
-                formatted_data += f"Date: {details['date']}\n\n"
+            parts.append("---\n\n")
 
-            formatted_data += "---\n\n"
+        return "".join(parts)
 
-        return formatted_data
+# Answers go stale as soon as the data they were built from changes
+SupabaseService.on_invalidate(QAAgent.clear_answer_cache)
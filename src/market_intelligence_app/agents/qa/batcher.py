@@ -0,0 +1,81 @@
+import asyncio
+import weakref
+
+class QABatcher:
+    """
+    Micro-batches QA questions asked over the same context.
+
+    Questions arriving within `window` seconds of each other with an identical
+    context (the same reports and Market data) are answered by a single
+    completion, up to `max_batch` questions at a time. Each caller awaits its
+    own answer. Questions over different contexts are never mixed, since one
+    question's context could leak into another's answer.
+    """
+
+    def __init__(self, agent, window=0.05, max_batch=8):
+        """
+        Initializes the batcher.
+
+        Args:
+            agent (QAAgent): The agent whose _answer/_answer_batch methods are used
+            window (float, optional): Seconds to wait for more questions. Defaults to 0.05.
+            max_batch (int, optional): Questions answered per completion. Defaults to 8.
+        """
+        self.agent = agent
+        self.window = window
+        self.max_batch = max_batch
+        # Pending (question, future) pairs per context, for each event loop
+        self._pending = weakref.WeakKeyDictionary()
+
+    async def answer(self, context, question):
+        """
+        Queue a question and wait for its answer.
+
+        Args:
+            context (str): The formatted reports and Market data
+            question (str): The user's question
+
+        Returns:
+            str: The answer
+        """
+        loop = asyncio.get_running_loop()
+        pending = self._pending.setdefault(loop, {})
+        future = loop.create_future()
+        batch = pending.setdefault(context, [])
+        batch.append((question, future))
+
+        if len(batch) >= self.max_batch:
+            # Detach the full batch now so later questions start a new one
+            del pending[context]
+            loop.create_task(self._run(context, batch))
+        elif len(batch) == 1:
+            loop.create_task(self._flush_later(pending, context, batch))
+        return await future
+
+    async def _flush_later(self, pending, context, batch):
+        """
+        Answer a batch once the window has passed, unless it already filled up.
+        """
+        await asyncio.sleep(self.window)
+        if pending.get(context) is batch:
+            del pending[context]
+            await self._run(context, batch)
+
+    async def _run(self, context, batch):
+        """
+        Answer the (question, future) pairs of one batch.
+        """
+        questions = [question for question, _ in batch]
+        try:
+            if len(questions) == 1:
+                answers = [await self.agent._answer(context, questions[0])]
+            else:
+                answers = await self.agent._answer_batch(context, questions)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), answer in zip(batch, answers):
+            if not future.done():
+                future.set_result(answer)
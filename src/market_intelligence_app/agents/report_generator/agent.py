@@ -1,22 +1,67 @@
-import os
 import json
-import sys
-from dotenv import load_dotenv
-from ..base_agent import BaseAgent
+import uuid
+import queue
+import asyncio
+import functools
+from collections import defaultdict
+from operator import itemgetter
+from pathlib import Path
+from typing import Final
+from ..base_agent import BaseAgent, run_async, submit_async
 from supabase_service import SupabaseService
+from config.settings import AGENT_SETTINGS
 from openai import OpenAI
 
-# Add parent directory to path to import base_agent
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-# Load environment variables
-load_dotenv()
+# orjson encodes and decodes several times faster than the stdlib; fall back if missing
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
+
+# Byte-identical on every call so the server can reuse the cached prompt prefix
+SYSTEM_PROMPT: Final[str] = """You are an expert financial analyst specializing in equipment financing markets for Market.
+Your task is to generate comprehensive, well-structured Market reports based on the data provided.
+
+Your reports should include:
+1. Executive Summary: A concise overview of the key findings
+2. Market Overview: Size, growth rate, and key trends
+3. Competitive Landscape: Key players and their Market positions
+4. Regulatory Environment: Relevant regulations and their impact
+5. Economic Factors: Economic indicators affecting the Market
+6. Opportunities and Challenges: Potential opportunities and challenges in the Market
+7. Recommendations: Strategic recommendations for Market
+
+For each section, cite the specific data points used and their sources.
+Use a professional, analytical tone throughout the report.
+Format the report in a clear, structured manner with headings and subheadings.
+Structure the report clearly with sections like Executive Summary, Market Overview, Key Trends, Competitive Landscape, and Conclusion."""
+
+_SUMMARY_SYSTEM_PROMPT: Final[str] = "You are an expert at summarizing financial reports. Create a concise executive summary of the following Market report, highlighting the key findings and recommendations."
+
+# Fields of a market_data row shown to the model, fetched in one C-level call
+_VALUE_SOURCE_DATE = itemgetter('value', 'source', 'date')
+
+# The only market_data columns the report is built from
+_REPORT_DATA_COLUMNS = "data_point,value,source,date"
+
+# Default Batch API input file used by enqueue()/submit_batch()/drain_batch()
+DEFAULT_BATCH_PATH = ".cache/batches/report_generation.jsonl"
 
 class ReportGeneratorAgent(BaseAgent):
     """
     Agent responsible for generating comprehensive reports based on Market data stored in Supabase.
     """
 
+    # Shared module-level prompt; BaseAgent uses it instead of _get_system_prompt()
+    SYSTEM_PROMPT = SYSTEM_PROMPT
+
+    # Executive summaries are a few paragraphs at most
+    SUMMARY_MAX_TOKENS = 300
+
     def __init__(self, openai_client: OpenAI = None):
         """
         Initializes the ReportGeneratorAgent.
@@ -31,33 +76,35 @@ class ReportGeneratorAgent(BaseAgent):
         )
         # Store the desired model for this agent
         self.model = "gpt-4o" # Or choose a suitable model for report generation
+        # Bounds the length, and so the latency, of the report completion
+        self.max_tokens = AGENT_SETTINGS["report_generator"]["max_tokens"]
 
-    def _get_system_prompt(self):
+    def process(self, query, on_chunk=None):
         """
-        Get the system prompt for the Report Generator Agent.
+        Process a report generation query and store the results in Supabase.
+
+        Synchronous wrapper around aprocess() for callers without an event loop.
+
+        Args:
+            query (dict): The query parameters, see aprocess()
+            on_chunk (callable, optional): Called with each piece of the report as it is
+                generated, on the calling thread (Streamlit elements can't be updated
+                from the agents' event loop thread)
 
         Returns:
-            str: The system prompt
+            dict: The generated report
         """
-        return """
-        You are an expert financial analyst specializing in equipment financing markets for Market.
-        Your task is to generate comprehensive, well-structured Market reports based on the data provided.
-
-        Your reports should include:
-        1. Executive Summary: A concise overview of the key findings
-        2. Market Overview: Size, growth rate, and key trends
-        3. Competitive Landscape: Key players and their Market positions
-        4. Regulatory Environment: Relevant regulations and their impact
-        5. Economic Factors: Economic indicators affecting the Market
-        6. Opportunities and Challenges: Potential opportunities and challenges in the Market
-        7. Recommendations: Strategic recommendations for Market
+        if on_chunk is None:
+            return run_async(self.aprocess(query))
 
-        For each section, cite the specific data points used and their sources.
-        Use a professional, analytical tone throughout the report.
-        Format the report in a clear, structured manner with headings and subheadings.
-        """ + " Structure the report clearly with sections like Executive Summary, Market Overview, Key Trends, Competitive Landscape, and Conclusion."
+        chunks = queue.Queue()
+        future = submit_async(self.aprocess(query, on_chunk=chunks.put))
+        future.add_done_callback(lambda _: chunks.put(None))
+        for chunk in iter(chunks.get, None):
+            on_chunk(chunk)
+        return future.result()
 
-    def process(self, query):
+    async def aprocess(self, query, on_chunk=None):
         """
         Process a report generation query and store the results in Supabase.
 
@@ -66,36 +113,20 @@ class ReportGeneratorAgent(BaseAgent):
                 - sector (str): The Market sector
                 - country (str): The country
                 - financial_product (str, optional): The financial product
+            on_chunk (callable, optional): Called with each piece of the report as it is
+                generated, so a UI can show it before the completion (and the summary
+                that follows it) finishes. Defaults to None.
 
         Returns:
             dict: The generated report
         """
-        # Get parameters safely
         sector = query.get('sector')
-        country = query.get('country') # Use .get() for country
-        financial_product = query.get('financial_product')
-        custom_keyword = query.get('custom_keyword')
-
         if not sector:
             return {"error": "Sector is required for report generation."}
-        # Removed check requiring country
 
-        # Retrieve Market data from Supabase - Attempt 1 (with custom_keyword)
-        print(f"Attempting to retrieve data for Sector: {sector}, Country: {country}, Keyword: {custom_keyword}")
-        market_data = SupabaseService.get_market_data(
-            sector=sector,
-            country=country, # Pass country (can be None)
-            custom_keyword=custom_keyword # Pass custom_keyword (can be None)
-        )
-
-        # Attempt 2 (fallback without custom_keyword if Attempt 1 failed and keyword was present)
-        if not market_data and custom_keyword:
-            print(f"⚠️ No data found with keyword '{custom_keyword}'. Trying fallback without keyword.")
-            market_data = SupabaseService.get_market_data(
-                sector=sector,
-                country=country, # Pass country (can be None)
-                custom_keyword=None # Fallback retrieval
-            )
+        # Both reads, including the keyword fallback, run in one worker thread
+        loop = asyncio.get_running_loop()
+        market_data = await loop.run_in_executor(None, self._fetch_market_data, query)
 
         # Final check if data exists
         if not market_data:
@@ -107,35 +138,27 @@ class ReportGeneratorAgent(BaseAgent):
                 }
             }
 
-        # Format the data for the model
-        formatted_data = self._format_data_for_model(market_data)
-
-        # Format the query for the model
-        report_title = f"Market Report: {sector} Sector"
-        if country:
-            report_title += f" in {country}"
-        if financial_product:
-            report_title += f" - {financial_product} Products"
-        if custom_keyword:
-            report_title += f" ({custom_keyword})"
-
-        formatted_query = f"Generate a comprehensive Market report for the {sector} sector"
-        if country:
-            formatted_query += f" in {country}"
-        if financial_product:
-            formatted_query += f", focusing on {financial_product} products"
-        if custom_keyword:
-            formatted_query += f", with specific emphasis on {custom_keyword}"
-
-        # Prepare messages for main report generation
-        report_messages = [
-            {"role": "system", "content": self.system_prompt},
-            {"role": "user", "content": f"{formatted_query}\n\nHere is the Market data to use:\n\n{formatted_data}"}
-        ]
-
         # Get response using the inherited helper method
+        report_messages = self._report_messages(query, market_data)
         try:
-            report_content = self._call_openai_api(messages=report_messages, model=self.model, temperature=0.7)
+            if on_chunk is None:
+                report_content = await self._call_openai_api_async(
+                    messages=report_messages,
+                    model=self.model,
+                    temperature=0.7,
+                    max_tokens=self.max_tokens
+                )
+            else:
+                parts = []
+                async for delta in self._stream_openai_api_async(
+                    messages=report_messages,
+                    model=self.model,
+                    temperature=0.7,
+                    max_tokens=self.max_tokens
+                ):
+                    parts.append(delta)
+                    on_chunk(delta)
+                report_content = "".join(parts).strip()
         except Exception as e:
             print(f"Error calling OpenAI API for report content: {e}")
             # Nest the error under 'result' for consistent UI handling
@@ -146,55 +169,239 @@ class ReportGeneratorAgent(BaseAgent):
                 }
             }
 
+        # Return results nested under 'result' key for consistency
+        return {
+            "query": query,
+            "result": await self._summarize_and_store(query, report_content, len(market_data))
+        }
+
+    @staticmethod
+    def _fetch_market_data(query):
+        """
+        Retrieve the Market data for a report, retrying without the custom keyword
+        if nothing matches it.
+
+        Returns:
+            list: List of Market data records
+        """
+        sector = query.get('sector')
+        country = query.get('country')
+        custom_keyword = query.get('custom_keyword')
+
+        # Retrieve Market data from Supabase - Attempt 1 (with custom_keyword)
+        print(f"Attempting to retrieve data for Sector: {sector}, Country: {country}, Keyword: {custom_keyword}")
+        market_data = SupabaseService.get_market_data(
+            sector=sector,
+            country=country, # Pass country (can be None)
+            custom_keyword=custom_keyword, # Pass custom_keyword (can be None)
+            columns=_REPORT_DATA_COLUMNS
+        )
+
+        # Attempt 2 (fallback without custom_keyword if Attempt 1 failed and keyword was present)
+        if not market_data and custom_keyword:
+            print(f"⚠️ No data found with keyword '{custom_keyword}'. Trying fallback without keyword.")
+            market_data = SupabaseService.get_market_data(
+                sector=sector,
+                country=country, # Pass country (can be None)
+                custom_keyword=None, # Fallback retrieval
+                columns=_REPORT_DATA_COLUMNS
+            )
+        return market_data
+
+    @staticmethod
+    def _report_title(query):
+        """
+        Build the stored title of the report for a query.
+        """
+        parts = [f"Market Report: {query.get('sector')} Sector"]
+        if query.get('country'):
+            parts.append(f" in {query['country']}")
+        if query.get('financial_product'):
+            parts.append(f" - {query['financial_product']} Products")
+        if query.get('custom_keyword'):
+            parts.append(f" ({query['custom_keyword']})")
+        return "".join(parts)
+
+    def _report_messages(self, query, market_data):
+        """
+        Build the chat messages asking for the report on the given Market data.
+        """
+        parts = [f"Generate a comprehensive Market report for the {query.get('sector')} sector"]
+        if query.get('country'):
+            parts.append(f" in {query['country']}")
+        if query.get('financial_product'):
+            parts.append(f", focusing on {query['financial_product']} products")
+        if query.get('custom_keyword'):
+            parts.append(f", with specific emphasis on {query['custom_keyword']}")
+        parts.append("\n\nHere is the Market data to use:\n\n")
+        parts.append(self._format_data_for_model(market_data))
+
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": "".join(parts)}
+        ]
+
+    async def _summarize_and_store(self, query, report_content, data_points):
+        """
+        Summarize a generated report and store both in Supabase.
+
+        Args:
+            query (dict): The query parameters the report was generated for
+            report_content (str): The generated report
+            data_points (int): Number of Market data records the report is based on
+
+        Returns:
+            dict: The report and the stored record (or storage error)
+        """
+        custom_keyword = query.get('custom_keyword')
+        report_title = self._report_title(query)
+
         # Prepare messages for summary generation
         summary_messages = [
-            {"role": "system", "content": "You are an expert at summarizing financial reports. Create a concise executive summary of the following Market report, highlighting the key findings and recommendations."},
+            {"role": "system", "content": _SUMMARY_SYSTEM_PROMPT},
             {"role": "user", "content": report_content}
         ]
 
         # Generate a summary using the helper method
         try:
             # Using a smaller model for the summary
-            report_summary = self._call_openai_api(messages=summary_messages, model="gpt-4o-mini", temperature=0.5)
+            report_summary = await self._call_openai_api_async(messages=summary_messages, model="gpt-4o-mini", temperature=0.5, max_tokens=self.SUMMARY_MAX_TOKENS)
         except Exception as e:
             print(f"Error calling OpenAI API for report summary: {e}")
             # Proceed without summary or return error?
             report_summary = "Error generating summary."
 
         # Prepare metadata
-        metadata = {"data_points": len(market_data)}
+        metadata = {"data_points": data_points}
         if custom_keyword:
             metadata['custom_keyword'] = custom_keyword
 
-        # Store the report in Supabase
+        # Store the report in Supabase without blocking the event loop
+        financial_product = query.get('financial_product')
         financial_product_to_store = financial_product if financial_product else 'General'
+        loop = asyncio.get_running_loop()
         try:
-            stored_report = SupabaseService.store_report(
+            stored_report = await loop.run_in_executor(None, functools.partial(
+                SupabaseService.store_report,
                 title=report_title,
-                sector=sector, # sector is required
-                country=country, # Pass country (can be None)
+                sector=query.get('sector'), # sector is required
+                country=query.get('country'), # Pass country (can be None)
                 financial_product=financial_product_to_store,
                 content=report_content,
                 summary=report_summary,
                 metadata=metadata,
                 custom_keyword=custom_keyword # Pass custom_keyword (can be None)
-            )
+            ))
         except Exception as e:
             print(f"Error storing report: {e}")
             stored_report = {"error": f"Failed to store report: {e}"}
 
-        # Return results nested under 'result' key for consistency
         return {
-            "query": query,
-            "result": { # Nest the report details here
-                "report": {
-                    "title": report_title,
-                    "content": report_content,
-                    "summary": report_summary
-                },
-                "stored_report": stored_report # Include storage status/info
+            "report": {
+                "title": report_title,
+                "content": report_content,
+                "summary": report_summary
+            },
+            "stored_report": stored_report # Include storage status/info
+        }
+
+    def enqueue(self, query, batch_path=DEFAULT_BATCH_PATH):
+        """
+        Append the report request for a query to a Batch API input file.
+
+        The Market data is read now and embedded in the request; the query is
+        recorded in a sidecar file next to it, so drain_batch() can summarize and
+        store the report later, possibly from another process.
+
+        Args:
+            query (dict): The query parameters, see aprocess()
+            batch_path (str, optional): The JSONL batch input file
+
+        Returns:
+            str: The job ID identifying this query's request in the batch, or None if
+                there is no Market data to report on
+        """
+        if not query.get('sector'):
+            raise ValueError("Sector is required for report generation.")
+        market_data = self._fetch_market_data(query)
+        if not market_data:
+            return None
+        job_id = uuid.uuid4().hex
+
+        request = {
+            "custom_id": job_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": self._report_messages(query, market_data),
+                "temperature": 0.7,
+                "max_tokens": self.max_tokens
             }
         }
+        Path(batch_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(batch_path, "a", encoding="utf-8") as batch_file:
+            batch_file.write(_dumps(request) + "\n")
+        with open(self._batch_queries_path(batch_path), "a", encoding="utf-8") as queries_file:
+            queries_file.write(_dumps({"job_id": job_id, "query": query, "data_points": len(market_data)}) + "\n")
+
+        return job_id
+
+    def submit_batch(self, batch_path=DEFAULT_BATCH_PATH):
+        """
+        Upload a batch input file and start a Batch API job for it. The file is
+        moved to {batch_path}.{batch_id}, so the next enqueue() starts a new batch.
+
+        Returns:
+            str: The batch ID to pass to drain_batch()
+        """
+        return self._submit_batch_file(batch_path)
+
+    def drain_batch(self, batch_id, batch_path=DEFAULT_BATCH_PATH):
+        """
+        Summarize and store the reports of a finished Batch API job.
+
+        The summaries are short gpt-4o-mini completions, requested concurrently.
+
+        Args:
+            batch_id (str): The ID returned by submit_batch()
+            batch_path (str, optional): The batch input file the job was created from
+
+        Returns:
+            dict: The batch status and, once completed, the report results per job ID
+        """
+        client = self.client
+        batch = client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            return {"status": batch.status}
+
+        with open(self._batch_queries_path(batch_path, batch_id), encoding="utf-8") as queries_file:
+            jobs = {entry["job_id"]: entry for entry in map(_loads, queries_file)}
+
+        reports = {}
+        with client.files.with_streaming_response.content(batch.output_file_id) as output:
+            for line in output.iter_lines():
+                if not line:
+                    continue
+                record = _loads(line)
+                job_id = record["custom_id"]
+                response = record.get("response") or {}
+                if record.get("error") or response.get("status_code") != 200:
+                    print(f"⚠️ Batch report {job_id} failed: {record.get('error')}")
+                    continue
+                if job_id not in jobs:
+                    print(f"⚠️ No query recorded for batch report {job_id}")
+                    continue
+                reports[job_id] = response["body"]["choices"][0]["message"]["content"].strip()
+
+        async def finish():
+            results = await asyncio.gather(*[
+                self._summarize_and_store(jobs[job_id]["query"], content, jobs[job_id]["data_points"])
+                for job_id, content in reports.items()
+            ])
+            return dict(zip(reports, results))
+
+        return {"status": batch.status, "reports": run_async(finish())}
 
     def _format_data_for_model(self, market_data):
         """
@@ -206,23 +413,21 @@ class ReportGeneratorAgent(BaseAgent):
         Returns:
             str: Formatted Market data
         """
-        formatted_data = ""
-
         # Group data by data_point
-        data_by_point = {}
+        data_by_point = defaultdict(list)
         for item in market_data:
-            data_point = item['data_point']
-            if data_point not in data_by_point:
-                data_by_point[data_point] = []
-            data_by_point[data_point].append(item)
+            data_by_point[item['data_point']].append(item)
 
-        # Format each data point
+        # Format each data point, joining the pieces once at the end
+        parts = []
         for data_point, items in data_by_point.items():
-            formatted_data += f"## {data_point.replace('_', ' ').title()}\n\n"
+            parts.append(f"## {data_point.replace('_', ' ').title()}\n\n")
 
-            for item in items:
-                formatted_data += f"- Value: {item['value']}\n"
-                formatted_data += f"  Source: {item['source']}\n"
-                formatted_data += f"  Date: {item['date']}\n\n"
+            for value, source, date in map(_VALUE_SOURCE_DATE, items):
+                parts.append(
+                    f"- Value: {value}\n"
+                    f"  Source: {source}\n"
+                    f"  Date: {date}\n\n"
+                )
 
-        return formatted_data
+        return "".join(parts)
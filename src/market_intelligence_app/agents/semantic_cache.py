@@ -0,0 +1,103 @@
+import time
+import threading
+from typing import Any, Hashable, Optional
+import numpy as np
+
+def normalize(vector) -> np.ndarray:
+    """
+    Convert an embedding to a unit-length NumPy array so a dot product is the cosine similarity.
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SemanticCache:
+    """
+    Nearest-neighbour cache over query embeddings.
+
+    Embeddings are L2-normalized and kept in a preallocated (max_entries, dim)
+    matrix used as a ring buffer, so a lookup is one matrix-vector product and,
+    once full, the oldest entry is overwritten. Entries expire after `ttl`
+    seconds (never if ttl is None). An optional bucket restricts a lookup to
+    entries stored under the same bucket, e.g. the same report filters.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl: Optional[float] = 3600, max_entries: int = 2048):
+        """
+        Initializes the cache.
+
+        Args:
+            threshold (float, optional): Cosine similarity at or above which an entry is reused. Defaults to 0.92.
+            ttl (float, optional): Seconds an entry stays valid, or None to keep it until evicted. Defaults to 3600.
+            max_entries (int, optional): Capacity before the oldest entries are overwritten. Defaults to 2048.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._vectors = None
+        self._expires = np.full(max_entries, np.inf)
+        self._buckets = np.zeros(max_entries, dtype=np.int64)
+        self._payloads = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        """
+        Drop every entry.
+        """
+        with self._lock:
+            self._expires[:] = np.inf
+            self._payloads = [None] * self.max_entries
+            self._size = 0
+            self._next = 0
+
+    def add(self, vector, payload: Any, bucket: Optional[Hashable] = None, ttl: Optional[float] = None):
+        """
+        Store a payload under the given embedding.
+
+        Args:
+            vector: The query embedding (normalized here)
+            payload: The value returned by later similar lookups
+            bucket (Hashable, optional): Only lookups with the same bucket can match
+            ttl (float, optional): Seconds this entry stays valid, overriding the cache's ttl
+        """
+        vector = normalize(vector)
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            slot = self._next
+            self._vectors[slot] = vector
+            self._expires[slot] = time.monotonic() + ttl if ttl is not None else np.inf
+            self._buckets[slot] = hash(bucket)
+            self._payloads[slot] = payload
+            self._next = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def lookup(self, vector, bucket: Optional[Hashable] = None):
+        """
+        Find the payload stored under the most similar live embedding.
+
+        Args:
+            vector: The query embedding (normalized here)
+            bucket (Hashable, optional): Restrict the search to entries added with this bucket
+
+        Returns:
+            The cached payload, or None if nothing is similar enough
+        """
+        vector = normalize(vector)
+        with self._lock:
+            if not self._size:
+                return None
+            scores = self._vectors[:self._size] @ vector
+            stale = (self._expires[:self._size] <= time.monotonic()) | (self._buckets[:self._size] != hash(bucket))
+            scores[stale] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return self._payloads[best]
+            return None
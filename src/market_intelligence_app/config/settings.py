@@ -23,6 +23,19 @@ APP_NAME = "Market Intelligence Platform"
 APP_VERSION = "1.0.0"
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 
+# Cache settings
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))  # seconds
+RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "512"))
+READ_CACHE_TTL = int(os.getenv("READ_CACHE_TTL", "60"))  # seconds
+READ_CACHE_MAXSIZE = int(os.getenv("READ_CACHE_MAXSIZE", "256"))
+COLLECTION_CACHE_TTL = int(os.getenv("COLLECTION_CACHE_TTL", "86400"))  # seconds
+COLLECTION_CACHE_MAXSIZE = int(os.getenv("COLLECTION_CACHE_MAXSIZE", "256"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds
+ANSWER_CACHE_MAXSIZE = int(os.getenv("ANSWER_CACHE_MAXSIZE", "512"))
+
+# Answer concurrent QA questions over the same context with one completion
+QA_MICRO_BATCHING = os.getenv("QA_MICRO_BATCHING", "False").lower() == "true"
+
 # Agent settings
 AGENT_SETTINGS = {
     "orchestrator": {
@@ -0,0 +1,5 @@
+"""
+Database schema for the Market Intelligence Platform.
+"""
+
+# This file is intentionally left empty to mark the directory as a Python package.
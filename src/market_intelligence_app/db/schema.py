@@ -0,0 +1,92 @@
+"""
+Table definitions for the Market Intelligence Platform.
+
+This is the single source of truth for the Supabase schema used by the
+setup scripts. Column types are PostgreSQL types.
+"""
+
+from typing import Dict
+
+# Table name -> column name -> column definition
+TABLES: Dict[str, Dict[str, str]] = {
+    "market_data": {
+        "id": "UUID PRIMARY KEY",
+        "sector": "TEXT",
+        "country": "TEXT",
+        "data_point": "TEXT",
+        "value": "TEXT",
+        "source": "TEXT",
+        "date": "TEXT",
+        "custom_keyword": "TEXT",
+        "metadata": "JSONB",
+        "created_at": "TIMESTAMP WITH TIME ZONE DEFAULT NOW()"
+    },
+    "reports": {
+        "id": "UUID PRIMARY KEY",
+        "title": "TEXT",
+        "sector": "TEXT",
+        "country": "TEXT",
+        "financial_product": "TEXT",
+        "content": "TEXT",
+        "summary": "TEXT",
+        "custom_keyword": "TEXT",
+        "created_at": "TIMESTAMP WITH TIME ZONE DEFAULT NOW()",
+        "updated_at": "TIMESTAMP WITH TIME ZONE DEFAULT NOW()",
+        "metadata": "JSONB"
+    },
+    "queries": {
+        "id": "UUID PRIMARY KEY",
+        "query_text": "TEXT",
+        "query": "TEXT",
+        "entities": "JSONB",
+        "intent": "TEXT",
+        "response": "TEXT",
+        "result": "TEXT",
+        "agent_type": "TEXT",
+        "custom_keyword": "TEXT",
+        "timestamp": "TIMESTAMP WITH TIME ZONE DEFAULT NOW()",
+        "created_at": "TIMESTAMP WITH TIME ZONE DEFAULT NOW()",
+        "metadata": "JSONB"
+    },
+    "workflows": {
+        "id": "UUID PRIMARY KEY",
+        "name": "TEXT",
+        "description": "TEXT",
+        "steps": "JSONB",
+        "created_at": "TIMESTAMP WITH TIME ZONE DEFAULT NOW()",
+        "updated_at": "TIMESTAMP WITH TIME ZONE DEFAULT NOW()",
+        "status": "TEXT",
+        "metadata": "JSONB"
+    },
+    "llm_cache": {
+        "id": "UUID PRIMARY KEY",
+        "cache_key": "TEXT UNIQUE",
+        "query_text": "TEXT",
+        "embedding": "JSONB",
+        "payload": "JSONB",
+        "created_at": "TIMESTAMP WITH TIME ZONE DEFAULT NOW()"
+    }
+}
+
+def table_ddl(table_name: str) -> str:
+    """
+    Build the CREATE TABLE IF NOT EXISTS statement for one table.
+
+    Args:
+        table_name: Name of a table in TABLES
+
+    Returns:
+        The CREATE TABLE statement, terminated by a semicolon
+    """
+    columns = ",\n".join(f"    {name} {definition}" for name, definition in TABLES[table_name].items())
+    return f"CREATE TABLE IF NOT EXISTS {table_name} (\n{columns}\n);"
+
+def generate_ddl() -> str:
+    """
+    Build a script that creates every table in a single transaction.
+
+    Returns:
+        The BEGIN; CREATE TABLE IF NOT EXISTS ...; COMMIT; script
+    """
+    statements = "\n\n".join(table_ddl(table_name) for table_name in TABLES)
+    return f"BEGIN;\n\n{statements}\n\nCOMMIT;"
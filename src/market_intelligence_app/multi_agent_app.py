@@ -1,13 +1,16 @@
 import os
 import json
+import time
 import streamlit as st
 from dotenv import load_dotenv
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from openai import OpenAI # Import the OpenAI class
+from pathlib import Path
 
 # Import our agent orchestrator
 from agents.orchestrator.agent import OrchestratorAgent
+from agents.base_agent import warm_up_shared_client
 from supabase_service import SupabaseService, mock_db
 
 # Determine the project root directory (two levels up from this script)
@@ -32,20 +35,44 @@ try:
         st.stop()
     # ---> ADD PRINT STATEMENT HERE <---
     print(f"Attempting to create OpenAI client with key ending in: ...{openai_api_key[-4:]}")
-    openai_client = OpenAI(api_key=openai_api_key)
-    # Optionally, add a test call here to verify the key immediately
-    # print("Testing client by listing models...")
-    # models = openai_client.models.list()
-    # print(f"Successfully listed models, client seems ok.")
+    # Reuse one client (and its connection pool) across Streamlit reruns, and open
+    # its connection now rather than on the first query
+    openai_client = warm_up_shared_client()
 except Exception as e:
     st.error(f"Failed to initialize OpenAI client: {e}")
     # ---> ADD PRINT STATEMENT HERE <---
     print(f"Client initialization failed. Key used (last 4 chars): ...{openai_api_key[-4:] if openai_api_key else 'None'}")
     st.stop()
 
+# Build the orchestrator and populate the sample data once per server process rather
+# than on every rerun. No spinner: set_page_config must be the first element on the page.
+@st.cache_resource(show_spinner=False)
+def get_orchestrator(_openai_client):
+    # Populate sample data for development/testing
+    SupabaseService.populate_sample_data()
+    return OrchestratorAgent(openai_client=_openai_client)
+
+# Thread pool for Supabase writes whose result the UI never reads. Cached so reruns
+# share one pool instead of starting new threads each time.
+@st.cache_resource(show_spinner=False)
+def get_background_executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="supabase-writes")
+
+def _report_background_error(future):
+    if future.exception() is not None:
+        print(f"❌ Background Supabase write failed: {future.exception()}")
+
+def store_in_background(func, *args, **kwargs):
+    """
+    Run a Supabase write without blocking the script run, logging any failure.
+    """
+    future = get_background_executor().submit(func, *args, **kwargs)
+    future.add_done_callback(_report_background_error)
+    return future
+
 # Initialize the orchestrator agent, passing the client
 try:
-    orchestrator = OrchestratorAgent(openai_client=openai_client)
+    orchestrator = get_orchestrator(openai_client)
 except Exception as e:
     st.error(f"Failed to initialize OrchestratorAgent: {e}. Check agent code.")
     # Print more details for debugging if needed
@@ -53,9 +80,6 @@ except Exception as e:
     # st.text(traceback.format_exc())
     st.stop()
 
-# Populate sample data for development/testing
-SupabaseService.populate_sample_data()
-
 # Set page configuration
 st.set_page_config(
     page_title="Market Intelligence Platform",
@@ -64,660 +88,23 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
-<style>
-    /* Hide default Streamlit navigation menu */
-    header {
-        visibility: hidden;
-    }
-    #MainMenu {
-        visibility: hidden;
-    }
-    footer {
-        visibility: hidden;
-    }
-    /* Hide top navigation tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        display: none;
-    }
-
-    /* Global styles */
-    .stApp {
-        background-color: #F8FAFC;
-    }
-
-    /* Market Color Variables */
-    :root {
-        --bpce-green: #00965E;
-        --bpce-blue: #0082C3;
-        --bpce-orange: #FF5F00;
-        --bpce-green-light: rgba(0, 150, 94, 0.1);
-        --bpce-blue-light: rgba(0, 130, 195, 0.1);
-        --bpce-orange-light: rgba(255, 95, 0, 0.1);
-    }
-
-    /* Header styles with decorative bar */
-    .main-header {
-        font-size: 2.5rem;
-        color: var(--bpce-green);
-        margin-bottom: 0.5rem;
-        font-weight: 700;
-        position: relative;
-        padding-bottom: 0.5rem;
-    }
-    .main-header::after {
-        content: "";
-        position: absolute;
-        left: 0;
-        bottom: 0;
-        height: 4px;
-        width: 100px;
-        background: linear-gradient(90deg, var(--bpce-green), var(--bpce-blue));
-        border-radius: 2px;
-    }
-
-    .sub-header {
-        font-size: 1.5rem;
-        color: var(--bpce-blue);
-        margin-bottom: 0.5rem;
-        font-weight: 600;
-        position: relative;
-        padding-bottom: 0.5rem;
-    }
-    .sub-header::after {
-        content: "";
-        position: absolute;
-        left: 0;
-        bottom: 0;
-        height: 3px;
-        width: 70px;
-        background: linear-gradient(90deg, var(--bpce-blue), rgba(0, 130, 195, 0.5));
-        border-radius: 2px;
-    }
-
-    /* Section divider */
-    .section-divider {
-        height: 1px;
-        background: linear-gradient(90deg, var(--bpce-green-light), var(--bpce-blue-light), rgba(0, 0, 0, 0));
-        margin: 1.5rem 0;
-        border: none;
-    }
-
-    /* Card styles with subtle shadow */
-    .card {
-        background-color: #FFFFFF;
-        border-radius: 0.5rem;
-        padding: 1.5rem;
-        margin-bottom: 1rem;
-        border-left: 4px solid var(--bpce-blue);
-        color: #111827;
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.05);
-        transition: transform 0.2s, box-shadow 0.2s;
-    }
-    .card:hover {
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.07);
-        transform: translateY(-2px);
-    }
-
-    /* Ensure all elements inside card have dark color */
-    .card * {
-        color: #111827 !important;
-    }
-
-    .info-text {
-        color: #4B5563;
-        font-size: 0.9rem;
-    }
-
-    .highlight {
-        background-color: var(--bpce-green-light);
-        padding: 0.2rem 0.5rem;
-        border-radius: 0.25rem;
-        font-weight: 500;
-        color: var(--bpce-green) !important;
-    }
-
-    /* Agent tag with improved styling */
-    .agent-tag {
-        background-color: var(--bpce-blue-light);
-        color: var(--bpce-blue) !important;
-        padding: 0.2rem 0.5rem;
-        border-radius: 0.25rem;
-        font-size: 0.8rem;
-        font-weight: 500;
-        margin-right: 0.5rem;
-        border: 1px solid rgba(0, 130, 195, 0.3);
-    }
-
-    /* Report container with improved styling */
-    .report-container {
-        border: 1px solid #E5E7EB;
-        border-radius: 0.5rem;
-        padding: 1.5rem;
-        margin-top: 1rem;
-        color: #111827;
-        background-color: #FFFFFF;
-        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.05);
-    }
-
-    /* Ensure all elements inside report-container have dark color */
-    .report-container * {
-        color: #111827 !important;
-    }
-
-    /* Additional styling for specific elements in reports */
-    .report-container h3, .report-container h4 {
-        color: var(--bpce-green) !important;
-        margin-top: 1rem;
-        margin-bottom: 0.5rem;
-        position: relative;
-        padding-bottom: 0.3rem;
-    }
-    .report-container h3::after {
-        content: "";
-        position: absolute;
-        left: 0;
-        bottom: 0;
-        height: 2px;
-        width: 50px;
-        background: linear-gradient(90deg, var(--bpce-green), rgba(0, 150, 94, 0.5));
-        border-radius: 1px;
-    }
-
-    .report-container p, .report-container li, .report-container div {
-        color: #111827 !important;
-        line-height: 1.6;
-    }
-
-    .report-container ul, .report-container ol {
-        margin-left: 1.5rem;
-        margin-bottom: 1rem;
-    }
-
-    /* Specific styling for report content */
-    .report-content {
-        color: #111827 !important;
-    }
-    .report-content * {
-        color: #111827 !important;
-    }
-
-    .answer-text {
-        color: #111827;
-        font-size: 1rem;
-        line-height: 1.5;
-    }
-
-    /* Ensure all elements inside answer-text have dark color */
-    .answer-text * {
-        color: #111827 !important;
-    }
-
-    /* Ensure progress text is dark */
-    .progress-text {
-        color: #111827;
-        font-weight: 500;
-    }
-
-    /* Button styling */
-    .stButton > button {
-        background-color: var(--bpce-green);
-        color: white;
-        border-radius: 0.375rem;
-        border: none;
-        padding: 0.5rem 1rem;
-        font-weight: 500;
-        transition: background-color 0.2s;
-    }
-    .stButton > button:hover {
-        background-color: #007a4d; /* Darker Market green */
-    }
-
-    /* Success message styling */
-    .element-container div[data-testid="stAlert"] {
-        border-radius: 0.375rem;
-        border-left-color: var(--bpce-green) !important;
-    }
-
-    /* Warning message styling */
-    .element-container div[data-testid="stAlert"][data-baseweb="notification"] {
-        border-left-color: var(--bpce-orange) !important;
-    }
-
-    /* Form styling */
-    .stTextInput > div > div > input,
-    .stSelectbox > div > div > div,
-    .stTextArea > div > div > textarea {
-        border-radius: 0.375rem;
-        border: 1px solid #D1D5DB;
-    }
-
-    /* Checkbox styling */
-    .stCheckbox > div[data-testid="stMarkdownContainer"] > label > div[role="checkbox"] {
-        border-color: var(--bpce-blue);
-    }
-    .stCheckbox > div[data-testid="stMarkdownContainer"] > label > div[role="checkbox"][data-checked="true"] {
-        background-color: var(--bpce-blue);
-    }
-
-    /* Sidebar styling */
-    [data-testid="stSidebar"] {
-        background-color: var(--bpce-green);
-        padding-top: 2rem;
-    }
-    [data-testid="stSidebar"] .main-header {
-        color: white;
-    }
-    [data-testid="stSidebar"] .main-header::after {
-        background: linear-gradient(90deg, white, rgba(255, 255, 255, 0.5));
-    }
-    [data-testid="stSidebar"] h3 {
-        color: rgba(255, 255, 255, 0.9);
-        font-size: 1.2rem;
-        margin-bottom: 2rem;
-    }
-    [data-testid="stSidebar"] [data-testid="stRadio"] > div {
-        padding-left: 1rem;
-    }
-    [data-testid="stSidebar"] [data-testid="stRadio"] label {
-        color: white;
-    }
-
-    /* Tab styling */
-    .stTabs [data-baseweb="tab"] {
-        padding: 0.5rem 1rem;
-        font-weight: 500;
-        color: var(--bpce-blue);
-    }
-    .stTabs [data-baseweb="tab"][aria-selected="true"] {
-        color: var(--bpce-green);
-        border-bottom-color: var(--bpce-green) !important;
-    }
-    .stTabs [data-baseweb="tab-panel"] {
-        padding: 1rem 0;
-    }
-
-    /* Fix for white text on white background */
-    .stTabs [data-baseweb="tab-list"] button p {
-        color: var(--bpce-blue) !important;
-    }
-    .stTabs [data-baseweb="tab-list"] button[aria-selected="true"] p {
-        color: var(--bpce-green) !important;
-    }
-
-    /* Ensure all text in the main content area has proper contrast */
-    [data-testid="stAppViewContainer"] {
-        color: #111827;
-    }
-    [data-testid="stAppViewContainer"] p,
-    [data-testid="stAppViewContainer"] span,
-    [data-testid="stAppViewContainer"] label,
-    [data-testid="stAppViewContainer"] div {
-        color: #111827;
-    }
-
-    /* Ensure text in markdown is visible */
-    [data-testid="stMarkdownContainer"] p,
-    [data-testid="stMarkdownContainer"] span,
-    [data-testid="stMarkdownContainer"] div,
-    [data-testid="stMarkdownContainer"] h1,
-    [data-testid="stMarkdownContainer"] h2,
-    [data-testid="stMarkdownContainer"] h3,
-    [data-testid="stMarkdownContainer"] h4,
-    [data-testid="stMarkdownContainer"] h5,
-    [data-testid="stMarkdownContainer"] h6 {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in the sidebar */
-    [data-testid="stSidebar"] [data-testid="stMarkdownContainer"] p,
-    [data-testid="stSidebar"] [data-testid="stMarkdownContainer"] div {
-        color: white !important;
-    }
-
-    /* Fix for text in the sidebar radio buttons */
-    [data-testid="stSidebar"] [data-testid="stRadio"] label div p {
-        color: white !important;
-    }
-
-    /* Expander styling */
-    .streamlit-expanderHeader {
-        color: var(--bpce-blue) !important;
-        font-weight: 500;
-    }
-    .streamlit-expanderHeader:hover {
-        color: var(--bpce-green) !important;
-    }
-
-    /* Fix for text in expanders */
-    .streamlit-expanderContent p,
-    .streamlit-expanderContent div,
-    .streamlit-expanderContent span {
-        color: #111827 !important;
-    }
-
-    /* Dataframe styling */
-    .stDataFrame {
-        border-radius: 0.5rem;
-        overflow: hidden;
-    }
-    .stDataFrame [data-testid="stTable"] {
-        border-radius: 0.5rem;
-    }
-    .stDataFrame thead tr th {
-        background-color: var(--bpce-green-light);
-        color: var(--bpce-green) !important;
-    }
-
-    /* Fix for text in dataframes */
-    .stDataFrame tbody tr td {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in selectboxes */
-    .stSelectbox label p {
-        color: #111827 !important;
-    }
-
-    /* Fix for selectbox selected value (the card) */
-    div[data-baseweb="select"] > div {
-        background-color: #1E293B !important;
-        border-color: #2D3748 !important;
-    }
-
-    div[data-baseweb="select"] > div > div {
-        color: white !important;
-    }
-
-    div[data-baseweb="select"] > div > div > div > div {
-        color: white !important;
-    }
-
-    div[data-baseweb="select"] > div > div > div > div > div {
-        color: white !important;
-    }
-
-    /* Fix for all text inside selectbox cards */
-    div[data-baseweb="select"] * {
-        color: white !important;
-    }
-
-    /* Fix for selectbox label */
-    div[data-baseweb="select"] + div {
-        color: #111827 !important;
-    }
-
-    /* Fix for dropdown/selectbox options with dark background */
-    div[data-baseweb="select"] ul {
-        background-color: #1E293B !important;
-    }
-
-    div[data-baseweb="select"] ul li {
-        color: white !important;
-    }
-
-    div[data-baseweb="select"] ul li:hover,
-    div[data-baseweb="select"] ul li[aria-selected="true"] {
-        background-color: #2D3748 !important;
-    }
-
-    div[data-baseweb="select"] ul li[aria-selected="true"] div {
-        color: white !important;
-    }
-
-    div[data-baseweb="select"] ul li div {
-        color: white !important;
-    }
-
-    /* Global input styling - white background with dark text */
-    /* Selectbox styling */
-    div[data-baseweb="select"] > div {
-        background-color: #FFFFFF !important;
-        border-color: #D1D5DB !important;
-    }
-
-    div[data-baseweb="select"] > div > div {
-        color: #111827 !important;
-    }
-
-    div[data-baseweb="select"] > div > div > div > div {
-        color: #111827 !important;
-    }
-
-    div[data-baseweb="select"] > div > div > div > div > div {
-        color: #111827 !important;
-    }
-
-    /* Fix for all text inside selectbox cards */
-    div[data-baseweb="select"] * {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in checkboxes */
-    .stCheckbox label span {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in text inputs */
-    .stTextInput label p {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in text areas */
-    .stTextArea label p {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in buttons */
-    .stButton button p {
-        color: white !important;
-    }
-
-    /* Fix for text in tabs */
-    .stTabs [data-baseweb="tab-panel"] p,
-    .stTabs [data-baseweb="tab-panel"] div,
-    .stTabs [data-baseweb="tab-panel"] span,
-    .stTabs [data-baseweb="tab-panel"] label {
-        color: #111827 !important;
-    }
-
-    /* Fix specifically for the Market Data tab */
-    .stTabs [data-baseweb="tab-panel"] [data-testid="stMarkdownContainer"] p strong,
-    .stTabs [data-baseweb="tab-panel"] [data-testid="stMarkdownContainer"] p b {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in the green background sections */
-    [style*="background-color: rgb(0, 150, 94)"] p,
-    [style*="background-color: rgb(0, 150, 94)"] div,
-    [style*="background-color: rgb(0, 150, 94)"] span {
-        color: white !important;
-    }
-
-    /* Fix for text in the green background sections */
-    [style*="background-color: rgb(0, 150, 94)"] * {
-        color: white !important;
-    }
-
-    /* Fix for text in the tab content */
-    .stTabs [data-baseweb="tab-panel"] [data-testid="element-container"] p {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in the tab content */
-    .stTabs [data-baseweb="tab-panel"] [data-testid="element-container"] div {
-        color: #111827 !important;
-    }
-
-    /* Fix for Data Explorer tab filter dropdowns */
-    .stSelectbox label {
-        color: #111827 !important;
-    }
-
-    /* Ensure text in Data Explorer filter dropdowns is visible */
-    .stSelectbox [data-baseweb="select"] div[role="button"] {
-        background-color: #FFFFFF !important;
-    }
-
-    .stSelectbox [data-baseweb="select"] div[role="button"] div {
-        color: #111827 !important;
-    }
-
-    /* Fix for selected text in selectbox cards */
-    div[data-baseweb="select"] div[role="button"] span {
-        color: #111827 !important;
-    }
-
-    div[data-baseweb="select"] div[role="button"] span span {
-        color: #111827 !important;
-    }
-
-    /* Fix for selected value text */
-    div[data-baseweb="select"] div[role="button"] div[data-testid="stMarkdownContainer"] p {
-        color: #111827 !important;
-    }
-
-    /* Ensure all text elements inside selectbox are dark */
-    div[data-baseweb="select"] div[role="button"] * {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in Data Explorer expanders */
-    .streamlit-expanderContent p strong,
-    .streamlit-expanderContent div strong,
-    .streamlit-expanderContent span strong,
-    .streamlit-expanderContent p b,
-    .streamlit-expanderContent div b,
-    .streamlit-expanderContent span b {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in Data Explorer dataframes */
-    .stDataFrame [data-testid="stTable"] td {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in Data Explorer text inputs */
-    .stTextInput input {
-        color: #111827 !important;
-        background-color: #FFFFFF !important;
-    }
-
-    /* Fix for text in Data Explorer text areas */
-    .stTextArea textarea {
-        color: #111827 !important;
-        background-color: #FFFFFF !important;
-    }
-
-    /* Fix for custom keyword filter text input */
-    input[aria-label*="Filter by Custom Keyword"],
-    input[aria-label*="Custom Keyword"] {
-        color: #111827 !important;
-        background-color: #FFFFFF !important;
-    }
-
-    /* Fix for question answering text area */
-    textarea[aria-label*="Your Question"],
-    textarea[aria-label*="question"] {
-        color: #111827 !important;
-        background-color: #FFFFFF !important;
-    }
-
-    /* Fix for text in Data Explorer checkboxes */
-    .stCheckbox label span p {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in Data Explorer buttons */
-    .stButton button {
-        color: white !important;
-    }
-
-    /* Fix for text in Data Explorer expander headers */
-    .streamlit-expanderHeader p {
-        color: var(--bpce-blue) !important;
-    }
-
-    /* Fix for text in Data Explorer cards */
-    .card p strong,
-    .card p b {
-        color: #111827 !important;
-    }
-
-    /* Fix for text in Data Explorer info text */
-    .info-text {
-        color: #4B5563 !important;
-    }
-
-    /* Fix for text in Data Explorer progress text */
-    .progress-text {
-        color: #111827 !important;
-    }
-
-    /* Additional fixes for selectbox text in all tabs */
-    /* Target the actual text node inside the selectbox */
-    div[data-baseweb="select"] [data-testid="stMarkdownContainer"] {
-        color: #111827 !important;
-    }
-
-    div[data-baseweb="select"] [data-testid="stMarkdownContainer"] p {
-        color: #111827 !important;
-    }
-
-    /* Force all text inside selectbox to be dark */
-    div[data-baseweb="select"] div {
-        color: #111827 !important;
-    }
-
-    div[data-baseweb="select"] span {
-        color: #111827 !important;
-    }
-
-    /* Specific fix for Question Answering tab */
-    form[data-testid="stForm"] div[data-baseweb="select"] div {
-        color: #111827 !important;
-    }
-
-    form[data-testid="stForm"] div[data-baseweb="select"] span {
-        color: #111827 !important;
-    }
-
-    /* Specific fix for Data Explorer tab */
-    [data-testid="stVerticalBlock"] div[data-baseweb="select"] div {
-        color: #111827 !important;
-    }
-
-    [data-testid="stVerticalBlock"] div[data-baseweb="select"] span {
-        color: #111827 !important;
-    }
-
-    /* Preserve dropdown menu styling with dark background and white text */
-    div[data-baseweb="popover"] div[data-baseweb="menu"] {
-        background-color: #1E293B !important;
-    }
-
-    div[data-baseweb="popover"] div[data-baseweb="menu"] * {
-        color: white !important;
-    }
-
-    div[data-baseweb="popover"] div[role="listbox"] {
-        background-color: #1E293B !important;
-    }
-
-    div[data-baseweb="popover"] div[role="listbox"] * {
-        color: white !important;
-    }
-
-    div[data-baseweb="popover"] div[role="option"] {
-        color: white !important;
-    }
-
-    div[data-baseweb="popover"] div[role="option"]:hover {
-        background-color: #2D3748 !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS. Streamlit drops elements a rerun doesn't emit, so the style block is
+# sent on every run, but the file is only read once per server process.
+@st.cache_resource
+def load_css():
+    css = (Path(__file__).parent / "static" / "app.css").read_text(encoding="utf-8")
+    return f"<style>\n{css}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+def render_chat_message(message):
+    """
+    Renders one chat history entry as a chat message bubble.
+    """
+    with st.chat_message(message["role"]):
+        if 'agent' in message:
+            st.markdown(f"<span class='agent-tag'>{message['agent']}</span>", unsafe_allow_html=True)
+        st.markdown(message["content"])
 
 # Sidebar
 st.sidebar.markdown("<div class='main-header'>Market Intelligence</div>", unsafe_allow_html=True)
@@ -742,21 +129,19 @@ if page == "Chat Interface":
     st.markdown("Interact with the orchestrator agent to automatically route your queries to the appropriate specialized agent.")
     st.markdown("<hr class='section-divider'>", unsafe_allow_html=True)
 
-    # Chat interface
+    # Chat history
     for message in st.session_state.chat_history:
-        if message["role"] == "user":
-            st.markdown(f"<div class='card' style='border-left: 4px solid #4B5563;'><b>You:</b> {message['content']}</div>", unsafe_allow_html=True)
-        else:
-            agent_tag = f"<span class='agent-tag'>{message['agent']}</span>" if 'agent' in message else ""
-            st.markdown(f"<div class='card'>{agent_tag}<b>Assistant:</b> {message['content']}</div>", unsafe_allow_html=True)
+        render_chat_message(message)
 
-    # Input for new message
-    user_input = st.text_area("Your message:", height=100)
-    if st.button("Send"):
-        if user_input:
-            # Add user message to chat history
-            st.session_state.chat_history.append({"role": "user", "content": user_input})
+    # Input for new message. The new turn is appended below the history as it is
+    # processed, so no rerun is needed to show it.
+    user_input = st.chat_input("Your message")
+    if user_input:
+        # Add user message to chat history
+        st.session_state.chat_history.append({"role": "user", "content": user_input})
+        render_chat_message(st.session_state.chat_history[-1])
 
+        with st.chat_message("assistant"):
             # Process the query with the orchestrator
             result = orchestrator.process(user_input)
 
@@ -764,6 +149,7 @@ if page == "Chat Interface":
             if "error" in result:
                 response_content = f"Error: {result['error']}"
                 agent_name = "Orchestrator"
+                st.error(response_content)
             else:
                 agent_name = result["agent"].replace("_", " ").title()
 
@@ -849,15 +235,12 @@ if page == "Chat Interface":
             # Store query/response in history and DB
             # ... (Existing code to store query in SupabaseService if needed) ...
 
-            # Add assistant response to chat history
-            st.session_state.chat_history.append({
-                "role": "assistant",
-                "content": response_content, # Use the constructed response content
-                "agent": agent_name # Use the actual agent called
-            })
-
-            # Rerun to update the UI
-            st.rerun()
+        # Add assistant response to chat history
+        st.session_state.chat_history.append({
+            "role": "assistant",
+            "content": response_content, # Use the constructed response content
+            "agent": agent_name # Use the actual agent called
+        })
 
 elif page == "Data Collection":
     st.markdown("<div class='main-header'>Data Collection</div>", unsafe_allow_html=True)
@@ -950,8 +333,21 @@ elif page == "Report Generation":
                 if financial_product: parameters["financial_product"] = financial_product
                 if custom_keyword: parameters["custom_keyword"] = custom_keyword
 
-                # Call the report generator agent directly
-                result = orchestrator.report_generator.process(parameters)
+                # Call the report generator agent directly, showing the report as it
+                # is written; redrawn at most every 0.2s rather than once per token
+                live_report = st.empty()
+                streamed = []
+                last_draw = [0.0]
+
+                def show_chunk(chunk):
+                    streamed.append(chunk)
+                    now = time.monotonic()
+                    if now - last_draw[0] >= 0.2:
+                        live_report.markdown("".join(streamed))
+                        last_draw[0] = now
+
+                result = orchestrator.report_generator.process(parameters, on_chunk=show_chunk)
+                live_report.empty()
 
                 # Display results
                 if "result" in result and "error" in result['result']:
@@ -1065,6 +461,7 @@ elif page == "Workflow Builder":
         ])
 
         # Parameters based on agent type
+        use_context = False
         if agent_type == "data_collector":
             sector = st.selectbox("Sector", [
                 "Healthcare", "Technology", "Transportation", "Industrial Equipment",
@@ -1170,6 +567,8 @@ elif page == "Workflow Builder":
                 "parameters": parameters
             }
 
+            if use_context:
+                step["use_context"] = True
             if update_context:
                 step["update_context"] = ["sector", "country", "financial_product", "custom_keyword"]
 
@@ -1207,7 +606,9 @@ elif page == "Workflow Builder":
                         if custom_keyword:
                             metadata["custom_keyword"] = custom_keyword
 
-                SupabaseService.store_query(
+                # Store in the background; the rerun doesn't need the stored record
+                store_in_background(
+                    SupabaseService.store_query,
                     query_text=workflow_summary,
                     entities=entities,
                     intent="workflow_execution",
@@ -1,12 +1,25 @@
 import os
-from dotenv import load_dotenv
 from supabase import create_client, Client
+import copy
 import json
+import asyncio
+import time
 import uuid
-from datetime import datetime
-
-# Load environment variables
-load_dotenv()
+import functools
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from config.settings import READ_CACHE_TTL, READ_CACHE_MAXSIZE
+
+# orjson encodes and decodes several times faster than the stdlib; fall back if missing
+try:
+    import orjson
+    _loads = orjson.loads
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+    _dumps = json.dumps
 
 # Initialize Supabase client
 supabase_url = os.environ.get("SUPABASE_URL")
@@ -60,6 +73,60 @@ def initialize_supabase():
 # Initialize on module load
 supabase = initialize_supabase()
 
+# Maximum number of rows sent in one bulk insert request
+BULK_INSERT_BATCH_SIZE = 32
+
+# Short-lived cache of read results: (method, filters) -> (expires_at, rows), least
+# recently used first. Writes through SupabaseService clear it.
+_READ_CACHE = OrderedDict()
+_READ_CACHE_LOCK = threading.Lock()
+
+# Callbacks run along with _clear_read_cache(), for caches built on top of the
+# stored data (e.g. the QA agent's answers)
+_INVALIDATION_CALLBACKS = []
+
+def _clear_read_cache():
+    with _READ_CACHE_LOCK:
+        _READ_CACHE.clear()
+    for callback in _INVALIDATION_CALLBACKS:
+        callback()
+
+def _cached_read(func):
+    """
+    Cache a read for READ_CACHE_TTL seconds per set of arguments. Results are deep
+    copied in and out, so callers mutating them never touch the cache.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with _READ_CACHE_LOCK:
+            entry = _READ_CACHE.get(key)
+            if entry is not None and entry[0] > now:
+                _READ_CACHE.move_to_end(key)
+                return copy.deepcopy(entry[1])
+
+        rows = func(*args, **kwargs)
+        with _READ_CACHE_LOCK:
+            _READ_CACHE[key] = (now + READ_CACHE_TTL, copy.deepcopy(rows))
+            _READ_CACHE.move_to_end(key)
+            while len(_READ_CACHE) > READ_CACHE_MAXSIZE:
+                _READ_CACHE.popitem(last=False)
+        return rows
+    return wrapper
+
+def _invalidates_reads(func):
+    """
+    Clear the read cache once a write has finished, whatever its outcome.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _clear_read_cache()
+    return wrapper
+
 # In-memory storage for development/testing
 mock_db = {
     "market_data": [],
@@ -72,6 +139,29 @@ class SupabaseService:
     Service for interacting with Supabase to store and retrieve data.
     """
 
+    @staticmethod
+    def clear_cache():
+        """
+        Drop all cached get_reports()/get_market_data() results, e.g. after an
+        ingest that bypassed SupabaseService.
+        """
+        _clear_read_cache()
+
+    @staticmethod
+    def on_invalidate(callback):
+        """
+        Register a callback to run whenever the read cache is cleared, i.e. after
+        every market data or report write and on clear_cache().
+
+        Args:
+            callback (callable): Called without arguments
+
+        Returns:
+            callable: The callback, so this can be used as a decorator
+        """
+        _INVALIDATION_CALLBACKS.append(callback)
+        return callback
+
     @staticmethod
     def get_client():
         """
@@ -86,6 +176,7 @@ class SupabaseService:
         return supabase
 
     @staticmethod
+    @_invalidates_reads
     def store_market_data(sector, country, data_point, value, source, date=None, metadata=None, custom_keyword=None):
         """
         Store Market data in Supabase.
@@ -103,6 +194,54 @@ class SupabaseService:
         Returns:
             dict: The stored data record
         """
+        data = SupabaseService._build_market_data_record(
+            sector, country, data_point, value, source, date, metadata, custom_keyword
+        )
+        record_id = data["id"]
+        custom_keyword = data["custom_keyword"]
+
+        # Store in Supabase if available
+        supabase_success = False
+        stored_record = None # Initialize variable to hold the result
+        supabase_client = SupabaseService.get_client()
+        if supabase_client:
+            try:
+                print(f"Storing Market data in Supabase: {data_point} for {sector} in {country}")
+                if custom_keyword:
+                    print(f"With custom keyword: {custom_keyword}")
+
+                response = supabase_client.table("market_data").insert(data).execute()
+                # Log the actual response object for detailed inspection
+                print(f"DEBUG: Supabase insert response: {response}")
+                if hasattr(response, 'data') and response.data:
+                    print(f"✅ Successfully stored data in Supabase with ID: {record_id}")
+                    supabase_success = True
+                    stored_record = response.data[0] # Get the stored record
+                else:
+                    print("❌ Failed to store data in Supabase - response did not contain expected data.")
+                    # Log the full response again on failure
+                    print(f"DEBUG: Failing Supabase insert response: {response}")
+            except Exception as e:
+                print(f"❌ Error during Supabase insert operation: {e}")
+                # Optionally re-raise the exception
+                # raise e
+        else:
+            print("❌ Supabase client not available. Cannot store data.")
+            # Optionally raise an exception
+            # raise ConnectionError("Supabase client not available.")
+
+        # Return the data as stored in Supabase (or None if failed)
+        # If returning the input `data` dict is preferred, change this back
+        return stored_record if supabase_success else None
+
+    @staticmethod
+    def _build_market_data_record(sector, country, data_point, value, source, date=None, metadata=None, custom_keyword=None):
+        """
+        Build a market_data row, normalizing the date, metadata and value.
+
+        Returns:
+            dict: The row ready to be inserted
+        """
         if date is None:
             date = datetime.now().isoformat()
         else:
@@ -138,7 +277,7 @@ class SupabaseService:
                 custom_keyword = metadata.get('custom_keyword')
             elif isinstance(metadata, str):
                 try:
-                    metadata_dict = json.loads(metadata)
+                    metadata_dict = _loads(metadata)
                     if isinstance(metadata_dict, dict):
                         custom_keyword = metadata_dict.get('custom_keyword')
                 except:
@@ -146,7 +285,7 @@ class SupabaseService:
 
         # Ensure value is serializable
         if isinstance(value, (list, dict)):
-            value = json.dumps(value)
+            value = _dumps(value)
 
         # Generate a unique ID
         record_id = str(uuid.uuid4())
@@ -161,46 +300,57 @@ class SupabaseService:
             "source": source,
             "date": date,
             "custom_keyword": custom_keyword,
-            "metadata": json.dumps(metadata) if isinstance(metadata, dict) else metadata,
+            "metadata": _dumps(metadata) if isinstance(metadata, dict) else metadata,
             "created_at": created_at
         }
 
-        # Store in Supabase if available
-        supabase_success = False
-        stored_record = None # Initialize variable to hold the result
+        return data
+
+    @staticmethod
+    @_invalidates_reads
+    def store_market_data_bulk(rows):
+        """
+        Store several Market data points in Supabase with a single insert.
+
+        Args:
+            rows (list): Dictionaries with the keyword arguments of store_market_data
+                (sector, country, data_point, value, source and optionally date,
+                metadata, custom_keyword)
+
+        Returns:
+            list: The stored data records (empty if the insert failed)
+        """
+        if not rows:
+            return []
+
+        data = [SupabaseService._build_market_data_record(**row) for row in rows]
+
         supabase_client = SupabaseService.get_client()
-        if supabase_client:
-            try:
-                print(f"Storing Market data in Supabase: {data_point} for {sector} in {country}")
-                if custom_keyword:
-                    print(f"With custom keyword: {custom_keyword}")
+        if not supabase_client:
+            print("❌ Supabase client not available. Cannot store data.")
+            return []
 
-                response = supabase_client.table("market_data").insert(data).execute()
-                # Log the actual response object for detailed inspection
-                print(f"DEBUG: Supabase insert response: {response}")
+        print(f"Storing {len(data)} Market data points in Supabase")
+        stored = []
+        # Large ingests (e.g. drained batches) are split into moderately sized requests
+        for start in range(0, len(data), BULK_INSERT_BATCH_SIZE):
+            chunk = data[start:start + BULK_INSERT_BATCH_SIZE]
+            try:
+                response = supabase_client.table("market_data").insert(chunk, returning="representation").execute()
                 if hasattr(response, 'data') and response.data:
-                    print(f"✅ Successfully stored data in Supabase with ID: {record_id}")
-                    supabase_success = True
-                    stored_record = response.data[0] # Get the stored record
+                    stored.extend(response.data)
                 else:
                     print("❌ Failed to store data in Supabase - response did not contain expected data.")
-                    # Log the full response again on failure
-                    print(f"DEBUG: Failing Supabase insert response: {response}")
             except Exception as e:
-                print(f"❌ Error during Supabase insert operation: {e}")
-                # Optionally re-raise the exception
-                # raise e
-        else:
-            print("❌ Supabase client not available. Cannot store data.")
-            # Optionally raise an exception
-            # raise ConnectionError("Supabase client not available.")
+                print(f"❌ Error during Supabase bulk insert operation: {e}")
 
-        # Return the data as stored in Supabase (or None if failed)
-        # If returning the input `data` dict is preferred, change this back
-        return stored_record if supabase_success else None
+        if stored:
+            print(f"✅ Successfully stored {len(stored)} data points in Supabase")
+        return stored
 
     @staticmethod
-    def get_market_data(sector=None, country=None, data_point=None, custom_keyword=None, limit=100):
+    @_cached_read
+    def get_market_data(sector=None, country=None, data_point=None, custom_keyword=None, limit=100, columns="*"):
         """
         Retrieve Market data from Supabase.
 
@@ -210,6 +360,8 @@ class SupabaseService:
             data_point (str, optional): Filter by data point. Defaults to None.
             custom_keyword (str, optional): Filter by custom keyword. Defaults to None.
             limit (int, optional): Maximum number of records to return. Defaults to 100.
+            columns (str, optional): Comma-separated columns to return, so callers that only
+                read a few fields don't download whole rows. Defaults to "*".
 
         Returns:
             list: List of Market data records
@@ -223,7 +375,7 @@ class SupabaseService:
                 # In version 0.7.1, we need to use a different approach for querying
                 try:
                     # Start with a basic query
-                    query = supabase_client.table("market_data").select("*")
+                    query = supabase_client.table("market_data").select(columns)
 
                     # Apply filters - in version 0.7.1, we need to chain these differently
                     if sector:
@@ -265,6 +417,22 @@ class SupabaseService:
         return data # Return data retrieved from Supabase (or empty list if failed/none found)
 
     @staticmethod
+    async def aget_market_data(**filters):
+        """
+        Async counterpart of get_market_data(); the blocking query runs in a worker
+        thread, so several reads can be awaited together with asyncio.gather.
+
+        Args:
+            **filters: The keyword arguments of get_market_data
+
+        Returns:
+            list: List of Market data records
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(SupabaseService.get_market_data, **filters))
+
+    @staticmethod
+    @_invalidates_reads
     def store_report(title, sector, country, financial_product, content, summary=None, metadata=None, custom_keyword=None):
         """
         Store a report in Supabase.
@@ -311,7 +479,7 @@ class SupabaseService:
             "custom_keyword": custom_keyword,
             "created_at": now,
             "updated_at": now,
-            "metadata": json.dumps(metadata)
+            "metadata": _dumps(metadata)
         }
 
         # Store in Supabase if available
@@ -344,7 +512,8 @@ class SupabaseService:
         return data
 
     @staticmethod
-    def get_reports(sector=None, country=None, financial_product=None, custom_keyword=None, limit=100):
+    @_cached_read
+    def get_reports(sector=None, country=None, financial_product=None, custom_keyword=None, limit=100, report_id=None):
         """
         Retrieve reports from Supabase.
 
@@ -354,6 +523,7 @@ class SupabaseService:
             financial_product (str, optional): Filter by financial product. Defaults to None.
             custom_keyword (str, optional): Filter by custom keyword. Defaults to None.
             limit (int, optional): Maximum number of records to return. Defaults to 100.
+            report_id (str, optional): Fetch only the report with this ID. Defaults to None.
 
         Returns:
             list: List of report records
@@ -373,6 +543,9 @@ class SupabaseService:
                     query = supabase_client.table("reports").select("*")
 
                     # Apply filters - in version 0.7.1, we need to chain these differently
+                    if report_id:
+                        # Primary-key lookup on the server instead of fetching every report
+                        query = query.filter("id", "eq", report_id)
                     if sector:
                         query = query.filter("sector", "eq", sector)
                     if country:
@@ -411,6 +584,8 @@ class SupabaseService:
                         if hasattr(response, 'data') and response.data:
                             # Filter manually
                             filtered_data = response.data
+                            if report_id:
+                                filtered_data = [d for d in filtered_data if d.get("id") == report_id]
                             if sector:
                                 filtered_data = [d for d in filtered_data if d.get("sector") == sector]
                             if country:
@@ -439,6 +614,8 @@ class SupabaseService:
             filtered_data = mock_db["reports"]
 
             # Apply filters
+            if report_id:
+                filtered_data = [d for d in filtered_data if d["id"] == report_id]
             if sector:
                 filtered_data = [d for d in filtered_data if d["sector"] == sector]
             if country:
@@ -464,6 +641,20 @@ class SupabaseService:
         print(f"Total unique reports found: {len(unique_data)}")
         return unique_data[:limit]
 
+    @staticmethod
+    async def aget_reports(**filters):
+        """
+        Async counterpart of get_reports(); the blocking query runs in a worker thread.
+
+        Args:
+            **filters: The keyword arguments of get_reports
+
+        Returns:
+            list: List of report records
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(SupabaseService.get_reports, **filters))
+
     @staticmethod
     def store_query(query_text, entities, intent, response=None, metadata=None, agent_type=None):
         """
@@ -500,7 +691,7 @@ class SupabaseService:
             "id": record_id,
             "query_text": query_text,
             "query": query_text,  # For compatibility with sample data
-            "entities": json.dumps(entities) if isinstance(entities, dict) else entities,
+            "entities": _dumps(entities) if isinstance(entities, dict) else entities,
             "intent": intent,
             "response": response,
             "result": response,  # For compatibility with sample data
@@ -508,7 +699,7 @@ class SupabaseService:
             "custom_keyword": custom_keyword,
             "timestamp": now,
             "created_at": now,
-            "metadata": json.dumps(metadata) if isinstance(metadata, dict) else metadata
+            "metadata": _dumps(metadata) if isinstance(metadata, dict) else metadata
         }
 
         # Store in Supabase if available
@@ -648,6 +839,62 @@ class SupabaseService:
         return unique_data[:limit]
 
     @staticmethod
+    def store_llm_cache(cache_key, query_text, embedding, payload):
+        """
+        Persist a cached LLM result so other processes can reuse it.
+
+        Args:
+            cache_key (str): The canonical exact-match key
+            query_text (str): The text that was embedded for semantic lookup
+            embedding (list, optional): The embedding vector of query_text
+            payload (list): The cached result
+
+        Returns:
+            bool: True if the entry was stored
+        """
+        supabase_client = SupabaseService.get_client()
+        if not supabase_client:
+            return False
+
+        data = {
+            "id": str(uuid.uuid4()),
+            "cache_key": cache_key,
+            "query_text": query_text,
+            "embedding": embedding,
+            "payload": payload,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        try:
+            supabase_client.table("llm_cache").upsert(data, on_conflict="cache_key").execute()
+            return True
+        except Exception as e:
+            print(f"❌ Error storing LLM cache entry in Supabase: {e}")
+            return False
+
+    @staticmethod
+    def get_llm_cache(limit=500):
+        """
+        Retrieve the most recent persisted LLM cache entries.
+
+        Args:
+            limit (int, optional): Maximum number of entries to return. Defaults to 500.
+
+        Returns:
+            list: List of llm_cache records
+        """
+        supabase_client = SupabaseService.get_client()
+        if not supabase_client:
+            return []
+
+        try:
+            response = supabase_client.table("llm_cache").select("*").order("created_at", desc=True).limit(limit).execute()
+            return response.data or []
+        except Exception as e:
+            print(f"❌ Error retrieving LLM cache from Supabase: {e}")
+            return []
+
+    @staticmethod
+    @_invalidates_reads
     def populate_sample_data():
         """
         Populate the mock database with sample data for testing purposes.
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The app modules import each other from the app root (agents, supabase_service, config)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "market_intelligence_app"))
@@ -1,10 +1,6 @@
-import os
-import sys
 import json
 from datetime import datetime
 
-# Add the parent directory to the path to import the necessary modules
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from supabase_service import SupabaseService
 from agents.data_collector.agent import DataCollectorAgent
 from agents.report_generator.agent import ReportGeneratorAgent
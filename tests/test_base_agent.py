@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+from agents.base_agent import RateLimiter, _MAX_RETRY_AFTER, _parse_reset, _retry_wait, run_async, submit_async
+
+async def _running_loop():
+    return asyncio.get_running_loop()
+
+def test_run_async_reuses_one_event_loop():
+    first = run_async(_running_loop())
+    assert run_async(_running_loop()) is first
+    assert submit_async(_running_loop()).result(timeout=5) is first
+    assert first.is_running()
+
+def test_run_async_refuses_to_block_its_own_loop():
+    async def nested():
+        with pytest.raises(RuntimeError):
+            run_async(_running_loop())
+        return True
+
+    assert run_async(nested())
+
+@pytest.mark.parametrize("value, seconds", [
+    ("20ms", 0.02),
+    ("1s", 1),
+    ("6m0s", 360),
+    ("1h2m3.5s", 3723.5),
+    ("", 0),
+    (None, 0),
+])
+def test_parse_reset(value, seconds):
+    assert _parse_reset(value) == pytest.approx(seconds)
+
+def test_rate_limiter_does_not_wait_without_headers():
+    limiter = RateLimiter()
+    assert limiter._reserve(1000) == 0
+
+def test_rate_limiter_waits_for_exhausted_request_budget():
+    limiter = RateLimiter()
+    limiter.update({"x-ratelimit-remaining-requests": "1", "x-ratelimit-reset-requests": "10s"})
+    assert limiter._reserve(0) == 0
+    assert 9 < limiter._reserve(0) <= 10
+
+def test_rate_limiter_waits_for_exhausted_token_budget():
+    limiter = RateLimiter()
+    limiter.update({"x-ratelimit-remaining-tokens": "500", "x-ratelimit-reset-tokens": "2s"})
+    assert limiter._reserve(400) == 0
+    assert 1 < limiter._reserve(400) <= 2
+
+def test_rate_limiter_does_not_wait_once_reset_has_passed():
+    limiter = RateLimiter()
+    limiter.update({"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "0s"})
+    assert limiter._reserve(0) == 0
+
+def test_rate_limiter_ignores_malformed_headers():
+    limiter = RateLimiter()
+    limiter.update({"x-ratelimit-remaining-requests": "lots"})
+    assert limiter.remaining_requests is None
+
+def _rate_limited(retry_after):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    error = openai.RateLimitError("rate limited", response=response, body=None)
+    return SimpleNamespace(outcome=SimpleNamespace(exception=lambda: error), attempt_number=1)
+
+def test_retry_after_is_honoured():
+    assert _retry_wait(_rate_limited("2.5")) == 2.5
+
+def test_retry_after_is_capped():
+    assert _retry_wait(_rate_limited("86400")) == _MAX_RETRY_AFTER
+
+@pytest.mark.parametrize("retry_after", ["0", "-5", "soon"])
+def test_unusable_retry_after_falls_back_to_backoff(retry_after):
+    assert 0 <= _retry_wait(_rate_limited(retry_after)) <= 30
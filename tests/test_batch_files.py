@@ -0,0 +1,115 @@
+import json
+import queue
+import threading
+from types import SimpleNamespace
+import pytest
+from agents.data_collector import agent as data_collector_module
+from agents.data_collector.agent import DataCollectorAgent
+from agents.report_generator.agent import ReportGeneratorAgent
+from supabase_service import SupabaseService
+
+class FakeBatchClient:
+    """
+    Records the batch input files uploaded through files.create/batches.create.
+    """
+
+    def __init__(self, fail=False):
+        self.uploads = []
+        self.fail = fail
+        self.files = SimpleNamespace(create=self._upload)
+        self.batches = SimpleNamespace(create=self._create_batch)
+
+    def _upload(self, file, purpose):
+        if self.fail:
+            raise ConnectionError("upload failed")
+        self.uploads.append(file.read().decode())
+        return SimpleNamespace(id=f"file-{len(self.uploads)}")
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        return SimpleNamespace(id=f"batch-{len(self.uploads)}")
+
+def make_collector(client):
+    collector = DataCollectorAgent.__new__(DataCollectorAgent)
+    collector.name = "Data Collector"
+    collector.model = "gpt-4o"
+    collector.system_prompt = DataCollectorAgent.SYSTEM_PROMPT
+    collector._client = client
+    return collector
+
+def job_ids(batch_text):
+    return {json.loads(line)["custom_id"].split(":")[0] for line in batch_text.splitlines()}
+
+def test_submitted_requests_are_not_sent_again(tmp_path):
+    client = FakeBatchClient()
+    collector = make_collector(client)
+    batch_path = str(tmp_path / "data_collection.jsonl")
+
+    first_job = collector.enqueue({"sector": "Technology", "country": "France"}, batch_path)
+    first_batch = collector.submit_batch(batch_path)
+    second_job = collector.enqueue({"sector": "Energy", "country": "Germany"}, batch_path)
+    second_batch = collector.submit_batch(batch_path)
+
+    assert [job_ids(upload) for upload in client.uploads] == [{first_job}, {second_job}]
+    for batch_id, job_id in ((first_batch, first_job), (second_batch, second_job)):
+        assert (tmp_path / f"data_collection.jsonl.{batch_id}").exists()
+        with open(collector._batch_queries_path(batch_path, batch_id)) as queries_file:
+            assert [json.loads(line)["job_id"] for line in queries_file] == [job_id]
+    assert not (tmp_path / "data_collection.jsonl").exists()
+
+def test_failed_submission_keeps_the_requests(tmp_path):
+    collector = make_collector(FakeBatchClient(fail=True))
+    batch_path = str(tmp_path / "data_collection.jsonl")
+    job_id = collector.enqueue({"sector": "Technology"}, batch_path)
+
+    with pytest.raises(ConnectionError):
+        collector.submit_batch(batch_path)
+
+    assert job_ids((tmp_path / "data_collection.jsonl").read_text()) == {job_id}
+    assert (tmp_path / "data_collection.jsonl.queries.jsonl").exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["data_collection.jsonl", "data_collection.jsonl.queries.jsonl"]
+
+def test_submitted_reports_are_not_generated_again(tmp_path, monkeypatch):
+    market_data = [{"data_point": "market_size", "value": "€5 billion", "source": "Test", "date": "2024"}]
+    monkeypatch.setattr(ReportGeneratorAgent, "_fetch_market_data", staticmethod(lambda query: market_data))
+    client = FakeBatchClient()
+    generator = ReportGeneratorAgent.__new__(ReportGeneratorAgent)
+    generator.name = "Report Generator Agent"
+    generator.model = "gpt-4o"
+    generator.max_tokens = 4000
+    generator.system_prompt = "You write reports."
+    generator._client = client
+    batch_path = str(tmp_path / "report_generation.jsonl")
+
+    first_job = generator.enqueue({"sector": "Technology"}, batch_path)
+    first_batch = generator.submit_batch(batch_path)
+    second_job = generator.enqueue({"sector": "Energy"}, batch_path)
+    generator.submit_batch(batch_path)
+
+    assert [job_ids(upload) for upload in client.uploads] == [{first_job}, {second_job}]
+    with open(generator._batch_queries_path(batch_path, first_batch)) as queries_file:
+        assert [json.loads(line)["job_id"] for line in queries_file] == [first_job]
+
+def test_batch_writer_survives_failed_inserts(monkeypatch):
+    calls = []
+
+    def store(rows):
+        calls.append(len(rows))
+        if len(calls) == 1:
+            raise ConnectionError("insert failed")
+        return [dict(row, id=len(calls)) for row in rows]
+
+    monkeypatch.setattr(SupabaseService, "store_market_data_bulk", staticmethod(store))
+    monkeypatch.setattr(data_collector_module, "BULK_INSERT_BATCH_SIZE", 2)
+    pending_rows = queue.Queue(maxsize=2)
+    collected, errors = {}, []
+    writer = threading.Thread(target=DataCollectorAgent._store_batch_rows, args=(pending_rows, collected, errors), daemon=True)
+    writer.start()
+    for index in range(5):
+        pending_rows.put((f"job-{index}", {"value": index}), timeout=5)
+    pending_rows.put(None, timeout=5)
+    writer.join(timeout=5)
+
+    assert not writer.is_alive()
+    assert calls == [2, 2, 1]
+    assert errors == ["insert failed"]
+    assert sorted(collected) == ["job-2", "job-3", "job-4"]
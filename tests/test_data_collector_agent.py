@@ -0,0 +1,119 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import pytest
+from agents.data_collector import agent as data_collector_module
+from agents.data_collector.agent import DataCollectorAgent, DataPoint
+from agents.semantic_cache import SemanticCache
+from config.settings import COLLECTION_CACHE_TTL
+from supabase_service import SupabaseService
+
+@pytest.fixture
+def agent(monkeypatch):
+    """
+    A DataCollectorAgent with empty caches, where every scope embeds to the same
+    vector and the LLM and Supabase calls are replaced by counters.
+    """
+    monkeypatch.setattr(DataCollectorAgent, "_exact_cache", OrderedDict())
+    monkeypatch.setattr(DataCollectorAgent, "_embed_cache", SemanticCache(threshold=0.95))
+    monkeypatch.setattr(DataCollectorAgent, "_cache_loaded", True)
+    monkeypatch.setattr(SupabaseService, "store_llm_cache", staticmethod(lambda **kwargs: True))
+    monkeypatch.setattr(SupabaseService, "store_market_data_bulk", staticmethod(lambda rows: [dict(row) for row in rows]))
+
+    collector = DataCollectorAgent.__new__(DataCollectorAgent)
+    collector.calls = 0
+
+    async def embed(text, model=None):
+        return [1.0, 0.0, 0.0]
+
+    async def collect(category, scope):
+        collector.calls += 1
+        return DataPoint(name=category, value=scope, source="Test", date="2024")
+
+    collector._create_embedding_async = embed
+    collector._collect_data_point = collect
+    return collector
+
+def test_semantic_cache_is_scoped_to_sector_country_and_product(agent):
+    france = asyncio.run(agent.aprocess({"sector": "Technology", "country": "France"}))
+    germany = asyncio.run(agent.aprocess({"sector": "Technology", "country": "Germany"}))
+    assert agent.calls == 2 * len(data_collector_module.DATA_POINT_CATEGORIES)
+    assert all(row["country"] == "Germany" for row in germany["collected_data"])
+    assert all(row["country"] == "France" for row in france["collected_data"])
+
+def test_semantic_hits_are_not_promoted_to_the_exact_tier(agent):
+    asyncio.run(agent.aprocess({"sector": "Technology", "country": "France"}))
+    calls = agent.calls
+    result = asyncio.run(agent.aprocess({"sector": "Technology", "country": "France", "custom_keyword": "cloud"}))
+    assert agent.calls == calls
+    assert result["collected_data"]
+    assert DataCollectorAgent._cache_key("Technology", "France", None, "cloud") not in DataCollectorAgent._exact_cache
+
+def test_exact_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(DataCollectorAgent, "_exact_cache", OrderedDict())
+    monkeypatch.setattr(data_collector_module, "COLLECTION_CACHE_MAXSIZE", 2)
+    for sector in ("a", "b", "c"):
+        DataCollectorAgent._exact_cache_set((sector, "", "", ""), [sector])
+    assert list(DataCollectorAgent._exact_cache) == [("b", "", "", ""), ("c", "", "", "")]
+
+def test_expired_exact_entries_are_dropped(monkeypatch):
+    monkeypatch.setattr(DataCollectorAgent, "_exact_cache", OrderedDict())
+    DataCollectorAgent._exact_cache_set(("a", "", "", ""), ["a"], ttl=-1)
+    assert DataCollectorAgent._exact_cache_get(("a", "", "", "")) is None
+    assert not DataCollectorAgent._exact_cache
+
+def test_response_cache_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(data_collector_module, "_RESPONSE_CACHE", OrderedDict())
+    monkeypatch.setattr(data_collector_module, "RESPONSE_CACHE_MAXSIZE", 8)
+
+    def hammer(offset):
+        for index in range(2000):
+            key = str((offset + index) % 16)
+            data_collector_module._response_cache_set(key, "response")
+            data_collector_module._response_cache_get(key)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(hammer, range(8)))
+    assert len(data_collector_module._RESPONSE_CACHE) <= 8
+
+def test_remaining_ttl_of_persisted_rows():
+    fresh = (datetime.now(timezone.utc) - timedelta(seconds=60)).isoformat()
+    stale = (datetime.now(timezone.utc) - timedelta(seconds=COLLECTION_CACHE_TTL + 60)).isoformat()
+    assert COLLECTION_CACHE_TTL - 120 < DataCollectorAgent._remaining_ttl(fresh) <= COLLECTION_CACHE_TTL - 60
+    assert DataCollectorAgent._remaining_ttl(stale) <= 0
+    assert DataCollectorAgent._remaining_ttl("not a date") == 0
+    assert DataCollectorAgent._remaining_ttl(None) == 0
+
+def test_persisted_rows_past_their_ttl_are_not_loaded(monkeypatch):
+    monkeypatch.setattr(DataCollectorAgent, "_exact_cache", OrderedDict())
+    monkeypatch.setattr(DataCollectorAgent, "_embed_cache", SemanticCache(threshold=0.95))
+    monkeypatch.setattr(DataCollectorAgent, "_cache_loaded", False)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {"cache_key": "tech|france||", "payload": [{"value": 1}], "created_at": now.isoformat()},
+        {"cache_key": "tech|germany||", "payload": [{"value": 2}],
+         "created_at": (now - timedelta(seconds=COLLECTION_CACHE_TTL + 1)).isoformat()}
+    ]
+    monkeypatch.setattr(SupabaseService, "get_llm_cache", staticmethod(lambda limit=500: rows))
+    DataCollectorAgent._load_persistent_cache()
+    assert DataCollectorAgent._exact_cache_get(("tech", "france", "", "")) == [{"value": 1}]
+    assert DataCollectorAgent._exact_cache_get(("tech", "germany", "", "")) is None
+
+@pytest.mark.parametrize("raw, expected", [
+    ("2023", "2023-01-01"),
+    (2023, "2023-01-01"),
+    ("2024-01-15", "2024-01-15"),
+    ("in 2023", "2023-01-01"),
+    ("Q3 2024", "2024-01-01"),
+    ("March 2024", "2024-03-01"),
+    ("15 March 2024", "2024-03-15"),
+])
+def test_data_point_dates_are_normalized(raw, expected):
+    assert DataPoint(name="market_size", value="€5 billion", date=raw).date == expected
+
+def test_missing_data_point_dates_default_to_today():
+    today = datetime.now().strftime("%Y-%m-%d")
+    assert DataPoint(name="market_size", value="€5 billion").date == today
+    assert DataPoint(name="market_size", value="€5 billion", date=None).date == today
+    assert DataPoint(name="market_size", value="€5 billion", date="unknown").date == today
@@ -0,0 +1,45 @@
+import time
+from agents.data_collector.worker import DataCollectorWorker
+
+class EchoAgent:
+    """
+    Stands in for a DataCollectorAgent, returning the query it was given.
+    """
+
+    async def aprocess(self, query):
+        if query.get("fail"):
+            raise ValueError("collection failed")
+        return {"query": query}
+
+def wait_for(worker, job_id):
+    for _ in range(200):
+        job = worker.status(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+def test_finished_jobs_are_forgotten_once_fetched():
+    worker = DataCollectorWorker(EchoAgent(), num_workers=2)
+    job_id = worker.submit({"sector": "Technology"})
+    job = wait_for(worker, job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"query": {"sector": "Technology"}}
+    assert worker.status(job_id) is None
+    assert not worker.jobs
+
+def test_failed_jobs_report_the_error():
+    worker = DataCollectorWorker(EchoAgent())
+    job = wait_for(worker, worker.submit({"fail": True}))
+    assert job["status"] == "failed"
+    assert job["result"] == {"error": "collection failed"}
+
+def test_unfetched_jobs_expire():
+    worker = DataCollectorWorker(EchoAgent(), job_ttl=0)
+    job_id = worker.submit({"sector": "Technology"})
+    for _ in range(200):
+        if worker.jobs[job_id]["status"] == "done":
+            break
+        time.sleep(0.01)
+    worker.submit({"sector": "Energy"})
+    assert job_id not in worker.jobs
@@ -0,0 +1,55 @@
+import asyncio
+import json
+from collections import OrderedDict
+import pytest
+from agents.orchestrator.agent import OrchestratorAgent
+from agents.semantic_cache import SemanticCache
+
+@pytest.fixture
+def orchestrator(monkeypatch):
+    """
+    An orchestrator with empty analysis caches, every query embedding to the same
+    vector and the analysis model extracting the country named in the query.
+    """
+    monkeypatch.setattr(OrchestratorAgent, "_analysis_exact", OrderedDict())
+    monkeypatch.setattr(OrchestratorAgent, "_analysis_semantic", SemanticCache(threshold=OrchestratorAgent.ANALYSIS_CACHE_THRESHOLD))
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.analysis_calls = []
+
+    async def embed(text, model=None):
+        return [1.0, 0.0, 0.0]
+
+    async def analyze(messages, **kwargs):
+        query = messages[-1]["content"]
+        orchestrator.analysis_calls.append(query)
+        country = "France" if "France" in query else "Germany"
+        return json.dumps({"intent": "data_collection", "parameters": {
+            "sector": "Industrial Equipment", "country": country, "financial_product": None,
+            "custom_keyword": "Crane", "question": None
+        }})
+
+    orchestrator._create_embedding_async = embed
+    orchestrator._call_openai_api_async = analyze
+    return orchestrator
+
+def test_queries_differing_only_in_country_get_their_own_analysis(orchestrator):
+    germany = asyncio.run(orchestrator._analyze_query_async("Give me crane data in Germany"))
+    france = asyncio.run(orchestrator._analyze_query_async("Give me crane data in France"))
+
+    assert germany["parameters"]["country"] == "Germany"
+    assert france["parameters"]["country"] == "France"
+    assert len(orchestrator.analysis_calls) == 2
+
+def test_paraphrase_reuses_the_analysis_without_promoting_it(orchestrator):
+    asyncio.run(orchestrator._analyze_query_async("Give me crane data in France"))
+    paraphrase = asyncio.run(orchestrator._analyze_query_async("Find crane data in France"))
+
+    assert paraphrase["parameters"]["country"] == "France"
+    assert len(orchestrator.analysis_calls) == 1
+    assert orchestrator._analysis_key("Find crane data in France") not in orchestrator._analysis_exact
+
+def test_similar_query_with_another_keyword_is_analyzed(orchestrator):
+    asyncio.run(orchestrator._analyze_query_async("Give me crane data in France"))
+    asyncio.run(orchestrator._analyze_query_async("Give me forklift data in France"))
+
+    assert len(orchestrator.analysis_calls) == 2
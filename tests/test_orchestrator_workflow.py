@@ -0,0 +1,54 @@
+import asyncio
+from agents.orchestrator.agent import OrchestratorAgent
+
+def test_steps_without_dependencies_run_in_order():
+    steps = [
+        {"agent": "data_collector", "parameters": {"sector": "Technology", "country": "France"}},
+        {"agent": "report_generator", "parameters": {"sector": "Technology", "country": "France"}},
+        {"agent": "qa_agent", "parameters": {"question": "What is the market size?"}}
+    ]
+    assert OrchestratorAgent._workflow_waves(steps) == [[0], [1], [2]]
+
+def test_declared_dependencies_fan_out():
+    steps = [
+        {"agent": "data_collector", "depends_on": []},
+        {"agent": "data_collector", "depends_on": []},
+        {"agent": "report_generator", "depends_on": [0]},
+        {"agent": "qa_agent", "depends_on": [1, 2]}
+    ]
+    assert OrchestratorAgent._workflow_waves(steps) == [[0, 1], [2], [3]]
+
+def test_invalid_dependencies_are_ignored():
+    steps = [
+        {"agent": "data_collector", "depends_on": [1, -1, "0"]},
+        {"agent": "qa_agent", "depends_on": [5]}
+    ]
+    assert OrchestratorAgent._workflow_waves(steps) == [[0, 1]]
+
+def test_empty_workflow():
+    assert OrchestratorAgent._workflow_waves([]) == []
+
+class RecordingAgent:
+    """
+    Stands in for a specialized agent, returning the parameters it was called with.
+    """
+
+    async def aprocess(self, parameters):
+        return dict(parameters)
+
+def test_context_only_fills_steps_that_use_it():
+    orchestrator = OrchestratorAgent.__new__(OrchestratorAgent)
+    orchestrator.data_collector = orchestrator.report_generator = orchestrator.qa_agent = RecordingAgent()
+    orchestrator.max_parallel_agents = 3
+    workflow = {
+        "steps": [
+            {"agent": "data_collector", "parameters": {"sector": "Technology", "country": "France"},
+             "update_context": ["sector", "country"]},
+            {"agent": "qa_agent", "parameters": {"question": "Market size?"}},
+            {"agent": "qa_agent", "parameters": {"question": "Market size?"}, "use_context": True}
+        ],
+        "context": {}
+    }
+    results = asyncio.run(orchestrator.aexecute_workflow(workflow))["results"]
+    assert results[1]["parameters"] == {"question": "Market size?"}
+    assert results[2]["parameters"] == {"question": "Market size?", "sector": "Technology", "country": "France"}
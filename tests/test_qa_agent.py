@@ -0,0 +1,193 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import pytest
+import supabase_service
+from agents.qa import agent as qa_module
+from agents.qa.agent import QAAgent
+from agents.qa.batcher import QABatcher
+from agents.semantic_cache import SemanticCache
+from supabase_service import SupabaseService
+
+@pytest.fixture
+def agent(monkeypatch):
+    """
+    A QAAgent with empty answer caches, where every question embeds to the same
+    vector and the retrieval, LLM and Supabase calls are replaced by recorders.
+    """
+    monkeypatch.setattr(QAAgent, "_answer_exact", OrderedDict())
+    monkeypatch.setattr(QAAgent, "_answer_cache", SemanticCache(threshold=QAAgent.ANSWER_CACHE_THRESHOLD))
+    stored = []
+    monkeypatch.setattr(SupabaseService, "store_query", staticmethod(lambda **kwargs: stored.append(kwargs) or kwargs))
+
+    qa = QAAgent.__new__(QAAgent)
+    qa.stored = stored
+    qa.answered = []
+    qa._background_tasks = set()
+
+    async def embed(text, model=None):
+        return [1.0, 0.0]
+
+    async def retrieve(query):
+        return {"reports": [{"id": "r1", "title": "Report"}], "market_data": [{"id": "m1"}], "context": "context"}
+
+    async def answer(context, question):
+        qa.answered.append(question)
+        return f"answer to {question}"
+
+    qa._create_embedding_async = embed
+    qa._retrieve_context = retrieve
+    qa._answer = answer
+    return qa
+
+def ask(qa, questions):
+    async def run():
+        results = [await qa.aprocess({"question": question, "sector": "Technology"}) for question in questions]
+        await asyncio.gather(*qa._background_tasks)
+        return results
+    return asyncio.run(run())
+
+def test_cached_answers_are_still_recorded(agent):
+    results = ask(agent, ["What is the market size?", "what is the  market size?", "What's the market size?"])
+    assert agent.answered == ["What is the market size?"]
+    assert [result["answer"] for result in results] == ["answer to What is the market size?"] * 3
+    assert [entry["query_text"] for entry in agent.stored] == [
+        "What is the market size?", "what is the  market size?", "What's the market size?"
+    ]
+    assert all(entry["metadata"] == {"reports_used": ["r1"], "market_data_used": ["m1"]} for entry in agent.stored)
+
+def test_questions_with_different_numbers_are_not_shared(agent):
+    ask(agent, ["What was the market size in 2023?", "What was the market size in 2024?"])
+    assert agent.answered == ["What was the market size in 2023?", "What was the market size in 2024?"]
+
+@pytest.mark.parametrize("write", [
+    lambda: SupabaseService.store_market_data("Technology", "France", "market_size", "1", "Test"),
+    lambda: SupabaseService.store_market_data_bulk([{
+        "sector": "Technology", "country": "France", "data_point": "market_size", "value": "1", "source": "Test"
+    }])
+])
+def test_market_data_writes_evict_cached_answers(agent, monkeypatch, write):
+    monkeypatch.setattr(supabase_service, "mock_db", {"market_data": [], "reports": [], "queries": []})
+    ask(agent, ["What is the market size?"])
+    write()
+    ask(agent, ["What is the market size?", "What's the market size?"])
+    assert agent.answered == ["What is the market size?"] * 2
+
+def test_answers_retrieved_before_a_write_are_not_cached(agent):
+    async def retrieve_then_write(query):
+        # A write lands while the answer is being built
+        SupabaseService.clear_cache()
+        return {"reports": [], "market_data": [], "context": "context"}
+
+    agent._retrieve_context = retrieve_then_write
+    ask(agent, ["What is the market size?"])
+    assert not QAAgent._answer_exact
+    assert len(QAAgent._answer_cache) == 0
+
+def test_exact_answer_cache_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(QAAgent, "_answer_exact", OrderedDict())
+    monkeypatch.setattr(qa_module, "ANSWER_CACHE_MAXSIZE", 8)
+    qa = QAAgent.__new__(QAAgent)
+    result = {"answer": "a", "reports_used": [], "market_data_used": 0}
+
+    def hammer(offset):
+        for index in range(2000):
+            key = ((offset + index) % 16, ())
+            qa._remember_exact(key, result, [])
+            qa._exact_answer(key)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(hammer, range(8)))
+    assert len(QAAgent._answer_exact) <= 8
+
+class FakeAnswerer:
+    """
+    Stands in for the QAAgent behind a QABatcher, recording the completions made.
+    """
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def _answer(self, context, question):
+        self.calls.append((context, [question]))
+        return f"{context}: {question}"
+
+    async def _answer_batch(self, context, questions):
+        self.calls.append((context, list(questions)))
+        if self.fail:
+            raise ConnectionError("completion failed")
+        return [f"{context}: {question}" for question in questions]
+
+def test_batcher_groups_questions_over_the_same_context():
+    answerer = FakeAnswerer()
+    batcher = QABatcher(answerer, window=0.01)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.answer("ctx-a", "q1"),
+            batcher.answer("ctx-a", "q2"),
+            batcher.answer("ctx-b", "q3")
+        )
+
+    assert asyncio.run(run()) == ["ctx-a: q1", "ctx-a: q2", "ctx-b: q3"]
+    assert sorted(answerer.calls) == [("ctx-a", ["q1", "q2"]), ("ctx-b", ["q3"])]
+
+def test_batcher_flushes_full_batches_immediately():
+    answerer = FakeAnswerer()
+    batcher = QABatcher(answerer, window=10, max_batch=2)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.answer("ctx", "q1"), batcher.answer("ctx", "q2")),
+            timeout=1
+        )
+
+    assert asyncio.run(run()) == ["ctx: q1", "ctx: q2"]
+    assert answerer.calls == [("ctx", ["q1", "q2"])]
+
+def test_batcher_propagates_errors_to_every_caller():
+    batcher = QABatcher(FakeAnswerer(fail=True), window=0.01)
+
+    async def run():
+        return await asyncio.gather(batcher.answer("ctx", "q1"), batcher.answer("ctx", "q2"), return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in asyncio.run(run()))
+
+def budget_agent(max_input_tokens):
+    qa = QAAgent.__new__(QAAgent)
+    qa.system_prompt = "system"
+    qa.max_input_tokens = max_input_tokens
+    return qa
+
+def market_data(count):
+    return [{"data_point": f"point {i}", "value": "x" * 100, "source": "s", "date": f"2024-01-{i + 1:02d}"} for i in range(count)]
+
+def report(report_id, created_at, content_chars):
+    return {"id": report_id, "title": "Title", "summary": "Summary", "created_at": created_at, "content": "c" * content_chars}
+
+def test_fit_to_budget_keeps_records_that_fit():
+    reports, data = [report("r1", "2024-01-01", 100)], market_data(3)
+    assert budget_agent(8000)._fit_to_budget("question", reports, data) == (reports, data)
+
+def test_fit_to_budget_prefers_recent_records_and_truncates_reports():
+    qa = budget_agent(2000)
+    budget = (2000 - QAAgent.CONTEXT_SAFETY_TOKENS) * QAAgent.CHARS_PER_TOKEN - len("system") - len("question")
+    reports = [report("old", "2023-01-01", 4000), report("new", "2024-01-01", 4000)]
+    data = market_data(40)
+
+    kept_reports, kept_data = qa._fit_to_budget("question", reports, data)
+
+    assert 0 < len(kept_data) < len(data)
+    assert kept_data[0] is data[-1]
+    assert [r["id"] for r in kept_reports] == ["new"]
+    assert kept_reports[0]["content"].endswith("[Content truncated]")
+    assert reports[1]["content"] == "c" * 4000
+    used = sum(len(str(d[field])) for d in kept_data for field in ("data_point", "value", "source", "date")) + 40 * len(kept_data)
+    assert used <= budget // 2
+    assert used + len(kept_reports[0]["content"]) <= budget
+
+def test_fit_to_budget_drops_reports_too_small_to_truncate():
+    qa = budget_agent(700)
+    kept_reports, _ = qa._fit_to_budget("question", [report("r1", "2024-01-01", 5000)], [])
+    assert kept_reports == []
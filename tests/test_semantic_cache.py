@@ -0,0 +1,56 @@
+import time
+import numpy as np
+from agents.semantic_cache import SemanticCache, normalize
+
+def test_normalize_returns_unit_vectors():
+    assert np.linalg.norm(normalize([3.0, 4.0])) == np.float32(1.0)
+    assert not normalize([0.0, 0.0]).any()
+
+def test_lookup_returns_the_most_similar_entry_above_threshold():
+    cache = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0], "x")
+    cache.add([0.0, 1.0], "y")
+    assert cache.lookup([10.0, 1.0]) == "x"
+    assert cache.lookup([1.0, 10.0]) == "y"
+    assert cache.lookup([1.0, 1.0]) is None
+
+def test_empty_cache_misses():
+    assert SemanticCache().lookup([1.0, 0.0]) is None
+
+def test_buckets_are_isolated():
+    cache = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0], "france", bucket=("tech", "france"))
+    assert cache.lookup([1.0, 0.0], bucket=("tech", "germany")) is None
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0], bucket=("tech", "france")) == "france"
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = SemanticCache(threshold=0.9, ttl=10)
+    cache.add([1.0, 0.0], "default ttl")
+    cache.add([0.0, 1.0], "short ttl", ttl=1)
+    now[0] += 5
+    assert cache.lookup([1.0, 0.0]) == "default ttl"
+    assert cache.lookup([0.0, 1.0]) is None
+    now[0] += 10
+    assert cache.lookup([1.0, 0.0]) is None
+
+def test_oldest_entries_are_overwritten_when_full():
+    cache = SemanticCache(threshold=0.9, max_entries=2)
+    cache.add([1.0, 0.0, 0.0], "a")
+    cache.add([0.0, 1.0, 0.0], "b")
+    cache.add([0.0, 0.0, 1.0], "c")
+    assert len(cache) == 2
+    assert cache.lookup([1.0, 0.0, 0.0]) is None
+    assert cache.lookup([0.0, 1.0, 0.0]) == "b"
+    assert cache.lookup([0.0, 0.0, 1.0]) == "c"
+
+def test_clear_drops_every_entry():
+    cache = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0], "a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.lookup([1.0, 0.0]) is None
+    cache.add([0.0, 1.0], "b")
+    assert cache.lookup([0.0, 1.0]) == "b"
@@ -0,0 +1,49 @@
+import importlib.util
+from pathlib import Path
+import pytest
+from db.schema import TABLES, generate_ddl, table_ddl
+
+@pytest.fixture(scope="module")
+def run_sql_setup():
+    # The script reads the Supabase credentials at import time
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("SUPABASE_URL", "https://example.supabase.co")
+        monkeypatch.setenv("SUPABASE_KEY", "test-key")
+        path = Path(__file__).resolve().parent.parent / "scripts" / "run_sql_setup.py"
+        spec = importlib.util.spec_from_file_location("run_sql_setup", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+def test_split_sql_commands(run_sql_setup):
+    sql = "CREATE TABLE a (id INT);\nINSERT INTO a VALUES (1);\nSELECT 1"
+    assert run_sql_setup.split_sql_commands(sql) == ["CREATE TABLE a (id INT);", "INSERT INTO a VALUES (1);", "SELECT 1"]
+
+def test_split_sql_commands_ignores_quoted_semicolons(run_sql_setup):
+    sql = "INSERT INTO a VALUES ('x;y', 'it''s; fine');\nCREATE TABLE \"odd;name\" (id INT);"
+    assert run_sql_setup.split_sql_commands(sql) == [
+        "INSERT INTO a VALUES ('x;y', 'it''s; fine');",
+        "CREATE TABLE \"odd;name\" (id INT);"
+    ]
+
+def test_split_sql_commands_handles_multiline_strings(run_sql_setup):
+    sql = "INSERT INTO a VALUES ('line one;\nline two');SELECT 2;"
+    assert run_sql_setup.split_sql_commands(sql) == ["INSERT INTO a VALUES ('line one;\nline two');", "SELECT 2;"]
+
+def test_split_sql_commands_skips_blank_trailer(run_sql_setup):
+    assert run_sql_setup.split_sql_commands("SELECT 1;\n\n  ") == ["SELECT 1;"]
+    assert run_sql_setup.split_sql_commands("") == []
+
+def test_table_ddl():
+    ddl = table_ddl("llm_cache")
+    assert ddl.startswith("CREATE TABLE IF NOT EXISTS llm_cache (\n")
+    assert ddl.endswith("\n);")
+    assert "    cache_key TEXT UNIQUE," in ddl
+    assert "    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()\n" in ddl
+
+def test_generate_ddl_creates_every_table_in_one_transaction(run_sql_setup):
+    ddl = generate_ddl()
+    assert ddl.startswith("BEGIN;") and ddl.endswith("COMMIT;")
+    statements = run_sql_setup.split_sql_commands(ddl)
+    assert statements[0] == "BEGIN;" and statements[-1] == "COMMIT;"
+    assert statements[1:-1] == [table_ddl(table_name) for table_name in TABLES]
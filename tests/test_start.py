@@ -0,0 +1,40 @@
+import importlib.util
+import sys
+from pathlib import Path
+import pytest
+
+def load_start():
+    path = Path(__file__).resolve().parent.parent / "scripts" / "start.py"
+    spec = importlib.util.spec_from_file_location("start", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+start = load_start()
+
+def test_read_requirements_normalizes_names(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("requirements.txt").write_text("# comment\nPython_Dotenv==1.0.0\n\nopenai>=1.30\nuvicorn[standard] ; python_version >= '3.8'\n")
+    assert start.read_requirements() == {
+        "python-dotenv": "Python_Dotenv==1.0.0",
+        "openai": "openai>=1.30",
+        "uvicorn": "uvicorn[standard] ; python_version >= '3.8'"
+    }
+
+@pytest.mark.parametrize("line, installed, expected", [
+    ("openai==1.30.5", {}, True),
+    ("openai==1.30.5", {"openai": "1.12.0"}, True),
+    ("openai==1.30.5", {"openai": "1.30.5"}, False),
+    ("openai>=1.30", {"openai": "1.35.0"}, False),
+    ("Python_Dotenv==1.0.0", {"python-dotenv": "1.0.0"}, False),
+    ("pywin32==306 ; sys_platform == 'nonexistent'", {}, False),
+])
+def test_needs_install_compares_versions(line, installed, expected):
+    assert start.needs_install(line, installed) is expected
+
+def test_needs_install_without_packaging(monkeypatch):
+    monkeypatch.setitem(sys.modules, "packaging.requirements", None)
+    assert start.needs_install("openai==1.30.5", {"openai": "1.12.0"})
+    assert not start.needs_install("openai==1.30.5", {"openai": "1.30.5"})
+    assert not start.needs_install("openai>=1.30", {"openai": "1.12.0"})
+    assert start.needs_install("openai>=1.30", {})
@@ -1,10 +1,6 @@
-import os
-import sys
 import json
 from datetime import datetime
 
-# Add the parent directory to the path to import the Supabase service
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from supabase_service import SupabaseService
 
 def print_separator(title):
@@ -1,10 +1,6 @@
-import os
-import sys
 import json
 from datetime import datetime
 
-# Add the parent directory to the path to import the necessary modules
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from supabase_service import SupabaseService
 from agents.orchestrator.agent import OrchestratorAgent
 
@@ -46,6 +42,7 @@ def test_workflow_with_custom_keyword():
                 "parameters": {
                     # Use context from previous step
                 },
+                "use_context": True,
                 "update_context": ["sector", "country", "custom_keyword"]
             },
             {
@@ -53,7 +50,8 @@ def test_workflow_with_custom_keyword():
                 "parameters": {
                     "question": f"What are the key trends in {custom_keyword} for the {sector} sector in {country}?"
                     # Use context from previous steps
-                }
+                },
+                "use_context": True
             }
         ],
         "context": {}